@@ -0,0 +1,158 @@
+"""
+Historical deal backfill against the local fake history server, with the
+checkpoint store and deal table kept in memory instead of Postgres:
+serial vs parallel fetching, then a run interrupted halfway (with 5% of
+requests failing) and resumed, checked against the server's full history.
+
+    python -m benchmarks.bench_backfill --accounts 40 --days 90
+"""
+import argparse
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_history import FakeHistory
+from veilon_core.backfill import Backfill, BackfillStore, HttpHistorySource, Window
+from veilon_core.trackers import TrackedAccount
+
+
+class MemoryStore(BackfillStore):
+    """BackfillStore semantics (leases, attempts, atomic window checkpoints) in memory."""
+
+    def __init__(self, accounts: list[TrackedAccount], history_from: datetime, history_to: datetime, window: timedelta):
+        super().__init__(window=window)
+        self.accounts = accounts
+        self.history_from = history_from
+        self.history_to = history_to
+        self.windows: dict[tuple[int, datetime], dict] = {}
+        self.deals: dict[tuple[int, str], object] = {}
+        self.completed: set[int] = set()
+        self._lock = threading.Lock()
+
+    def plan(self, account_ids=None) -> int:
+        with self._lock:
+            planned = 0
+            for account in self.accounts:
+                if any(key[0] == account.account_id for key in self.windows):
+                    continue
+                planned += 1
+                start = self.history_from
+                while start < self.history_to:
+                    self.windows[(account.account_id, start)] = {
+                        "account": account, "end": min(start + self.window, self.history_to),
+                        "attempts": 0, "leased_until": 0.0, "done": False,
+                    }
+                    start += self.window
+            return planned
+
+    def claim(self, limit: int, lease: float = 600.0) -> list[Window]:
+        now = time.monotonic()
+        with self._lock:
+            pending = sorted(
+                (key for key, w in self.windows.items()
+                 if not w["done"] and w["attempts"] < self.max_attempts and w["leased_until"] < now),
+                key=lambda key: key[1], reverse=True,
+            )[:limit]
+            claimed = []
+            for key in pending:
+                w = self.windows[key]
+                w["leased_until"] = now + lease
+                w["attempts"] += 1
+                claimed.append(Window(key[0], w["account"].metaapi_account_id, key[1], w["end"], w["attempts"]))
+            return claimed
+
+    def complete(self, window: Window, deals) -> int:
+        with self._lock:
+            new = [d for d in deals if (d.account_id, d.deal_id) not in self.deals]
+            self.deals.update(((d.account_id, d.deal_id), d) for d in new)
+            self.windows[(window.account_id, window.start)]["done"] = True
+            if all(w["done"] for key, w in self.windows.items() if key[0] == window.account_id):
+                self.completed.add(window.account_id)
+            return len(new)
+
+    def fail(self, window: Window, error: str, retry_after: float):
+        with self._lock:
+            self.windows[(window.account_id, window.start)]["leased_until"] = 0.0   # retry right away here
+
+    def pending(self) -> int:
+        return sum(not w["done"] for w in self.windows.values())
+
+
+def make_store(args, fake: FakeHistory) -> MemoryStore:
+    history_to = datetime.fromtimestamp(fake.until, timezone.utc)
+    accounts = [TrackedAccount(i, f"meta-{i}") for i in range(1, args.accounts + 1)]
+    return MemoryStore(accounts, history_to - timedelta(days=args.days), history_to, timedelta(days=args.window_days))
+
+
+async def timed_run(label: str, backfill: Backfill, fake: FakeHistory, stop_after: int = 0) -> tuple[dict, float]:
+    requests = fake.requests
+    started = time.perf_counter()
+    runner = asyncio.create_task(backfill.run())
+    if stop_after:
+        while backfill.stats()["windows"] < stop_after:
+            await asyncio.sleep(0.01)
+        backfill.stop()
+    await runner
+    elapsed = time.perf_counter() - started
+    stats = backfill.stats()
+    print(f"{label:<13} {elapsed:6.2f} s  {stats['windows']:,} windows, {fake.requests - requests:,} requests, "
+          f"{stats['deals_written']:,} new deals ({stats['deals_written'] / elapsed:,.0f}/s), "
+          f"{stats['page_retries']} page retries, {stats['windows_failed']} failed windows")
+    return stats, elapsed
+
+
+async def run(args):
+    fake = FakeHistory(positions_per_day=args.positions_per_day, latency=args.latency)
+    port = fake.start()
+    url = f"http://127.0.0.1:{port}"
+    expected = {
+        (a, d["id"])
+        for a in range(1, args.accounts + 1)
+        for d in fake.deals(f"meta-{a}", fake.until - args.days * 86_400, fake.until)
+    }
+    print(f"history       {args.accounts} accounts x {args.days} days: {len(expected):,} deals, "
+          f"{args.latency * 1000:.0f} ms per request")
+
+    def backfill(store, concurrency, page_size=args.page_size):
+        return Backfill(HttpHistorySource(url, max_requests=concurrency), store=store, concurrency=concurrency, per_account=2,
+                        page_size=page_size, retry_delay=0.01)
+
+    serial_store = make_store(args, fake)
+    serial_store.accounts = serial_store.accounts[:max(1, args.accounts // 8)]   # keep the serial run short
+    serial = await timed_run("serial (1/8)", backfill(serial_store, 1), fake)
+    parallel_store = make_store(args, fake)
+    parallel = await timed_run(f"parallel x{args.concurrency}", backfill(parallel_store, args.concurrency), fake)
+    assert set(parallel_store.deals) == expected
+    per_window = lambda stats, elapsed: elapsed / stats["windows"]  # noqa: E731
+    print(f"{'':<13} speedup {per_window(*serial) / per_window(*parallel):.1f}x per window")
+
+    fake.fail_rate = 0.05
+    store = make_store(args, fake)
+    half = len(parallel_store.windows) // 2
+    first, _ = await timed_run("interrupted", backfill(store, args.concurrency), fake, stop_after=half)
+    left = store.pending()
+    second, _ = await timed_run("resumed", backfill(store, args.concurrency), fake)
+    print(f"{'':<13} {left:,} windows left after the interruption; resumed run fetched {second['windows']:,}")
+    assert second["windows"] == left
+    assert first["deals_written"] + second["deals_written"] == len(store.deals)
+    assert set(store.deals) == expected, "resumed backfill differs from the server's history"
+    assert len(store.completed) == args.accounts
+    fake.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=40)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--window-days", type=float, default=7)
+    parser.add_argument("--positions-per-day", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=50, help="small pages exercise paging")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per history request")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Account status derivation: row-wise apply vs vectorized vs SQL.
+
+    python -m benchmarks.bench_derive_status --rows 100000
+    python -m benchmarks.bench_derive_status --rows 100000 --dsn "postgresql://..."
+
+The SQL variant runs STATUS_SQL over a temporary table filled with the same
+synthetic rows and only runs when --dsn is given.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from veilon_core.accounts import STATUS_SQL, derive_status, derive_status_frame
+
+
+def make_accounts(n: int, seed: int = 11) -> pd.DataFrame:
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def maybe_time(p):
+        return now - timedelta(days=rng.randrange(1, 300)) if rng.random() < p else None
+
+    return pd.DataFrame({
+        "id": range(1, n + 1),
+        "closed_at": pd.to_datetime([maybe_time(0.15) for _ in range(n)], utc=True),
+        "in_review": [rng.random() < 0.05 for _ in range(n)],
+        "is_enabled": [rng.random() > 0.1 for _ in range(n)],
+        "is_funded": [rng.random() < 0.1 for _ in range(n)],
+        "funded_at": pd.to_datetime([maybe_time(0.05) for _ in range(n)], utc=True),
+        "phase": [rng.choice((1, 2)) for _ in range(n)],
+    })
+
+
+def timed(label: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<12} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+def run_sql(dsn: str, df: pd.DataFrame):
+    import psycopg2
+    from psycopg2.extras import execute_values
+
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TEMP TABLE accounts (
+                id bigint, closed_at timestamptz, in_review boolean, is_enabled boolean,
+                is_funded boolean, funded_at timestamptz, phase int
+            ) ON COMMIT DROP;
+            """
+        )
+        rows = [
+            tuple(None if pd.isna(v) else v for v in row)
+            for row in df.astype(object).itertuples(index=False)
+        ]
+        execute_values(cursor, "INSERT INTO accounts VALUES %s", rows, page_size=10_000)
+
+        def query():
+            cursor.execute(f"SELECT {STATUS_SQL} FROM accounts a ORDER BY a.id;")
+            return [r[0] for r in cursor.fetchall()]
+
+        return timed("sql", query)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dsn", default=None)
+    args = parser.parse_args()
+
+    df = make_accounts(args.rows)
+    print(f"{args.rows:,} accounts")
+    applied = timed("apply", lambda: df.apply(derive_status, axis=1))
+    vectorized = timed("vectorized", lambda: derive_status_frame(df))
+    assert applied.tolist() == vectorized.tolist()
+
+    if args.dsn:
+        assert run_sql(args.dsn, df) == applied.tolist()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Live drawdown breach detection: updates/second sustained on one core.
+
+    python -m benchmarks.bench_drawdown_detector --accounts 100000 --updates 2000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_risk_rules import make_snapshot
+from veilon_core.drawdown import DrawdownDetector
+
+
+def make_updates(snapshot, updates: int, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(snapshot), updates)
+    balance = snapshot["balance"].to_numpy()[rows]
+    # Mostly small moves; a thin tail deep enough to breach.
+    equity = balance * (1 + rng.normal(0.0, 0.01, updates) - (rng.random(updates) < 1e-4) * 0.2)
+    return snapshot["account_id"].to_numpy()[rows], equity, balance
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--updates", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    snapshot = make_snapshot(args.accounts)
+    # Start everyone inside the limits so breaches come from the updates.
+    snapshot["high_water_mark"] = snapshot["balance"]
+    snapshot["day_start_balance"] = snapshot["balance"]
+    ids, equity, balance = make_updates(snapshot, args.updates)
+    ids_list, equity_list, balance_list = ids.tolist(), equity.tolist(), balance.tolist()
+    now = time.time()
+
+    detector = DrawdownDetector()
+    detector.load(snapshot)
+    started = time.perf_counter()
+    update = detector.update
+    scalar_breaches = sum(
+        update(a, e, b, now) is not None for a, e, b in zip(ids_list, equity_list, balance_list)
+    )
+    elapsed = time.perf_counter() - started
+    print(f"{args.accounts:,} accounts, {args.updates:,} updates")
+    print(f"per update  {elapsed * 1000:9.1f} ms  {elapsed / args.updates * 1e9:6.0f} ns/update  "
+          f"{args.updates / elapsed:,.0f} updates/s  {scalar_breaches:,} breaches")
+
+    # Batched: one update per account per batch (latest-wins coalescing).
+    detector = DrawdownDetector()
+    detector.load(snapshot)
+    batch_breaches = 0
+    started = time.perf_counter()
+    for chunk in range(0, args.updates, args.accounts):
+        part = slice(chunk, chunk + args.accounts)
+        batch_ids, first = np.unique(ids[part], return_index=True)
+        batch_breaches += len(detector.update_many(batch_ids, equity[part][first], balance[part][first], now))
+    elapsed = time.perf_counter() - started
+    print(f"coalesced   {elapsed * 1000:9.1f} ms  {elapsed / args.updates * 1e9:6.0f} ns/update  "
+          f"{args.updates / elapsed:,.0f} updates/s  {batch_breaches:,} breaches")
+
+
+if __name__ == "__main__":
+    main()
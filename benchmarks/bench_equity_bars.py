@@ -0,0 +1,81 @@
+"""
+Equity tick -> OHLC bar folding: ring-buffer EquityBars vs per-account lists.
+
+    python -m benchmarks.bench_equity_bars --accounts 10000 --ticks 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from veilon_core.bars import EquityBars
+
+
+def make_ticks(accounts: int, ticks: int, seconds: float, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(1, accounts + 1, ticks)
+    ts = 1_700_000_000 + np.sort(rng.random(ticks)) * seconds
+    equity = 10_000 + rng.normal(0, 50, ticks)
+    return ids.tolist(), ts.tolist(), equity.tolist()
+
+
+def list_bars(ids, ts, equity, interval: int) -> dict:
+    """Baseline: append closed bars to a Python list per account."""
+    current, closed = {}, {}
+    for account_id, t, value in zip(ids, ts, equity):
+        start = int(t) // interval * interval
+        bar = current.get(account_id)
+        if bar is None or start > bar[0]:
+            if bar is not None:
+                closed.setdefault(account_id, []).append(bar)
+            current[account_id] = [start, value, value, value, value, value, 1]
+        else:
+            bar[2] = max(bar[2], value)
+            bar[3] = min(bar[3], value)
+            bar[4] = value
+            bar[6] += 1
+    return closed
+
+
+def timed(label: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument("--seconds", type=float, default=600.0, help="wall-clock span of the ticks")
+    parser.add_argument("--intervals", default="1s,1m,1h")
+    args = parser.parse_args()
+
+    ids, ts, equity = make_ticks(args.accounts, args.ticks, args.seconds)
+    bars = EquityBars(args.intervals)
+
+    def ring():
+        # Drain once per simulated second, like the tracker's flush loop.
+        drained, next_drain = 0, int(ts[0]) + 1
+        for account_id, t, value in zip(ids, ts, equity):
+            if t >= next_drain:
+                drained += len(bars.drain(now=t))
+                next_drain = int(t) + 1
+            bars.update(account_id, value, value, ts=t)
+        return drained + len(bars.drain(now=ts[-1]))
+
+    drained, elapsed = timed("ring", ring)
+    per_tick = elapsed / args.ticks * 1e6
+    print(f"{args.ticks:,} ticks, {args.accounts:,} accounts, intervals {args.intervals}")
+    print(f"ring buffers {elapsed * 1000:9.1f} ms  {per_tick:.2f} us/tick  {args.ticks / elapsed:,.0f} ticks/s")
+    print(f"drained      {drained:,} bars, overruns {bars.stats()['overruns']:,}")
+    ring_bytes = sum(s._ring.nbytes + s._current.nbytes for s in bars.series.values())
+    print(f"memory       {ring_bytes / 2**20:.1f} MB fixed")
+
+    _, elapsed = timed("lists", lambda: [list_bars(ids, ts, equity, s) for s in bars.series])
+    print(f"lists        {elapsed * 1000:9.1f} ms  (unbounded; grows with every closed bar)")
+
+
+if __name__ == "__main__":
+    main()
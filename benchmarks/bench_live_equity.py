@@ -0,0 +1,73 @@
+"""
+Shared-memory live equity table: publish / read cost, and torn-read safety
+with a writer process republishing as fast as it can while this process
+reads.
+
+    python -m benchmarks.bench_live_equity --accounts 50000 --seconds 3
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+from veilon_core.live_equity import LiveEquityTable
+
+
+def hammer(path: str, account_id: int, stop):
+    table = LiveEquityTable(path, writable=True)
+    i = 0
+    while not stop.is_set():
+        i += 1
+        # Every field carries the same value, so a torn read is detectable.
+        table.publish(account_id, float(i), float(i), float(i), float(i), float(i))
+
+
+def per_call(fn, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - started) / n * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=50_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "live-equity")
+    table = LiveEquityTable(path, writable=True, capacity=1 << 17)
+    started = time.perf_counter()
+    for account_id in range(1, args.accounts + 1):
+        table.publish(account_id, 10_000.0, 10_000.0, 0.0, 0.0)
+    print(f"first publish  {(time.perf_counter() - started) / args.accounts * 1e9:7.0f} ns/account "
+          f"({args.accounts:,} accounts, slot claims)")
+    print(f"publish        {per_call(lambda: table.publish(4242, 1.0, 1.0, 0.1, 0.1), 200_000):7.0f} ns")
+
+    reader = LiveEquityTable(path)
+    print(f"read           {per_call(lambda: reader.read(4242), 200_000):7.0f} ns")
+
+    spawn = mp.get_context("spawn")
+    stop = spawn.Event()
+    writer = spawn.Process(target=hammer, args=(path, 7, stop))
+    writer.start()
+    while (row := reader.read(7)) is None or row.balance == 10_000.0:
+        time.sleep(0.05)   # until the writer process is up and publishing
+    reads = torn = misses = 0
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        row = reader.read(7)
+        if row is None:
+            misses += 1
+            continue
+        reads += 1
+        torn += len({row.balance, row.equity, row.max_drawdown_used, row.daily_drawdown_used, row.updated_at}) != 1
+    stop.set()
+    writer.join()
+    print(f"contended      {reads:,} reads, {torn} torn, {misses:,} gave up (writer republishing non-stop)")
+    assert torn == 0
+
+
+if __name__ == "__main__":
+    main()
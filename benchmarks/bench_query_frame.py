@@ -0,0 +1,82 @@
+"""
+Dict-row vs column-wise DataFrame construction for query results.
+
+Simulates what `execute_query` (RealDictCursor rows -> pd.DataFrame) and
+`query_frame` (tuple rows -> frame_from_tuples) each do with an
+accounts-shaped result, without needing a database.
+
+    python -m benchmarks.bench_query_frame --rows 200000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pandas as pd
+
+from veilon_core.frames import frame_from_tuples
+
+COLUMNS = ["id", "user_id", "plan_id", "balance", "phase", "is_enabled", "created_at", "platform", "notes"]
+TYPE_CODES = [20, 20, 23, 1700, 23, 16, 1184, 25, 25]
+
+
+def make_rows(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    tuples = []
+    for i in range(n):
+        tuples.append((
+            i + 1,
+            rng.randrange(1, n // 4 + 2),
+            rng.choice((1, 2, 3, 4)),
+            round(rng.uniform(4_000, 60_000), 2),
+            rng.choice((1, 2)),
+            rng.random() > 0.1,
+            start + timedelta(seconds=rng.randrange(0, 86_400 * 365)),
+            rng.choice(("mt4", "mt5")),
+            None if rng.random() > 0.05 else f"note {i}",
+        ))
+    # What the driver decodes before any dict is built: numerics as Decimal.
+    decimal_tuples = [row[:3] + (Decimal(str(row[3])),) + row[4:] for row in tuples]
+    return tuples, decimal_tuples
+
+
+def dict_path(decimal_tuples):
+    # RealDictCursor builds one dict per row, then pandas re-pivots them.
+    return pd.DataFrame([dict(zip(COLUMNS, row)) for row in decimal_tuples])
+
+
+def measure(label: str, fn, repeat: int = 3):
+    elapsed = min(_timed(fn) for _ in range(repeat))
+
+    # Separate pass: tracemalloc slows allocation-heavy code down a lot.
+    tracemalloc.start()
+    frame = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    held = frame.memory_usage(deep=True).sum()
+    print(f"{label:<12} {elapsed * 1000:9.1f} ms   peak {peak / 2**20:8.1f} MiB   frame {held / 2**20:8.1f} MiB")
+    return frame
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    tuples, decimal_tuples = make_rows(args.rows)
+    print(f"{args.rows:,} rows")
+    measure("dict rows", lambda: dict_path(decimal_tuples))
+    measure("columnar", lambda: frame_from_tuples(COLUMNS, TYPE_CODES, tuples))
+
+
+if __name__ == "__main__":
+    main()
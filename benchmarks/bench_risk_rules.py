@@ -0,0 +1,79 @@
+"""
+Risk-rule evaluation over many live accounts: vectorized vs per-account loop.
+
+    python -m benchmarks.bench_risk_rules --accounts 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from veilon_core.risk import DAILY_DRAWDOWN, MAX_DRAWDOWN, OK, PROFIT_TARGET, evaluate
+
+
+def make_snapshot(n: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    size = rng.choice([5_000.0, 10_000.0, 25_000.0, 50_000.0, 100_000.0], n)
+    balance = size * (1 + rng.normal(0.0, 0.05, n))
+    return pd.DataFrame({
+        "account_id": np.arange(1, n + 1),
+        "plan_id": rng.integers(1, 6, n),
+        "phase": rng.integers(1, 3, n),
+        "is_funded": rng.random(n) < 0.1,
+        "balance": balance,
+        "account_size": size,
+        "day_start_balance": balance * (1 + rng.normal(0.0, 0.02, n)),
+        "high_water_mark": np.maximum(size, balance * (1 + np.abs(rng.normal(0.0, 0.04, n)))),
+        "profit_target_pct": 0.10,
+        "daily_drawdown_pct": 0.05,
+        "max_drawdown_pct": 0.10,
+        "phases": rng.integers(1, 3, n),
+    })
+
+
+def loop_evaluate(snapshot: pd.DataFrame, equities: dict) -> list[str]:
+    outcomes = []
+    for row in snapshot.to_dict("records"):
+        equity = equities.get(row["account_id"], row["balance"])
+        high_water = max(row["high_water_mark"], row["balance"])
+        if equity <= high_water - row["account_size"] * row["max_drawdown_pct"]:
+            outcomes.append(MAX_DRAWDOWN)
+        elif equity <= row["day_start_balance"] - row["account_size"] * row["daily_drawdown_pct"]:
+            outcomes.append(DAILY_DRAWDOWN)
+        elif not row["is_funded"] and row["balance"] - row["account_size"] >= row["account_size"] * row["profit_target_pct"]:
+            outcomes.append(PROFIT_TARGET)
+        else:
+            outcomes.append(OK)
+    return outcomes
+
+
+def timed(label: str, fn, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<12} {best * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=100_000)
+    args = parser.parse_args()
+
+    snapshot = make_snapshot(args.accounts)
+    # Live equity for half the accounts, slightly off balance.
+    live = snapshot.sample(frac=0.5, random_state=1)
+    equities = dict(zip(live["account_id"].tolist(), (live["balance"] * 0.99).tolist()))
+
+    print(f"{args.accounts:,} accounts")
+    results = timed("vectorized", lambda: evaluate(snapshot, equities))
+    expected = timed("loop", lambda: loop_evaluate(snapshot, equities), repeat=1)
+    assert results["outcome"].tolist() == expected
+    print(results["outcome"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
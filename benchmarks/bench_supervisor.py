@@ -0,0 +1,106 @@
+"""
+Sharded tracker supervisor: consistent-hash movement, and a live run of
+worker processes against the fake MetaAPI server (writes discarded),
+including a crashed worker and a pool resize.
+
+    python -m benchmarks.bench_supervisor --accounts 20000 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import threading
+import time
+from statistics import pstdev
+
+from benchmarks.fake_metaapi import FakeMetaApi
+from veilon_core.supervisor import HashRing, Supervisor
+from veilon_core.trackers import TrackedAccount
+
+
+def ring_movement(accounts: int, workers: int):
+    ids = range(1, accounts + 1)
+    before = HashRing(f"worker-{i}" for i in range(workers))
+    after = HashRing(f"worker-{i}" for i in range(workers + 1))
+    moved = sum(before.owner(a) != after.owner(a) for a in ids)
+    modulo = sum(a % workers != a % (workers + 1) for a in ids)
+    sizes = [len(v) for v in before.assign(ids).values()]
+    print(f"ring        {accounts:,} accounts over {workers} workers: "
+          f"{min(sizes):,}..{max(sizes):,} per worker (stdev {pstdev(sizes) / (accounts / workers):.1%})")
+    print(f"add worker  consistent hash moves {moved / accounts:.1%} "
+          f"(ideal {1 / (workers + 1):.1%}), modulo would move {modulo / accounts:.1%}")
+
+
+def start_fake_server() -> int:
+    ready = threading.Event()
+    port = []
+
+    def serve():
+        async def main():
+            server = FakeMetaApi(info_interval=1.0, deal_rate=0.02)
+            port.append(await server.start())
+            ready.set()
+            await asyncio.Event().wait()
+
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+def run_for(supervisor: Supervisor, seconds: float):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        supervisor.step()
+        time.sleep(0.2)
+
+
+def report(label: str, supervisor: Supervisor):
+    stats = supervisor.stats()
+    tracked = {name: s.get("tracked", 0) for name, s in sorted(stats["worker_stats"].items())}
+    updates = sum(s.get("info_updates", 0) for s in stats["worker_stats"].values())
+    print(f"{label:<11} placement {stats['placement']}")
+    print(f"{'':<11} tracked   {tracked}  info updates {updates:,}  restarts {stats['restarts']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=8.0)
+    args = parser.parse_args()
+
+    ring_movement(args.accounts, args.workers)
+
+    port = start_fake_server()
+    accounts = [TrackedAccount(i, f"fake-{i}") for i in range(1, args.accounts + 1)]
+    supervisor = Supervisor(
+        args.workers,
+        transport_url=f"jsonl://127.0.0.1:{port}",
+        accounts_source=lambda: accounts,
+        refresh_interval=2.0,
+        dry_run=True,
+    )
+    try:
+        run_for(supervisor, args.seconds)
+        report("running", supervisor)
+
+        victim = supervisor._workers["worker-0"].process
+        os.kill(victim.pid, signal.SIGKILL)
+        run_for(supervisor, args.seconds)
+        report("after kill", supervisor)
+
+        moved_before = supervisor.stats()["moved"]
+        supervisor.resize(args.workers + 1)
+        run_for(supervisor, args.seconds)   # moves land once the old owners release them
+        moved = supervisor.stats()["moved"] - moved_before
+        assert supervisor.stats()["awaiting_release"] == 0
+        report("resized", supervisor)
+        print(f"{'':<11} resize moved {moved:,} of {args.accounts:,} accounts ({moved / args.accounts:.1%})")
+    finally:
+        supervisor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
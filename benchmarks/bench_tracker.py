@@ -0,0 +1,95 @@
+"""
+Tracker load test: thousands of account streams on one event loop against
+the local fake MetaAPI server, with writes counted instead of sent to
+Postgres.
+
+    python -m benchmarks.bench_tracker --accounts 5000 --seconds 10
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_metaapi import FakeMetaApi
+from veilon_core.bars import EquityBars
+from veilon_core.trackers import JsonLinesTransport, TrackedAccount, Tracker
+
+
+class CountingWriter:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.deals = 0
+        self.balances = 0
+        self.bars = 0
+        self.batches = 0
+
+    def write_deals(self, deals) -> int:
+        time.sleep(self.latency)
+        self.batches += 1
+        self.deals += len(deals)
+        return len(deals)
+
+    def write_balances(self, balances) -> int:
+        time.sleep(self.latency)
+        self.balances += len(balances)
+        return len(balances)
+
+    def write_bars(self, bars) -> int:
+        time.sleep(self.latency)
+        self.bars += len(bars)
+        return len(bars)
+
+
+async def run(args):
+    server = FakeMetaApi(info_interval=args.info_interval, deal_rate=args.deal_rate)
+    port = await server.start()
+
+    writer = CountingWriter(args.write_latency)
+    tracker = Tracker(
+        JsonLinesTransport("127.0.0.1", port),
+        writer=writer,
+        flush_interval=args.flush_interval,
+        bars=EquityBars(args.bars) if args.bars else None,
+    )
+    accounts = [TrackedAccount(i, f"meta-{i}") for i in range(1, args.accounts + 1)]
+
+    started = time.perf_counter()
+    runner = asyncio.create_task(tracker.run(accounts))
+    await asyncio.sleep(args.seconds)
+
+    # Loop responsiveness under load: how late does a 10 ms sleep wake up?
+    lags = []
+    for _ in range(50):
+        before = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - before - 0.01)
+
+    tracker.stop()
+    await runner
+    elapsed = time.perf_counter() - started
+    await server.close()
+
+    stats = tracker.stats()
+    print(f"{args.accounts:,} accounts, {elapsed:.1f} s")
+    print(f"sent        {server.sent['deal']:,} deals, {server.sent['account_information']:,} info updates")
+    print(f"received    {stats['deals_received']:,} deals, {stats['info_updates']:,} info updates "
+          f"({stats['info_updates'] / elapsed:,.0f}/s)")
+    print(f"written     {writer.deals:,} deals in {writer.batches} batches, {writer.balances:,} balances, {writer.bars:,} bars")
+    print(f"loop lag    p50 {sorted(lags)[25] * 1000:.2f} ms, max {max(lags) * 1000:.2f} ms")
+    assert writer.deals == stats["deals_received"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=5_000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--info-interval", type=float, default=0.5)
+    parser.add_argument("--deal-rate", type=float, default=0.05)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--bars", default="1s,1m", help="bar intervals, empty to disable")
+    parser.add_argument("--write-latency", type=float, default=0.02, help="simulated seconds per DB write")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
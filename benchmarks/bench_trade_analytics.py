@@ -0,0 +1,92 @@
+"""
+Dashboard trade analytics over large histories: vectorized vs per-trade loop.
+
+    python -m benchmarks.bench_trade_analytics --rows 1000000
+
+The loop variant is the straightforward Python version of the same figures
+(iterating dict rows) and is only run up to --loop-rows trades.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from veilon_core.analytics import trade_stats
+
+ACCOUNT_SIZE = 100_000.0
+
+
+def make_trades(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2020-01-01T00:00:00", "ns")
+    open_time = start + np.sort(rng.integers(0, 5 * 365 * 86_400, n)).astype("timedelta64[s]")
+    close_time = open_time + rng.integers(60, 3 * 86_400, n).astype("timedelta64[s]")
+    close = pd.Series(pd.to_datetime(close_time, utc=True))
+    close[rng.random(n) < 0.001] = pd.NaT   # a few still open
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "open_time": pd.to_datetime(open_time, utc=True),
+        "close_time": close,
+        "profit": rng.normal(2.0, 40.0, n).round(2),
+        "commission": -rng.uniform(0, 3, n).round(2),
+        "swap": rng.normal(0, 0.5, n).round(2),
+    })
+
+
+def loop_stats(trades: pd.DataFrame, account_size: float) -> dict:
+    rows = sorted(
+        (r for r in trades.to_dict("records") if pd.notna(r["close_time"])),
+        key=lambda r: r["close_time"],
+    )
+    balance = high_water = account_size
+    worst = gross_profit = gross_loss = 0.0
+    wins = losses = 0
+    for r in rows:
+        pnl = r["profit"] + r["commission"] + r["swap"]
+        balance += pnl
+        high_water = max(high_water, balance)
+        worst = max(worst, high_water - balance)
+        if pnl > 0:
+            wins += 1
+            gross_profit += pnl
+        elif pnl < 0:
+            losses += 1
+            gross_loss -= pnl
+    return {
+        "realized_pnl": balance - account_size,
+        "max_drawdown_peak": worst,
+        "win_rate": wins / len(rows) if rows else 0.0,
+        "profit_factor": gross_profit / gross_loss if gross_loss else float("inf"),
+    }
+
+
+def timed(label: str, fn, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<12} {best * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--loop-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    trades = make_trades(args.rows)
+    print(f"{args.rows:,} trades")
+    stats = timed("vectorized", lambda: trade_stats(trades, ACCOUNT_SIZE))
+
+    if args.rows <= args.loop_rows:
+        expected = timed("loop", lambda: loop_stats(trades, ACCOUNT_SIZE), repeat=1)
+        for key, value in expected.items():
+            assert np.isclose(getattr(stats, key), value), (key, getattr(stats, key), value)
+        print("results match")
+
+
+if __name__ == "__main__":
+    main()
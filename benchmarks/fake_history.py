@@ -0,0 +1,166 @@
+"""
+Local fake of MetaAPI's REST deal history, as read by
+veilon_core.backfill.HttpHistorySource:
+
+    GET /users/current/accounts/{id}/history-deals/time/{start}/{end}?offset=&limit=
+
+Every account gets a deterministic history (seeded by account and day):
+up to 2 * `--positions-per-day` positions opened per day, each an "in" deal
+and, once closed, an "out" deal. Repeated and overlapping queries return the
+same deals. `--latency` delays every response and `--fail-rate` answers that
+fraction of requests with HTTP 503.
+
+    python -m benchmarks.fake_history --port 8766
+    python -m veilon_core.backfill --source http://127.0.0.1:8766
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PATH = re.compile(r"^/users/current/accounts/([^/]+)/history-deals/time/([^/]+)/([^/]+)$")
+_DAY = 86_400
+
+
+class FakeHistory:
+    def __init__(
+        self,
+        *,
+        positions_per_day: int = 4,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        until: float | None = None,
+        seed: int = 7,
+    ):
+        self.positions_per_day = positions_per_day
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.until = time.time() if until is None else until   # no deals after this
+        self.seed = seed
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    # ---------------------------------------------------------------
+    # History
+    # ---------------------------------------------------------------
+    def _day(self, account: str, day: int) -> list[dict]:
+        rng = random.Random(f"{self.seed}:{account}:{day}")
+        deals = []
+        for j in range(rng.randint(0, 2 * self.positions_per_day)):
+            opened = day * _DAY + rng.uniform(0, _DAY)
+            closed = opened + rng.uniform(60, 2 * _DAY)
+            side = rng.choice(("BUY", "SELL"))
+            volume = rng.choice((0.01, 0.1, 0.5, 1.0))
+            price = round(rng.uniform(1.0, 1.2), 5)
+            position = f"{day}{j:03d}"
+            common = {"positionId": position, "symbol": "EURUSD", "volume": volume, "commission": -0.7 * volume}
+            deals.append({
+                **common, "id": f"{position}1", "entryType": "DEAL_ENTRY_IN", "type": f"DEAL_TYPE_{side}",
+                "price": price, "profit": 0.0, "swap": 0.0, "time": opened,
+            })
+            deals.append({
+                **common, "id": f"{position}2", "entryType": "DEAL_ENTRY_OUT",
+                "type": "DEAL_TYPE_SELL" if side == "BUY" else "DEAL_TYPE_BUY",
+                "price": round(price + rng.uniform(-0.005, 0.005), 5),
+                "profit": round(rng.gauss(0, 50), 2), "swap": round(-0.1 * (closed - opened) / _DAY, 2),
+                "time": closed,
+            })
+        return deals
+
+    def deals(self, account: str, start: float, end: float) -> list[dict]:
+        """All of the account's deals with start <= time < end, oldest first (epoch seconds)."""
+        end = min(end, self.until)
+        found = []
+        # Positions stay open up to two days: scan back for their closes.
+        for day in range(int(start // _DAY) - 2, int(end // _DAY) + 1):
+            found.extend(d for d in self._day(account, day) if start <= d["time"] < end)
+        found.sort(key=lambda d: (d["time"], d["id"]))
+        return found
+
+    # ---------------------------------------------------------------
+    # Server
+    # ---------------------------------------------------------------
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        with self._lock:
+            self.requests += 1
+            fail = random.random() < self.fail_rate
+            self.failures += fail
+        if self.latency:
+            time.sleep(self.latency)
+        url = urllib.parse.urlsplit(request.path)
+        match = _PATH.match(url.path)
+        if match is None:
+            return self._reply(request, 404, {"error": "NotFoundError"})
+        if fail:
+            return self._reply(request, 503, {"error": "ServiceUnavailable"})
+        account, start, end = (urllib.parse.unquote(g) for g in match.groups())
+        query = urllib.parse.parse_qs(url.query)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["1000"])[0])
+        page = self.deals(account, _epoch(start), _epoch(end))[offset:offset + limit]
+        self._reply(request, 200, [{**d, "time": _iso(d["time"])} for d in page])
+
+    @staticmethod
+    def _reply(request: BaseHTTPRequestHandler, status: int, body):
+        data = json.dumps(body).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+
+def _epoch(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--positions-per-day", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeHistory(positions_per_day=args.positions_per_day, latency=args.latency, fail_rate=args.fail_rate)
+    port = fake.start(args.host, args.port)
+    print(f"fake MetaAPI history on http://{args.host}:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Local fake of the MetaAPI streaming feed, speaking the JSON-lines protocol
+of veilon_core.trackers.JsonLinesTransport.
+
+Every subscribed account gets an account_information update every
+`--info-interval` seconds and, with probability `--deal-rate` per tick, a
+position opened or closed (an "in" deal, later its "out" deal).
+
+    python -m benchmarks.fake_metaapi --port 8765
+    python -m veilon_core.trackers --jsonl 127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+from itertools import count
+
+
+class FakeMetaApi:
+    def __init__(self, *, info_interval: float = 1.0, deal_rate: float = 0.05, seed: int = 7):
+        self.info_interval = info_interval
+        self.deal_rate = deal_rate
+        self.random = random.Random(seed)
+        self.deal_ids = count(1)
+        self.sent = {"deal": 0, "account_information": 0}
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._client, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        accounts: dict[str, dict] = {}
+        ticker = asyncio.create_task(self._tick(accounts, writer))
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message["op"] == "subscribe":
+                    accounts[message["account"]] = {"balance": 10_000.0, "open": {}}
+                elif message["op"] == "unsubscribe":
+                    accounts.pop(message["account"], None)
+        except ConnectionError:
+            pass
+        finally:
+            ticker.cancel()
+            writer.close()
+
+    async def _tick(self, accounts: dict, writer: asyncio.StreamWriter):
+        while True:
+            await asyncio.sleep(self.info_interval)
+            lines = []
+            for account, state in list(accounts.items()):
+                if self.random.random() < self.deal_rate:
+                    lines.append(self._deal(account, state))
+                floating = sum(p["volume"] * self.random.uniform(-50, 50) for p in state["open"].values())
+                lines.append({
+                    "type": "account_information",
+                    "account": account,
+                    "info": {"balance": state["balance"], "equity": state["balance"] + floating},
+                })
+            for message in lines:
+                self.sent[message["type"]] += 1
+            writer.write(b"".join(json.dumps(m).encode() + b"\n" for m in lines))
+            await writer.drain()
+
+    def _deal(self, account: str, state: dict) -> dict:
+        deal_id = next(self.deal_ids)
+        now = datetime.now(timezone.utc).isoformat()
+        if state["open"] and self.random.random() < 0.5:
+            position_id, position = state["open"].popitem()
+            profit = round(position["volume"] * self.random.uniform(-200, 250), 2)
+            state["balance"] += profit
+            deal = {
+                "id": str(deal_id), "positionId": position_id, "entryType": "DEAL_ENTRY_OUT",
+                "type": "DEAL_TYPE_SELL" if position["side"] == "DEAL_TYPE_BUY" else "DEAL_TYPE_BUY",
+                "symbol": position["symbol"], "volume": position["volume"],
+                "price": 1.1 + self.random.uniform(-0.01, 0.01), "profit": profit,
+                "commission": -0.7 * position["volume"], "swap": 0.0, "time": now,
+            }
+        else:
+            position = {
+                "side": self.random.choice(["DEAL_TYPE_BUY", "DEAL_TYPE_SELL"]),
+                "symbol": self.random.choice(["EURUSD", "GBPUSD", "XAUUSD"]),
+                "volume": self.random.choice([0.1, 0.5, 1.0]),
+            }
+            position_id = str(deal_id)
+            state["open"][position_id] = position
+            deal = {
+                "id": str(deal_id), "positionId": position_id, "entryType": "DEAL_ENTRY_IN",
+                "type": position["side"], "symbol": position["symbol"], "volume": position["volume"],
+                "price": 1.1, "profit": 0.0, "commission": -0.7 * position["volume"], "swap": 0.0,
+                "time": now,
+            }
+        return {"type": "deal", "account": account, "deal": deal}
+
+
+async def serve(host: str, port: int, **options):
+    server = FakeMetaApi(**options)
+    port = await server.start(host, port)
+    print(f"fake MetaAPI listening on {host}:{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--info-interval", type=float, default=1.0)
+    parser.add_argument("--deal-rate", type=float, default=0.05)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, info_interval=args.info_interval, deal_rate=args.deal_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
+import math
+from typing import Optional
+
+import pandas as pd
 import streamlit as st
 from pages.routes import CHECKOUT_PAGE
 from veilon_core.users import get_user_by_email, get_or_create_user_from_oidc
-from veilon_core.accounts import get_active_accounts_for_user
-from veilon_core.trades import get_trades_by_account_id
+from veilon_core.accounts import account_get, get_active_accounts_for_user
+from veilon_core.analytics import MAX_DRAWDOWN_PCT, risk_badge, target_badge, trade_stats
+from veilon_core.equity import equity_curve
+from veilon_core.live_equity import read_live_equity
+from veilon_core.plans import get_plan_by_id
+from veilon_core.trades import get_trades_frame_incremental
 from veilon_core.db import execute_query
 from static.elements.metrics import metric_tile, empty_tile
+from static.elements.charts import performance_chart
 
 @st.dialog("Logout")
 def logout_dialog():
@@ -53,6 +62,24 @@ def get_user_id() -> int:
 def get_user_accounts(user_id: int) -> list[dict]:
     return get_active_accounts_for_user(user_id)
 
+def get_account_size(account_id: int) -> Optional[float]:
+    try:
+        account = account_get(account_id)
+    except ValueError:
+        # Missing account or database error: the page shows its "no account" message.
+        return None
+    plan = get_plan_by_id(account["plan_id"]) if account.get("plan_id") is not None else None
+    # Accounts start at the plan's size; fall back to the current balance.
+    return float(plan["account_size"] if plan else account.get("balance") or 0)
+
+def get_phase_start_balance(account_id: int) -> Optional[float]:
+    try:
+        account = account_get(account_id)
+    except ValueError:
+        return None
+    value = account.get("phase_start_balance")
+    return float(value) if value is not None else None
+
 def build_account_label_map(accounts: list[dict]) -> tuple[dict[str, int], list[str], bool]:
     if not accounts:
         return {}, ["No accounts available"], True
@@ -77,12 +104,24 @@ def dashboard_page():
     selected_label = render_account_selector(labels, disabled)
     selected_account_id = label_to_id.get(selected_label)
 
-    trades = get_trades_by_account_id(selected_account_id) if selected_account_id else []
+    trades = get_trades_frame_incremental(selected_account_id) if selected_account_id else pd.DataFrame()
 
-    if not accounts:
+    account_size = get_account_size(selected_account_id) if accounts else None
+    if account_size is None:
         st.info("Add an account to see your performance data, metrics and trade history.")
         return
 
+    stats = trade_stats(trades, account_size, phase_start_balance=get_phase_start_balance(selected_account_id))
+    # Live equity from the tracker's shared-memory table when this host has
+    # one; otherwise the drawdown tile shows the closed-trade figure.
+    live = read_live_equity(selected_account_id)
+    if live is not None and not math.isnan(live.max_drawdown_used):
+        max_drawdown_used = live.max_drawdown_used
+    else:
+        max_drawdown_used = stats.max_drawdown_used
+    dd_badge, dd_badge_color = risk_badge(max_drawdown_used)
+    pt_badge, pt_badge_color = target_badge(stats)
+
     overview_tab, rewards_tab, settings_tab = st.tabs(["Overview", "Rewards", "Settings"])
 
     with overview_tab:
@@ -104,32 +143,40 @@ def dashboard_page():
             metric_tile(
                 key="stat-2-tile",
                 title="Max Drawdown",
-                title_badge="On Track",
-                title_badge_color="green",
-                value="$1,000.00",
-                right_label="of $10,000",
-                progress=0.2,
+                title_badge=dd_badge,
+                title_badge_color=dd_badge_color,
+                value=f"${max_drawdown_used * stats.max_drawdown_limit:,.2f}",
+                right_label=f"of ${stats.max_drawdown_limit:,.0f}",
+                progress=min(max_drawdown_used, 1.0),
             )
 
         with col3:
             metric_tile(
                 key="stat-3-tile",
                 title="Profit Target",
-                title_badge="On Track",
-                title_badge_color="green",
-                value="$1,000.00",
-                right_label="of $10,000",
-                progress=0.2,
+                title_badge=pt_badge,
+                title_badge_color=pt_badge_color,
+                value=f"${max(stats.phase_profit, 0.0):,.2f}",
+                right_label=f"of ${stats.profit_target:,.0f}",
+                progress=stats.profit_progress,
             )
 
         with empty_tile(key="performance-chart", height=300):
-            st.caption("Performance Chart")
+            curve = equity_curve(selected_account_id, trades, stats.account_size, resolution="day",
+                                 phase_start_balance=stats.phase_start_balance)
+            if len(curve) > 1:
+                st.altair_chart(performance_chart(curve, dd_floor_pct=MAX_DRAWDOWN_PCT), use_container_width=True)
+            else:
+                st.caption("Performance Chart")
 
         col4, col5 = st.columns(2)
 
         with col4:
             with empty_tile(key="stats-tile", height=300):
                 st.caption("Account Stats")
+                if live is not None:
+                    st.metric("Equity", f"${live.equity:,.2f}", f"{live.equity - live.balance:+,.2f}")
+                    st.metric("Balance", f"${live.balance:,.2f}")
 
         with col5:
             with empty_tile(key="actions-tile", height=300):
@@ -4,9 +4,11 @@ from streamlit_extras.stylable_container import stylable_container
 import static.elements.layout as layouts
 from pages.routes import DASHBOARD_PAGE
 from pages.footer import render_footer
-from veilon_core.plans import get_plan_by_account_size
+from veilon_core import aio
+from veilon_core.accounts import invalidate_account_caches
+from veilon_core.analytics import DAILY_DRAWDOWN_PCT, MAX_DRAWDOWN_PCT, PROFIT_TARGET_PCT
 from veilon_core.coupons import get_active_coupon_by_code
-from veilon_core.db import execute_query
+from veilon_core.db import transaction
 from veilon_core.users import get_user_by_email, get_or_create_user_from_oidc
 
 def get_user_id():
@@ -31,91 +33,100 @@ def get_user_id():
 
 
 def test_order_process(current_user_id: int, account_size: int):
-    # 1) Get plan details (id + price) from your plans table
-    plan_rows = execute_query(
-        f"""
-        SELECT id, price
-        FROM plans
-        WHERE account_size = {account_size}
-        LIMIT 1;
-        """
-    )
-
-    if not plan_rows:
-        st.error("No plan found for this account size.")
-        return
-
-    plan = plan_rows[0]
-    plan_id = plan["id"]
-    price = plan["price"]  # numeric(10,2) in DB
-
-    # 2) Insert a new order, treating this as a successful 'paid' order
-    order_rows = execute_query(
-        f"""
-        INSERT INTO orders (
-            user_id,
-            plan_id,
-            price,
-            currency,
-            success,
-            status,
-            expiry_date
-        )
-        VALUES (
-            {current_user_id},
-            {plan_id},
-            {price},
-            'USD',
-            TRUE,
-            'paid',
-            NOW() + INTERVAL '30 days'
+    # All four statements share one connection and commit together, so a
+    # failure part-way never leaves an order without its account.
+    with transaction() as tx:
+        # 1) Get plan details (id + price) from your plans table
+        plan_rows = tx.execute(
+            """
+            SELECT id, price
+            FROM plans
+            WHERE account_size = %s
+            LIMIT 1;
+            """,
+            (account_size,),
         )
-        RETURNING id;
-        """
-    )
 
-    order_id = order_rows[0]["id"]
-
-    # 3) Insert a skeleton account linked to this order
-    account_rows = execute_query(
-        f"""
-        INSERT INTO accounts (
-            metaapi_account_id,
-            user_id,
-            order_id,
-            plan_id,
-            platform,
-            broker,
-            server,
-            leverage,
-            login
-        )
-        VALUES (
-            NULL,
-            {current_user_id},
-            {order_id},
-            {plan_id},
-            NULL,
-            NULL,
-            NULL,
-            NULL,
-            NULL
+        if not plan_rows:
+            st.error("No plan found for this account size.")
+            return
+
+        plan = plan_rows[0]
+        plan_id = plan["id"]
+        price = plan["price"]  # numeric(10,2) in DB
+
+        # 2) Insert a new order, treating this as a successful 'paid' order
+        order_rows = tx.execute(
+            """
+            INSERT INTO orders (
+                user_id,
+                plan_id,
+                price,
+                currency,
+                success,
+                status,
+                expiry_date
+            )
+            VALUES (
+                %s,
+                %s,
+                %s,
+                'USD',
+                TRUE,
+                'paid',
+                NOW() + INTERVAL '30 days'
+            )
+            RETURNING id;
+            """,
+            (current_user_id, plan_id, price),
         )
-        RETURNING id;
-        """
-    )
 
-    account_id = account_rows[0]["id"]
+        order_id = order_rows[0]["id"]
+
+        # 3) Insert a skeleton account linked to this order
+        account_rows = tx.execute(
+            """
+            INSERT INTO accounts (
+                metaapi_account_id,
+                user_id,
+                order_id,
+                plan_id,
+                platform,
+                broker,
+                server,
+                leverage,
+                login
+            )
+            VALUES (
+                NULL,
+                %s,
+                %s,
+                %s,
+                NULL,
+                NULL,
+                NULL,
+                NULL,
+                NULL
+            )
+            RETURNING id;
+            """,
+            (current_user_id, order_id, plan_id),
+        )
 
-    # 4) Backfill orders.account_id to link the order to this account
-    execute_query(
-        f"""
-        UPDATE orders
-        SET account_id = {account_id}
-        WHERE id = {order_id};
-        """
-    )
+        account_id = account_rows[0]["id"]
+
+        # 4) Backfill orders.account_id to link the order to this account
+        tx.execute(
+            """
+            UPDATE orders
+            SET account_id = %s
+            WHERE id = %s;
+            """,
+            (account_id, order_id),
+            fetch_results=False,
+        )
 
+    invalidate_account_caches(user_ids=[current_user_id])
     print(f"Test order created. order_id={order_id}, account_id={account_id}")
 
 
@@ -172,6 +183,16 @@ def new_account_page():
                     test_order_process(current_user_id, account_size)
 
         with st.container(border=False, width=300):
+            # Plan details and the Stripe button id are independent lookups:
+            # fetch them concurrently on separate pooled connections.
+            plan, payment_button_id_query = aio.run_all(
+                aio.get_plan_by_account_size(account_size),
+                aio.execute_query(
+                    "SELECT buy_button_id FROM plans WHERE account_size = %s;",
+                    (account_size,),
+                ),
+            )
+
             with st.container(
                 key="account-rules",
                 border=True,
@@ -179,9 +200,6 @@ def new_account_page():
             ):
                 st.write("**Assessment Specifications**")
 
-                # Fetch plan from DB based on account_size
-                plan = get_plan_by_account_size(account_size)
-
                 col1, col2 = st.columns(2, vertical_alignment="center")
 
                 with col1:
@@ -195,13 +213,11 @@ def new_account_page():
                 with col2:
                     st.caption(f"${account_size:,}")
                     st.caption("80%")
-                    st.caption(f"10% (${account_size * 0.1:,.2f})")
-                    st.caption(f"5% (${account_size * 0.05:,.2f})")
-                    st.caption(f"10% (${account_size * 0.1:,.2f})")
+                    st.caption(f"{PROFIT_TARGET_PCT:.0%} (${account_size * PROFIT_TARGET_PCT:,.2f})")
+                    st.caption(f"{DAILY_DRAWDOWN_PCT:.0%} (${account_size * DAILY_DRAWDOWN_PCT:,.2f})")
+                    st.caption(f"{MAX_DRAWDOWN_PCT:.0%} (${account_size * MAX_DRAWDOWN_PCT:,.2f})")
                     st.caption("Monthly")
         
-            payment_button_id_query = execute_query(f"SELECT buy_button_id FROM plans WHERE account_size = {account_size}")
-
             buy_button_id = payment_button_id_query[0]["buy_button_id"]
 
             with st.container(border=False):
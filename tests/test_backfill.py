@@ -0,0 +1,107 @@
+import contextlib
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from veilon_core import backfill, trades
+from veilon_core.backfill import BackfillStore, Window
+from veilon_core.listener import ChangeListener
+from veilon_core.schema import NOTIFY_TABLES
+from veilon_core.trackers import Deal
+
+ACCOUNT = 1
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+class FakeTrades:
+    """The trades table, answering trades._FULL_SQL and trades._DELTA_SQL."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, trade_id: int, open_time: datetime):
+        self.rows.append({"id": trade_id, "account_id": ACCOUNT, "open_time": open_time,
+                          "close_time": open_time + timedelta(hours=1), "profit": 10.0})
+
+    def query_frame(self, sql, params, **kwargs):
+        frame = pd.DataFrame(self.rows).sort_values(["open_time", "id"], ignore_index=True)
+        if sql is trades._DELTA_SQL:
+            _, open_time, last_id, open_ids = params
+            after = (frame["open_time"] > open_time) | ((frame["open_time"] == open_time) & (frame["id"] > last_id))
+            frame = frame[after | frame["id"].isin(open_ids)]
+        return frame.reset_index(drop=True)
+
+
+class FakeCursor:
+    def __init__(self, table: FakeTrades, notifications: list):
+        self.table = table
+        self.notifications = notifications
+        self._result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy_expert(self, sql, buffer):
+        pass
+
+    def execute(self, sql, params=None):
+        self._result = None
+        if sql is backfill._MERGE_SQL:
+            self._result = [(ACCOUNT, "p-old")]
+        elif sql is backfill._RELOAD_NOTIFY_SQL:
+            self.notifications.append(("veilon_trades", params[0]))
+
+    def fetchall(self):
+        return self._result or []
+
+    def fetchone(self):
+        return None
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeTrades()
+    monkeypatch.setattr(trades, "query_frame", table.query_frame)
+    monkeypatch.setattr(trades, "get_trade_store", lambda: None)
+    trades.invalidate_trades_cache()
+    yield table
+    trades.invalidate_trades_cache()
+
+
+def test_backfilled_window_older_than_watermark_is_loaded(monkeypatch, table):
+    table.add(10, NOW - timedelta(days=2))
+    table.add(11, NOW - timedelta(days=1))
+    assert trades.get_trades_frame_incremental(ACCOUNT)["id"].tolist() == [10, 11]
+
+    notifications = []
+
+    @contextlib.contextmanager
+    def transaction():
+        yield SimpleNamespace(conn=SimpleNamespace(cursor=lambda: FakeCursor(table, notifications)))
+
+    def rebuild_positions(cursor, touched):
+        table.add(5, NOW - timedelta(days=30))   # the backfilled position's trade
+        return 1
+
+    monkeypatch.setattr(backfill, "transaction", transaction)
+    monkeypatch.setattr(backfill, "rebuild_positions", rebuild_positions)
+    deal = Deal(ACCOUNT, "d-old", "p-old", "out", "sell", "EURUSD", 0.1, 1.1, 10.0, -0.07, 0.0,
+                NOW - timedelta(days=30))
+    window = Window(ACCOUNT, "meta-1", NOW - timedelta(days=35), NOW - timedelta(days=28))
+    assert BackfillStore().complete(window, [deal]) == 1
+
+    assert trades.get_trades_frame_incremental(ACCOUNT)["id"].tolist() == [5, 10, 11]
+
+    # Other processes drop their copy on the window's notification.
+    assert [json.loads(p)["full_reload"] for _, p in notifications] == [True]
+    assert trades._history_cache.get(str(ACCOUNT)) is not None
+    listener = ChangeListener(NOTIFY_TABLES)
+    for channel, payload in notifications:
+        listener._dispatch(SimpleNamespace(channel=channel, payload=payload))
+    assert trades._history_cache.get(str(ACCOUNT)) is None
@@ -0,0 +1,26 @@
+from veilon_core.drawdown import DrawdownDetector
+from veilon_core.risk import MAX_DRAWDOWN
+
+
+def test_untrack_retrack_churn_reuses_slots():
+    detector = DrawdownDetector(slots=16)
+    for cycle in range(200):
+        for account_id in range(cycle * 10, cycle * 10 + 10):
+            detector.add(account_id, 10_000.0, balance=10_000.0)
+        for account_id in range(cycle * 10, cycle * 10 + 10):
+            detector.discard(account_id)
+    assert len(detector._accounts) == 16
+    assert detector.stats()["accounts"] == 0
+
+
+def test_reused_slot_starts_clean():
+    detector = DrawdownDetector(slots=1)
+    detector.add(1, 10_000.0, balance=10_000.0)
+    assert detector.update(1, 8_900.0, 10_000.0).rule == MAX_DRAWDOWN
+    detector.discard(1)
+
+    detector.add(2, 100_000.0, balance=100_000.0)
+    assert len(detector._accounts) == 1
+    assert detector.update(2, 95_500.0, 100_000.0) is None
+    breach = detector.update(2, 89_000.0, 100_000.0)
+    assert breach.account_id == 2 and breach.rule == MAX_DRAWDOWN
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from veilon_core.analytics import DAILY_DRAWDOWN_PCT
+from veilon_core.equity import EquityCurveBuilder
+
+SIZE = 10_000.0
+NEW_YORK = "America/New_York"
+
+
+def trades(*closes: tuple[str, float]) -> pd.DataFrame:
+    close_time = pd.to_datetime([c for c, _ in closes], utc=True)
+    return pd.DataFrame({
+        "id": range(1, len(closes) + 1),
+        "open_time": close_time - pd.Timedelta(hours=1),
+        "close_time": close_time,
+        "profit": [p for _, p in closes],
+    })
+
+
+def test_daily_floor_resets_at_rollup_tz_midnight():
+    # 16:00 and 22:00 in New York on March 9; the second is already March 10 in UTC.
+    history = trades(("2026-03-09 20:00", -300.0), ("2026-03-10 02:00", -300.0))
+
+    new_york = EquityCurveBuilder(SIZE, tz=NEW_YORK).update(history)
+    utc = EquityCurveBuilder(SIZE, tz="UTC").update(history)
+
+    allowance = SIZE * DAILY_DRAWDOWN_PCT
+    assert new_york["Daily Drawdown"].iloc[-1] == pytest.approx(SIZE - allowance)
+    assert utc["Daily Drawdown"].iloc[-1] == pytest.approx(SIZE - 300.0 - allowance)
+
+
+def test_daily_buckets_are_rollup_tz_days():
+    history = trades(("2026-03-09 20:00", -300.0), ("2026-03-10 02:00", -300.0), ("2026-03-10 15:00", 50.0))
+    frame = EquityCurveBuilder(SIZE, resolution="day", tz=NEW_YORK).update(history)
+
+    days = frame["Date"].dt.tz_convert(NEW_YORK)
+    assert (days == days.dt.normalize()).all()
+    assert frame["Balance"].tolist()[-2:] == [SIZE - 600.0, SIZE - 550.0]
+    assert frame["Daily Drawdown"].iloc[-1] == pytest.approx(SIZE - 600.0 - SIZE * DAILY_DRAWDOWN_PCT)
@@ -0,0 +1,89 @@
+import psycopg2
+
+from veilon_core import events
+from veilon_core.events import AccountEventWriter
+
+DELETED_ACCOUNT = 13
+
+
+class FakeEventTable:
+    """account_events with an FK to accounts: rows for DELETED_ACCOUNT are rejected."""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+
+    def insert(self, rows):
+        if self.down:
+            raise psycopg2.OperationalError("connection refused")
+        if any(row[0] == DELETED_ACCOUNT for row in rows):
+            raise psycopg2.IntegrityError("violates foreign key constraint")
+        self.rows.extend(rows)
+
+
+def writer_with(monkeypatch, table: FakeEventTable) -> AccountEventWriter:
+    monkeypatch.setattr(AccountEventWriter, "_insert", staticmethod(table.insert))
+    writer = AccountEventWriter(batch_size=50, flush_interval=0.01, bisect_after=2)
+    monkeypatch.setattr(events.time, "sleep", lambda seconds: None)
+    return writer
+
+
+def test_rejected_event_does_not_wedge_the_writer(monkeypatch):
+    table = FakeEventTable()
+    writer = writer_with(monkeypatch, table).start()
+    for account_id in range(1, 41):
+        writer.submit(account_id, event_type="balance_adjusted")
+    assert writer.flush(timeout=5)
+    writer.submit(41, event_type="balance_adjusted")   # later events still get through
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert sorted(row[0] for row in table.rows) == [a for a in range(1, 42) if a != DELETED_ACCOUNT]
+    assert writer.stats()["dropped"] == 1
+
+
+def test_transient_errors_drop_nothing(monkeypatch):
+    table = FakeEventTable()
+    writer = writer_with(monkeypatch, table)
+    table.down = True
+    for account_id in range(1, 11):
+        writer.submit(account_id, event_type="balance_adjusted")
+    writer._drain_into_pending()
+    assert not writer._write_bisected()
+    assert len(writer._pending) == 10 and writer.stats()["dropped"] == 0
+
+    table.down = False
+    assert writer._write_bisected()
+    assert len(table.rows) == 10
+
+
+def test_full_queue_falls_back_to_direct_inserts(monkeypatch):
+    from veilon_core import accounts
+
+    class FullWriter:
+        def __init__(self):
+            self.submitted = []
+
+        def submit(self, account_id, **event):
+            if self.submitted:
+                raise events.EventQueueFull("account_events queue full")
+            self.submitted.append(account_id)
+
+    statements = []
+
+    def execute_query(sql, params=None, fetch_results=True):
+        statements.append((sql, params))
+        if sql is accounts._INSERT_EVENTS_SQL:
+            return None
+        return [{"id": i, "_event_payload": {"n": i}, "_owner_id": 7} for i in (1, 2, 3)]
+
+    writer = FullWriter()
+    monkeypatch.setattr(accounts, "execute_query", execute_query)
+    monkeypatch.setattr(accounts, "get_event_writer", lambda: writer)
+    rows = accounts._write_with_event("UPDATE accounts SET is_enabled = true RETURNING id", (),
+                                      event_type="account_enabled")
+
+    assert [row["id"] for row in rows] == [1, 2, 3]   # the applied write is reported, not raised
+    assert writer.submitted == [1]
+    direct = [params for sql, params in statements if sql is accounts._INSERT_EVENTS_SQL]
+    assert len(direct) == 1 and direct[0][3] == [2, 3]
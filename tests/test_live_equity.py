@@ -0,0 +1,22 @@
+from veilon_core import live_equity
+from veilon_core.live_equity import LiveEquityTable
+
+
+def test_publish_after_writer_killed_mid_row(tmp_path):
+    path = str(tmp_path / "live-equity")
+    writer = LiveEquityTable(path, writable=True, capacity=64)
+    reader = LiveEquityTable(path)
+    assert writer.publish(7, 10_000.0, 9_900.0)
+    slot = writer._find(7)
+
+    # The previous owner died between the two seq stores.
+    writer._u[slot * live_equity._FIELDS + live_equity._SEQ] += 1
+    assert reader.read(7) is None
+
+    new_owner = LiveEquityTable(path, writable=True, capacity=64)
+    assert new_owner.publish(7, 10_000.0, 10_050.0, 0.0, 0.0)
+    row = reader.read(7)
+    assert row is not None and row.equity == 10_050.0
+    assert reader.read(7) == row           # still readable: seq is even again
+    for table in (writer, reader, new_owner):
+        table.close()
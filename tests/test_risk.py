@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+from veilon_core import risk
+
+SIZE = 10_000.0
+
+
+class FakeAccounts:
+    """Account rows as load_snapshot() would return them, mutated like the bulk SQL does."""
+
+    def __init__(self, balance: float, phases: int = 2):
+        self.row = {
+            "account_id": 1,
+            "plan_id": 1,
+            "phase": 1,
+            "is_funded": False,
+            "balance": balance,
+            "account_size": SIZE,
+            "phase_start_balance": SIZE,     # COALESCE(NULL, account_size) in phase 1
+            "day_start_balance": balance,
+            "high_water_mark": balance,
+            "profit_target_pct": 0.10,
+            "daily_drawdown_pct": 0.05,
+            "max_drawdown_pct": 0.10,
+            "phases": phases,
+        }
+        self.in_review = False
+
+    def snapshot(self) -> pd.DataFrame:
+        return pd.DataFrame([] if self.in_review else [self.row])
+
+    def change_phase_many(self, ids, new_phase):
+        self.row["phase"] = new_phase
+        self.row["phase_start_balance"] = self.row["balance"]
+        return [{"id": i} for i in ids]
+
+    def set_in_review_many(self, ids, in_review, reason=None):
+        self.in_review = in_review
+        return [{"id": i} for i in ids]
+
+
+def install(monkeypatch, accounts: FakeAccounts):
+    monkeypatch.setattr(risk, "load_snapshot", accounts.snapshot)
+    monkeypatch.setattr(risk, "account_change_phase_many", accounts.change_phase_many)
+    monkeypatch.setattr(risk, "account_set_in_review_many", accounts.set_in_review_many)
+    monkeypatch.setattr(risk, "account_close_many", lambda ids, close_reason=None: [{"id": i} for i in ids])
+
+
+def test_phase_two_target_counts_from_phase_start(monkeypatch):
+    accounts = FakeAccounts(balance=SIZE * 1.10)
+    install(monkeypatch, accounts)
+
+    flagged, applied = risk.run_risk_pass()
+    assert flagged["outcome"].tolist() == [risk.PROFIT_TARGET]
+    assert applied["phase_changed"] == 1
+    assert accounts.row["phase"] == 2
+
+    # Same balance on the next pass: phase 2 has made no profit yet.
+    flagged, applied = risk.run_risk_pass()
+    assert flagged.empty
+    assert not accounts.in_review
+
+    accounts.row["balance"] = SIZE * 1.10 + SIZE * 0.10
+    flagged, applied = risk.run_risk_pass()
+    assert flagged["outcome"].tolist() == [risk.PROFIT_TARGET]
+    assert applied["in_review"] == 1
+
+
+def test_snapshot_without_phase_start_uses_account_size():
+    snapshot = FakeAccounts(balance=SIZE * 1.10).snapshot().drop(columns="phase_start_balance")
+    results = risk.evaluate(snapshot)
+    assert results["outcome"].tolist() == [risk.PROFIT_TARGET]
+    assert results["profit"].tolist() == [SIZE * 0.10]
+
+
+def test_dashboard_and_risk_pass_agree_on_phase_two_target():
+    from veilon_core.analytics import target_badge, trade_stats
+
+    # Phase 1 passed at 11,000; phase 2 has made 100 of its 1,000 since.
+    accounts = FakeAccounts(balance=SIZE * 1.11)
+    accounts.row.update(phase=2, phase_start_balance=SIZE * 1.10)
+    trades = pd.DataFrame({
+        "id": [1, 2],
+        "open_time": pd.to_datetime(["2026-01-05 10:00", "2026-02-03 10:00"], utc=True),
+        "close_time": pd.to_datetime(["2026-01-05 12:00", "2026-02-03 12:00"], utc=True),
+        "profit": [SIZE * 0.10, SIZE * 0.01],
+    })
+
+    assert risk.evaluate(accounts.snapshot())["outcome"].tolist() == [risk.OK]
+    stats = trade_stats(trades, SIZE, phase_start_balance=accounts.row["phase_start_balance"])
+    assert stats.balance == pytest.approx(accounts.row["balance"])
+    assert stats.phase_profit == pytest.approx(SIZE * 0.01)
+    assert target_badge(stats) == ("On Track", "green")
+    assert stats.profit_progress == pytest.approx(0.1)
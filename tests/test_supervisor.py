@@ -0,0 +1,129 @@
+from veilon_core import supervisor as sup
+from veilon_core.trackers import TrackedAccount
+
+
+class FakeProcess:
+    def __init__(self):
+        self.alive = True
+        self.exitcode = None
+
+    def is_alive(self):
+        return self.alive
+
+    def start(self):
+        pass
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        self.alive = False
+        self.exitcode = -15
+
+
+class FakeQueue(list):
+    def put(self, item):
+        self.append(item)
+
+
+class Workers:
+    """Plays the worker side: who is writing which account right now."""
+
+    def __init__(self, supervisor: sup.Supervisor):
+        self.supervisor = supervisor
+        self.writing: dict[str, set[int]] = {}
+
+    def start(self, worker):
+        worker.commands = FakeQueue()
+        worker.process = FakeProcess()
+        self.writing[worker.name] = set()
+        if worker.accounts:
+            worker.commands.put(("track", list(worker.accounts.items())))
+
+    def drain(self, name, ack=True):
+        """Apply the worker's queued commands; acknowledge untracks if `ack`."""
+        worker = self.supervisor._workers[name]
+        for command, arg in worker.commands:
+            if command == "track":
+                self.writing[name].update(a for a, _ in arg)
+            elif command == "untrack" and ack:
+                self.writing[name].difference_update(arg)
+                self.supervisor._released_by(name, arg)
+        worker.commands.clear()
+
+    def drain_all(self, ack=True):
+        for name in list(self.supervisor._workers):
+            self.drain(name, ack)
+
+    def assert_single_writer(self):
+        seen: dict[int, str] = {}
+        for name, accounts in self.writing.items():
+            for account_id in accounts:
+                assert account_id not in seen, f"{account_id} written by {seen[account_id]} and {name}"
+                seen[account_id] = name
+
+
+def make(monkeypatch, workers: int, accounts: int):
+    supervisor = sup.Supervisor(
+        workers,
+        accounts_source=lambda: [TrackedAccount(i, f"meta-{i}") for i in range(1, accounts + 1)],
+    )
+    fake = Workers(supervisor)
+    monkeypatch.setattr(supervisor, "_start_worker", fake.start)
+    supervisor._check_workers()
+    supervisor.refresh()
+    fake.drain_all()
+    return supervisor, fake
+
+
+def test_moved_accounts_wait_for_release(monkeypatch):
+    supervisor, fake = make(monkeypatch, workers=2, accounts=200)
+    assert sum(map(len, fake.writing.values())) == 200
+
+    supervisor.resize(3)
+    supervisor._check_workers()                  # starts worker-2
+    moving = set(supervisor._releasing)
+    assert moving and not supervisor._workers["worker-2"].accounts
+    fake.drain("worker-2")
+    fake.drain("worker-0", ack=False)
+    fake.drain("worker-1", ack=False)
+    assert not fake.writing["worker-2"]          # old owners have not let go yet
+    fake.assert_single_writer()
+
+    supervisor._released_by("worker-0", [a for a in moving if a in fake.writing["worker-0"]])
+    supervisor._released_by("worker-1", [a for a in moving if a in fake.writing["worker-1"]])
+    for name in ("worker-0", "worker-1"):
+        fake.writing[name] -= moving
+    fake.drain_all()
+    fake.assert_single_writer()
+    assert fake.writing["worker-2"] == moving
+    assert not supervisor._releasing
+    assert sum(map(len, fake.writing.values())) == 200
+
+
+def test_dead_worker_releases_at_once(monkeypatch):
+    supervisor, fake = make(monkeypatch, workers=2, accounts=200)
+    supervisor.resize(3)
+    supervisor._check_workers()
+    fake.drain_all(ack=False)
+    dead = supervisor._workers["worker-0"]
+    dead.process.alive = False
+    fake.writing["worker-0"].clear()
+    supervisor._check_workers()                  # restarts worker-0 and hands its moves over
+    fake.drain_all(ack=False)
+    fake.assert_single_writer()
+    assert all(source != "worker-0" for source, _ in supervisor._releasing.values())
+
+
+def test_stalled_release_terminates_worker(monkeypatch):
+    supervisor, fake = make(monkeypatch, workers=2, accounts=200)
+    supervisor.resize(3)
+    supervisor._check_workers()
+    fake.drain_all(ack=False)
+    stalled = {source for source, _ in supervisor._releasing.values()}
+    old = {name: supervisor._workers[name].process for name in stalled}
+    supervisor._releasing = {a: (s, since - sup.HANDOFF_TIMEOUT - 1) for a, (s, since) in supervisor._releasing.items()}
+    supervisor._check_workers()
+    assert supervisor.stats()["handoff_timeouts"] == len(stalled)
+    assert all(not process.alive for process in old.values())
+    assert not supervisor._releasing
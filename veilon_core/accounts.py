@@ -1,10 +1,35 @@
 from __future__ import annotations
+import json
+import logging
 from typing import Any, Optional, Sequence
-from veilon_core.db import execute_query
+from veilon_core.cache import TTLCache
+from veilon_core.db import execute_query, query_frame, transaction
+from veilon_core.events import EventQueueFull, get_event_writer
+from veilon_core.listener import LISTEN_NOTIFY, on_change
 from psycopg2.extras import Json
 import streamlit as st
+import numpy as np
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
+# SQL twin of `derive_status` (same precedence), over `accounts` aliased as `a`.
+# Keep the two in sync.
+STATUS_SQL = """
+    CASE
+        WHEN a.closed_at IS NOT NULL THEN 'Closed'
+        WHEN a.in_review IS TRUE THEN 'In Review'
+        WHEN a.is_enabled IS NOT TRUE THEN 'Disabled'
+        WHEN a.is_funded IS TRUE OR a.funded_at IS NOT NULL THEN 'Funded'
+        ELSE 'Phase ' || COALESCE(a.phase::int, 1)
+    END
+"""
+
+def _is_true(value) -> bool:
+    # Accepts Python and NumPy booleans; None / NaN count as False.
+    return value is not None and bool(value == True)  # noqa: E712
+
+
 def derive_status(row) -> str:
     """
     Canonical account status resolver.
@@ -16,7 +41,7 @@ def derive_status(row) -> str:
         return "Closed"
 
     # 2. In-review overrides enabled/disabled
-    if row.get("in_review") is True:
+    if _is_true(row.get("in_review")):
         return "In Review"
 
     # 3. Disabled (only if not closed / in-review)
@@ -24,7 +49,7 @@ def derive_status(row) -> str:
         return "Disabled"
 
     # 4. Funded
-    if row.get("is_funded") is True or pd.notna(row.get("funded_at")):
+    if _is_true(row.get("is_funded")) or pd.notna(row.get("funded_at")):
         return "Funded"
 
     # 5. Phase fallback
@@ -32,78 +57,238 @@ def derive_status(row) -> str:
     return f"Phase {int(phase)}" if pd.notna(phase) else "Phase 1"
 
 
-def accounts_table(
+def derive_status_frame(accounts_df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized `derive_status` for a whole accounts frame (same precedence),
+    for in-memory use; prefer STATUS_SQL when the rows come from Postgres.
+    """
+    index = accounts_df.index
+
+    def col(name: str, default=None) -> pd.Series:
+        if name in accounts_df:
+            return accounts_df[name]
+        return pd.Series(default, index=index, dtype=object)
+
+    is_enabled = col("is_enabled", True)
+    phase = pd.to_numeric(col("phase"), errors="coerce").fillna(1).astype(int)
+
+    status = np.select(
+        [
+            col("closed_at").notna().to_numpy(),
+            col("in_review").eq(True).to_numpy(),
+            (is_enabled.isna() | is_enabled.eq(False)).to_numpy(),
+            (col("is_funded").eq(True) | col("funded_at").notna()).to_numpy(),
+        ],
+        ["Closed", "In Review", "Disabled", "Funded"],
+        default=("Phase " + phase.astype(str)).to_numpy(dtype=object),
+    )
+    return pd.Series(status, index=index, dtype=object)
+
+
+# Columns shown in the admin grid, in display order. The inner query exposes
+# `status` as a regular column so it can be filtered and sorted on.
+_ACCOUNTS_GRID_SQL = f"""
+    SELECT *
+    FROM (
+        SELECT
+            a.id,
+            a.user_id,
+            a.order_id,
+            a.plan_id,
+            a.balance,
+            {STATUS_SQL} AS status,
+            a.created_at,
+            a.funded_at,
+            a.closed_at,
+            a.notes
+        FROM accounts a
+        WHERE (%s IS NULL OR a.user_id = %s)
+          AND (%s IS NULL OR a.plan_id = %s)
+    ) a
+    WHERE (%s IS NULL OR a.status = %s)
+      AND (
+          %s IS NULL
+          OR a.notes ILIKE %s
+          OR a.id::text = %s
+          OR a.user_id::text = %s
+          OR a.order_id::text = %s
+      )
+"""
+
+DISPLAY_COLUMNS = [
+    "id",
+    "user_id",
+    "order_id",
+    "plan_id",
+    "balance",
+    "status",
+    "created_at",
+    "funded_at",
+    "closed_at",
+    "notes",
+]
+
+COLUMN_LABELS = {
+    "id": "Account ID",
+    "user_id": "User ID",
+    "order_id": "Order ID",
+    "plan_id": "Plan ID",
+    "balance": "Balance",
+    "status": "Status",
+    "created_at": "Opened At",
+    "funded_at": "Funded At",
+    "closed_at": "Closed At",
+    "notes": "Notes",
+}
+
+
+def _grid_params(user_id, status, plan_id, search) -> tuple:
+    term = (search or "").strip() or None
+    pattern = None
+    if term is not None:
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+    return (user_id, user_id, plan_id, plan_id, status, status, term, pattern, term, term, term)
+
+
+def accounts_page(
+    *,
     user_id: Optional[int] = None,
-    status: Optional[str] = None,      # "Phase 1" | "Funded" | "In Review" | "Closed" | "Disabled"
+    status: Optional[str] = None,
     plan_id: Optional[int] = None,
-):
-    accounts_rows = execute_query(
-        """
-        SELECT *
-        FROM accounts
-        WHERE (%s IS NULL OR user_id = %s)
-          AND (%s IS NULL OR plan_id = %s)
-        ;
+    search: Optional[str] = None,
+    sort_by: str = "id",
+    descending: bool = False,
+    after: Optional[tuple[Any, int]] = None,
+    limit: int = 50,
+) -> tuple[pd.DataFrame, Optional[tuple[Any, int]]]:
+    """
+    One keyset-paginated page of the admin accounts grid.
+
+    Rows are ordered by `sort_by` (NULLs last) then `id`, and `after` is the
+    (sort value, id) of the last row of the previous page, so every page
+    costs the same however deep it is (given an index on the sort column).
+
+    Returns (page, cursor for the next page or None on the last page).
+    """
+    if sort_by not in DISPLAY_COLUMNS:
+        raise ValueError(f"Cannot sort accounts by {sort_by!r}.")
+
+    direction = "DESC" if descending else "ASC"
+    op = "<" if descending else ">"
+    sort_sql = f"a.{sort_by}"
+
+    seek_sql, seek_params = "TRUE", ()
+    if after is not None:
+        value, last_id = after
+        if sort_by == "id":
+            seek_sql, seek_params = f"a.id {op} %s", (last_id,)
+        elif value is None:
+            seek_sql, seek_params = f"({sort_sql} IS NULL AND a.id {op} %s)", (last_id,)
+        else:
+            seek_sql = f"({sort_sql} {op} %s OR ({sort_sql} = %s AND a.id {op} %s) OR {sort_sql} IS NULL)"
+            seek_params = (value, value, last_id)
+
+    page = query_frame(
+        f"""
+        {_ACCOUNTS_GRID_SQL}
+          AND {seek_sql}
+        ORDER BY {sort_sql} {direction} NULLS LAST, a.id {direction}
+        LIMIT %s;
         """,
-        (user_id, user_id, plan_id, plan_id),
+        (*_grid_params(user_id, status, plan_id, search), *seek_params, limit + 1),
+        category_max_ratio=0,
     )
 
-    accounts_df = pd.DataFrame(accounts_rows)
+    if len(page) <= limit:
+        return page, None
 
-    if accounts_df.empty:
-        st.info("No accounts found.")
-        # Keep selection state consistent
-        if st.session_state.get("has_accounts_selection") or st.session_state.get("selected_account_ids"):
-            st.session_state["has_accounts_selection"] = False
-            st.session_state["selected_account_ids"] = []
-        return
+    page = page.iloc[:limit]
+    last = page.iloc[-1]
+    # Back to plain Python values so psycopg2 can bind them.
+    value = last[sort_by]
+    if pd.isna(value):
+        value = None
+    elif isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    elif hasattr(value, "item"):
+        value = value.item()
+    return page, (value, int(last["id"]))
 
-    accounts_df["status"] = accounts_df.apply(derive_status, axis=1)
 
-    if status is not None:
-        accounts_df = accounts_df[accounts_df["status"] == status]
+# The grid reruns on every click; its total only has to be roughly current.
+GRID_COUNT_TTL = 30   # seconds
 
-        if accounts_df.empty:
-            st.info("No accounts match the selected status.")
-            st.session_state["has_accounts_selection"] = False
-            st.session_state["selected_account_ids"] = []
-            return
+_grid_count_cache = TTLCache("accounts_grid_count", ttl=GRID_COUNT_TTL, maxsize=1_000)
 
 
+def accounts_count_estimate(
+    *,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    plan_id: Optional[int] = None,
+    search: Optional[str] = None,
+    exact_below: int = 10_000,
+) -> int:
+    """
+    Planner estimate of how many accounts match the grid filters, refined
+    with an exact COUNT(*) when the estimate is small enough to be cheap.
+    Cached per filter set for GRID_COUNT_TTL seconds.
+    """
+    params = _grid_params(user_id, status, plan_id, search)
+    key = (params, exact_below)
+    total = _grid_count_cache.get(key)
+    if total is not None:
+        return total
+
+    rows = execute_query(f"EXPLAIN (FORMAT JSON) {_ACCOUNTS_GRID_SQL};", params)
+    if not rows:
+        return 0   # not cached: may be a swallowed database error
+    total = int(rows[0]["QUERY PLAN"][0]["Plan"]["Plan Rows"])
 
-    DISPLAY_COLUMNS = [
-        "id",
-        "user_id",
-        "order_id",
-        "plan_id",
-        "balance",
-        "status",
-        "created_at",
-        "funded_at",
-        "closed_at",
-        "notes",
-    ]
-
-    COLUMN_LABELS = {
-        "id": "Account ID",
-        "user_id": "User ID",
-        "order_id": "Order ID",
-        "plan_id": "Plan ID",
-        "balance": "Balance",
-        "status": "Status",
-        "created_at": "Opened At",
-        "funded_at": "Funded At",
-        "closed_at": "Closed At",
-        "notes": "Notes",
-    }
+    if total < exact_below:
+        rows = execute_query(f"SELECT COUNT(*) AS n FROM ({_ACCOUNTS_GRID_SQL}) AS matched;", params)
+        if not rows:
+            return total
+        total = int(rows[0]["n"])
+    _grid_count_cache.set(key, total)
+    return total
+
+
+def accounts_table(
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,      # "Phase 1" | "Funded" | "In Review" | "Closed" | "Disabled"
+    plan_id: Optional[int] = None,
+    *,
+    page_size: Optional[int] = None,   # set to render a keyset-paginated, searchable grid
+):
+    if page_size is not None:
+        accounts_df = _accounts_grid_controls(user_id, status, plan_id, page_size)
+    else:
+        # Status is derived and filtered in SQL, and only displayed columns
+        # are transferred.
+        accounts_df = query_frame(
+            f"{_ACCOUNTS_GRID_SQL};",
+            _grid_params(user_id, status, plan_id, None),
+        )
+
+    if accounts_df.empty:
+        st.info("No accounts found." if status is None else "No accounts match the selected status.")
+        # Keep selection state consistent
+        if st.session_state.get("has_accounts_selection") or st.session_state.get("selected_account_ids"):
+            st.session_state["has_accounts_selection"] = False
+            st.session_state["selected_account_ids"] = []
+        return
 
     df = accounts_df.loc[:, DISPLAY_COLUMNS].copy()
     df = df.rename(columns=COLUMN_LABELS)
+    # Row positions -> account ids, for the selection callback.
+    st.session_state["accounts_df_ids"] = df["Account ID"].tolist()
 
-    table = st.dataframe(
+    st.dataframe(
         df,
         key="accounts_df",
-        on_select="rerun",
+        on_select=_sync_accounts_selection,
         selection_mode=["single-row"],
         hide_index=True,
         column_config={
@@ -119,21 +304,69 @@ def accounts_table(
         },
     )
 
-    selected_rows = table.selection.get("rows", [])
-    current_is_selected = bool(selected_rows)
 
-    selected_ids = df.iloc[selected_rows]["Account ID"].tolist() if selected_rows else []
+def _sync_accounts_selection():
+    # Runs before the rerun the selection triggers, so widgets drawn above
+    # the grid already see the new selection: no second run needed.
+    rows = st.session_state["accounts_df"]["selection"]["rows"]
+    ids = st.session_state.get("accounts_df_ids", [])
+    selected_ids = [ids[r] for r in rows if r < len(ids)]
+    st.session_state["has_accounts_selection"] = bool(selected_ids)
+    st.session_state["selected_account_ids"] = selected_ids
 
-    # ---- Sync + force rerun once on change ----
-    state_changed = (
-        current_is_selected != st.session_state.get("has_accounts_selection", False)
-        or selected_ids != st.session_state.get("selected_account_ids", [])
+
+def _accounts_grid_controls(
+    user_id: Optional[int],
+    status: Optional[str],
+    plan_id: Optional[int],
+    page_size: int,
+) -> pd.DataFrame:
+    """
+    Search / sort / pager widgets for the paginated grid; returns the
+    current page. Cursors of visited pages are kept in session_state so
+    "Previous" is a lookup, not a rescan.
+    """
+    with st.container(border=False, horizontal=True, vertical_alignment="bottom"):
+        search = st.text_input("Search", key="accounts_grid_search", placeholder="Notes, account, user or order ID")
+        sort_label = st.selectbox(
+            "Sort by",
+            options=[COLUMN_LABELS[c] for c in DISPLAY_COLUMNS],
+            key="accounts_grid_sort",
+        )
+        descending = st.toggle("Descending", key="accounts_grid_desc")
+
+    sort_by = next(c for c, label in COLUMN_LABELS.items() if label == sort_label)
+
+    # Any change of filters or ordering starts again from the first page.
+    signature = (user_id, status, plan_id, search, sort_by, descending, page_size)
+    if st.session_state.get("accounts_grid_signature") != signature:
+        st.session_state["accounts_grid_signature"] = signature
+        st.session_state["accounts_grid_cursors"] = [None]
+
+    cursors = st.session_state["accounts_grid_cursors"]
+
+    page, next_cursor = accounts_page(
+        user_id=user_id,
+        status=status,
+        plan_id=plan_id,
+        search=search,
+        sort_by=sort_by,
+        descending=descending,
+        after=cursors[-1],
+        limit=page_size,
     )
+    total = accounts_count_estimate(user_id=user_id, status=status, plan_id=plan_id, search=search)
 
-    if state_changed:
-        st.session_state["has_accounts_selection"] = current_is_selected
-        st.session_state["selected_account_ids"] = selected_ids
-        st.rerun()
+    with st.container(border=False, horizontal=True, vertical_alignment="center"):
+        st.caption(f"Page {len(cursors)} · ~{total:,} accounts")
+        st.space("stretch")
+        # Callbacks run before the click's rerun, which then renders the new page.
+        st.button("", key="accounts_grid_prev", icon=":material/chevron_left:", disabled=len(cursors) == 1,
+                  on_click=cursors.pop)
+        st.button("", key="accounts_grid_next", icon=":material/chevron_right:", disabled=next_cursor is None,
+                  on_click=cursors.append, args=(next_cursor,))
+
+    return page
 
 
 def _one(rows: Sequence[dict], err: str) -> dict:
@@ -142,16 +375,59 @@ def _one(rows: Sequence[dict], err: str) -> dict:
     return rows[0]
 
 
-def account_get(account_id: int) -> dict:
-    rows = execute_query(
-        """
-        SELECT *
-        FROM accounts
-        WHERE id = %s;
-        """,
-        (account_id,),
+# -------------------------------------------------------------------
+# Read-through caches. Every write in this module goes through
+# `_write_with_event`, which invalidates the touched account and its owner.
+# -------------------------------------------------------------------
+# With LISTEN/NOTIFY on, writes from other processes invalidate too, so
+# entries can live much longer.
+ACCOUNT_CACHE_TTL = 600 if LISTEN_NOTIFY else 30   # seconds
+ACCOUNT_CACHE_MAXSIZE = 10_000
+
+_account_cache = TTLCache("accounts", ttl=ACCOUNT_CACHE_TTL, maxsize=ACCOUNT_CACHE_MAXSIZE)
+_user_accounts_cache = TTLCache("user_accounts", ttl=ACCOUNT_CACHE_TTL, maxsize=ACCOUNT_CACHE_MAXSIZE)
+
+
+def invalidate_account_caches(
+    account_ids: Sequence[int] = (),
+    user_ids: Sequence[int] = (),
+):
+    """Drop cached rows for these accounts / users (for writes made outside this module)."""
+    _account_cache.invalidate(*account_ids)
+    _user_accounts_cache.invalidate(*user_ids)
+
+
+def _on_account_change(payload: dict):
+    # Row triggers send one `id`; bulk syncs send `ids` (account_sync_balances).
+    ids = payload.get("ids") or ([payload["id"]] if payload.get("id") is not None else [])
+    invalidate_account_caches(
+        ids,
+        [u for u in (payload.get("user_id"), payload.get("old_user_id")) if u is not None],
     )
-    return _one(rows, f"Account {account_id} not found.")
+
+
+def _reset_account_caches():
+    _account_cache.clear()
+    _user_accounts_cache.clear()
+
+
+on_change("accounts", _on_account_change, reset=_reset_account_caches)
+
+
+def account_get(account_id: int) -> dict:
+    def load() -> dict:
+        rows = execute_query(
+            """
+            SELECT *
+            FROM accounts
+            WHERE id = %s;
+            """,
+            (account_id,),
+        )
+        return _one(rows, f"Account {account_id} not found.")
+
+    # Copies, so callers can't mutate the cached row.
+    return dict(_account_cache.get_or_load(account_id, load))
 
 
 def account_event_log(
@@ -163,6 +439,17 @@ def account_event_log(
     event_status: Optional[str] = None,
     payload: Optional[dict[str, Any]] = None,
 ) -> dict:
+    writer = get_event_writer()
+    if writer is not None:
+        return writer.submit(
+            account_id,
+            event_type=event_type,
+            actor_type=actor_type,
+            actor_id=actor_id,
+            event_status=event_status,
+            payload=payload,
+        )
+
     rows = execute_query(
         """
         INSERT INTO account_events (account_id, event_type, event_status, actor_type, actor_id, payload)
@@ -174,6 +461,115 @@ def account_event_log(
     return _one(rows, "Failed to write account event.")
 
 
+def _write_with_event(
+    statement: str,
+    params: Sequence[Any],
+    *,
+    event_type: str,
+    actor_type: str = "system",
+    actor_id: Optional[int] = None,
+    payload: Optional[dict[str, Any]] = None,
+    payload_columns: Optional[dict[str, str]] = None,
+) -> list[dict]:
+    """
+    Run an INSERT/UPDATE ... RETURNING on `accounts` and write the matching
+    account_events row in the same statement: one round trip, one commit,
+    and no event without its mutation (or vice versa).
+
+    `statement` must RETURN the account `id`. `payload_columns` maps payload
+    keys to SQL expressions over the written row `w`, for values only known
+    after the write (e.g. the new balance).
+
+    With the buffered event writer enabled, the statement only builds each
+    event payload and the events are queued instead of inserted (see
+    `_queue_events`).
+    """
+    extra = ", ".join(f"'{key}', {expr}" for key, expr in (payload_columns or {}).items())
+    payload_sql = f"%s::jsonb || jsonb_build_object({extra})" if extra else "%s::jsonb"
+
+    # The outer SELECT sees the pre-write snapshot, which is enough to find
+    # each account's owner (LEFT JOIN: inserted rows carry their own user_id).
+    owner_sql = "COALESCE(o.user_id, (to_jsonb(w) ->> 'user_id')::bigint) AS _owner_id"
+    owner_join = "LEFT JOIN accounts o ON o.id = w.id"
+
+    writer = get_event_writer()
+    if writer is not None:
+        rows = execute_query(
+            f"""
+            WITH written AS (
+                {statement}
+            )
+            SELECT w.*, {payload_sql} AS _event_payload, {owner_sql}
+            FROM written w
+            {owner_join};
+            """,
+            (*params, Json(payload or {})),
+        )
+    else:
+        rows = execute_query(
+            f"""
+            WITH written AS (
+                {statement}
+            ),
+            logged AS (
+                INSERT INTO account_events (account_id, event_type, event_status, actor_type, actor_id, payload)
+                SELECT w.id, %s, NULL, %s, %s, {payload_sql}
+                FROM written w
+            )
+            SELECT w.*, {owner_sql}
+            FROM written w
+            {owner_join};
+            """,
+            (*params, event_type, actor_type, actor_id, Json(payload or {})),
+        )
+
+    try:
+        if writer is not None:
+            _queue_events(writer, rows, event_type=event_type, actor_type=actor_type, actor_id=actor_id)
+    finally:
+        # The write has committed: the caches must drop it whatever happens.
+        owners = [row.pop("_owner_id") for row in rows]
+        invalidate_account_caches(
+            [row["id"] for row in rows],
+            [owner for owner in owners if owner is not None],
+        )
+    return rows
+
+
+_INSERT_EVENTS_SQL = """
+    INSERT INTO account_events (account_id, event_type, event_status, actor_type, actor_id, payload)
+    SELECT e.account_id, %s, NULL, %s, %s, e.payload
+    FROM unnest(%s::bigint[], %s::jsonb[]) AS e(account_id, payload);
+"""
+
+
+def _queue_events(writer, rows: list[dict], *, event_type: str, actor_type: str, actor_id: Optional[int]):
+    """
+    Queue one event per written row. The write has already committed, so a
+    full queue must not fail it: the events that do not fit are inserted
+    directly instead.
+    """
+    events = [(row["id"], row.pop("_event_payload")) for row in rows]
+    for i, (account_id, event_payload) in enumerate(events):
+        try:
+            writer.submit(
+                account_id,
+                event_type=event_type,
+                actor_type=actor_type,
+                actor_id=actor_id,
+                payload=event_payload,
+            )
+        except EventQueueFull as e:
+            rest = events[i:]
+            logger.warning("%s; inserting %d account events directly.", e, len(rest))
+            execute_query(
+                _INSERT_EVENTS_SQL,
+                (event_type, actor_type, actor_id, [a for a, _ in rest], [Json(p) for _, p in rest]),
+                fetch_results=False,
+            )
+            return
+
+
 def account_create(
     user_id: int,
     plan_id: int,
@@ -182,20 +578,15 @@ def account_create(
     actor_type: str = "system",
     actor_id: Optional[int] = None,
 ) -> dict:
-    rows = execute_query(
+    rows = _write_with_event(
         """
         INSERT INTO accounts (user_id, plan_id, is_enabled, balance, phase)
         SELECT %s, p.id, %s, p.account_size, 1
         FROM plans p
         WHERE p.id = %s
-        RETURNING id, user_id, plan_id, is_enabled, balance, phase;
+        RETURNING id, user_id, plan_id, is_enabled, balance, phase
         """,
         (user_id, is_enabled, plan_id),
-    )
-    account = _one(rows, f"Plan {plan_id} not found. Account was not created.")
-
-    account_event_log(
-        account["id"],
         event_type="account.created",
         actor_type=actor_type,
         actor_id=actor_id,
@@ -203,89 +594,68 @@ def account_create(
             "user_id": user_id,
             "plan_id": plan_id,
             "is_enabled": is_enabled,
-            "initial_balance": str(account["balance"]),
-            "initial_phase": account["phase"],
+        },
+        payload_columns={
+            "initial_balance": "w.balance::text",
+            "initial_phase": "w.phase",
         },
     )
-
-    return account
+    return _one(rows, f"Plan {plan_id} not found. Account was not created.")
 
 
 def account_toggle_active(account_id: int) -> dict:
     """
     Toggle an account's is_enabled flag atomically in SQL.
     """
-    rows = execute_query(
+    rows = _write_with_event(
         """
         UPDATE accounts
         SET is_enabled = NOT COALESCE(is_enabled, FALSE)
         WHERE id = %s
-        RETURNING id, is_enabled;
+        RETURNING id, is_enabled
         """,
         (account_id,),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.is_enabled.toggled",
-        actor_type="system",
-        actor_id=None,
-        payload={"is_enabled": account["is_enabled"]},
+        payload_columns={"is_enabled": "w.is_enabled"},
     )
-
-    return account
+    return _one(rows, f"Account {account_id} not found.")
 
 
 def account_set_note(account_id: int, note: str, admin_user_id: int) -> dict:
-    rows = execute_query(
+    rows = _write_with_event(
         """
         UPDATE accounts
         SET notes = %s,
             notes_updated_at = NOW(),
             notes_updated_by_user_id = %s
         WHERE id = %s
-        RETURNING id, notes, notes_updated_at, notes_updated_by_user_id;
+        RETURNING id, notes, notes_updated_at, notes_updated_by_user_id
         """,
         (note, admin_user_id, account_id),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.note.set",
         actor_type="admin",
         actor_id=admin_user_id,
         payload={"note": note},
     )
-
-    return account
+    return _one(rows, f"Account {account_id} not found.")
 
 
 def account_set_balance(account_id: int, new_balance: float) -> dict:
     """
     Hard set the balance.
     """
-    rows = execute_query(
+    rows = _write_with_event(
         """
         UPDATE accounts
         SET balance = %s
         WHERE id = %s
-        RETURNING id, balance;
+        RETURNING id, balance
         """,
         (new_balance, account_id),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.balance.set",
-        actor_type="system",
-        actor_id=None,
         payload={"new_balance": new_balance},
     )
-
-    return account
+    return _one(rows, f"Account {account_id} not found.")
 
 
 def account_adjust_balance(account_id: int, delta: float) -> dict:
@@ -293,95 +663,71 @@ def account_adjust_balance(account_id: int, delta: float) -> dict:
     Adjust balance by a signed delta:
     +100 = deposit, -200 = withdrawal.
     """
-    rows = execute_query(
+    rows = _write_with_event(
         """
         UPDATE accounts
         SET balance = COALESCE(balance, 0) + %s
         WHERE id = %s
-        RETURNING id, balance;
+        RETURNING id, balance
         """,
         (delta, account_id),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.balance.adjusted",
-        actor_type="system",
-        actor_id=None,
-        payload={"delta": delta, "new_balance": float(account["balance"])},
+        payload={"delta": delta},
+        payload_columns={"new_balance": "w.balance::float8"},
     )
-
-    return account
+    return _one(rows, f"Account {account_id} not found.")
 
 
 def account_change_phase(account_id: int, new_phase: int) -> dict:
-    rows = execute_query(
+    rows = _write_with_event(
         """
         UPDATE accounts
-        SET phase = %s
+        SET phase = %s,
+            phase_start_balance = balance
         WHERE id = %s
-        RETURNING id, phase;
+        RETURNING id, phase, phase_start_balance
         """,
         (new_phase, account_id),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.phase.changed",
-        actor_type="system",
-        actor_id=None,
         payload={"new_phase": new_phase},
+        payload_columns={"phase_start_balance": "w.phase_start_balance::float8"},
     )
-
-    return account
+    return _one(rows, f"Account {account_id} not found.")
 
 
-def account_close(account_id: int, *, close_reason: Optional[str] = None) -> dict:
-    rows = execute_query(
+def account_close(
+    account_id: int,
+    *,
+    close_reason: Optional[str] = None,
+    details: Optional[dict[str, Any]] = None,
+) -> dict:
+    """`details` is added to the event payload (e.g. the breach that closed it)."""
+    rows = _write_with_event(
         """
         UPDATE accounts
         SET closed_at = NOW()
         WHERE id = %s
-        RETURNING id, closed_at;
+        RETURNING id, closed_at
         """,
         (account_id,),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.closed",
-        actor_type="system",
-        actor_id=None,
-        payload={"close_reason": close_reason},
+        payload={"close_reason": close_reason, **(details or {})},
     )
-
-    return account
+    return _one(rows, f"Account {account_id} not found.")
 
 
 def account_reopen(account_id: int) -> dict:
-    rows = execute_query(
+    rows = _write_with_event(
         """
         UPDATE accounts
         SET closed_at = NULL
         WHERE id = %s
-        RETURNING id, closed_at;
+        RETURNING id, closed_at
         """,
         (account_id,),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.reopened",
-        actor_type="system",
-        actor_id=None,
-        payload={},
     )
-
-    return account
+    return _one(rows, f"Account {account_id} not found.")
 
 
 def account_set_in_review(
@@ -392,20 +738,16 @@ def account_set_in_review(
     reason: Optional[str] = None,
     actor_type: str = "admin",
     actor_id: Optional[int] = None,
+    details: Optional[dict[str, Any]] = None,
 ) -> dict:
-    rows = execute_query(
+    rows = _write_with_event(
         """
         UPDATE accounts
         SET in_review = %s
         WHERE id = %s
-        RETURNING id, in_review;
+        RETURNING id, in_review
         """,
         (in_review, account_id),
-    )
-    account = _one(rows, f"Account {account_id} not found.")
-
-    account_event_log(
-        account_id,
         event_type="account.review.updated",
         actor_type=actor_type,
         actor_id=actor_id,
@@ -413,21 +755,204 @@ def account_set_in_review(
             "in_review": in_review,
             "resolution": resolution,
             "reason": reason,
+            **(details or {}),
         },
     )
+    return _one(rows, f"Account {account_id} not found.")
 
-    return account
 
-def get_active_accounts_for_user(user_id: int) -> list[dict]:
-    return execute_query(
+# -------------------------------------------------------------------
+# Bulk mutations: one set-based statement per call, with every matching
+# account_events row written by the same statement (one multi-row INSERT).
+# Unknown IDs are skipped; the updated rows are returned.
+# -------------------------------------------------------------------
+def _unique_ids(account_ids: Sequence[int]) -> list[int]:
+    return list(dict.fromkeys(int(i) for i in account_ids))
+
+
+def account_close_many(account_ids: Sequence[int], *, close_reason: Optional[str] = None) -> list[dict]:
+    ids = _unique_ids(account_ids)
+    if not ids:
+        return []
+    return _write_with_event(
+        """
+        UPDATE accounts
+        SET closed_at = NOW()
+        WHERE id = ANY(%s::bigint[])
+        RETURNING id, closed_at
+        """,
+        (ids,),
+        event_type="account.closed",
+        payload={"close_reason": close_reason},
+    )
+
+
+def account_set_enabled_many(account_ids: Sequence[int], is_enabled: bool) -> list[dict]:
+    ids = _unique_ids(account_ids)
+    if not ids:
+        return []
+    return _write_with_event(
         """
-        SELECT 
-            id,
-            metaapi_account_id,
-            login
-        FROM accounts
-        WHERE user_id = %s
-        AND is_enabled = TRUE;
+        UPDATE accounts
+        SET is_enabled = %s
+        WHERE id = ANY(%s::bigint[])
+        RETURNING id, is_enabled
         """,
-        (user_id,),
-    ) or []
+        (is_enabled, ids),
+        event_type="account.is_enabled.set",
+        payload={"is_enabled": is_enabled},
+    )
+
+
+def account_change_phase_many(account_ids: Sequence[int], new_phase: int) -> list[dict]:
+    ids = _unique_ids(account_ids)
+    if not ids:
+        return []
+    return _write_with_event(
+        """
+        UPDATE accounts
+        SET phase = %s,
+            phase_start_balance = balance
+        WHERE id = ANY(%s::bigint[])
+        RETURNING id, phase, phase_start_balance
+        """,
+        (new_phase, ids),
+        event_type="account.phase.changed",
+        payload={"new_phase": new_phase},
+        payload_columns={"phase_start_balance": "w.phase_start_balance::float8"},
+    )
+
+
+def account_set_in_review_many(
+    account_ids: Sequence[int],
+    in_review: bool,
+    *,
+    reason: Optional[str] = None,
+    actor_type: str = "system",
+    actor_id: Optional[int] = None,
+) -> list[dict]:
+    ids = _unique_ids(account_ids)
+    if not ids:
+        return []
+    return _write_with_event(
+        """
+        UPDATE accounts
+        SET in_review = %s
+        WHERE id = ANY(%s::bigint[])
+        RETURNING id, in_review
+        """,
+        (in_review, ids),
+        event_type="account.review.updated",
+        actor_type=actor_type,
+        actor_id=actor_id,
+        payload={"in_review": in_review, "resolution": None, "reason": reason},
+    )
+
+
+def account_adjust_balance_many(deltas: dict[int, float]) -> list[dict]:
+    """
+    Adjust many balances at once, each by its own signed delta:
+    {account_id: delta}. Returned rows carry id, balance and delta.
+    """
+    if not deltas:
+        return []
+    ids = [int(i) for i in deltas]
+    amounts = [float(d) for d in deltas.values()]
+    return _write_with_event(
+        """
+        UPDATE accounts a
+        SET balance = COALESCE(a.balance, 0) + d.delta
+        FROM unnest(%s::bigint[], %s::numeric[]) AS d(id, delta)
+        WHERE a.id = d.id
+        RETURNING a.id, a.balance, d.delta
+        """,
+        (ids, amounts),
+        event_type="account.balance.adjusted",
+        payload_columns={
+            "delta": "w.delta::float8",
+            "new_balance": "w.balance::float8",
+        },
+    )
+
+
+def account_set_balance_many(balances: dict[int, float]) -> list[dict]:
+    """
+    Hard set many balances at once: {account_id: balance}. Accounts already
+    at that balance are left alone (no event); changed rows are returned.
+    """
+    if not balances:
+        return []
+    ids = [int(i) for i in balances]
+    amounts = [float(b) for b in balances.values()]
+    return _write_with_event(
+        """
+        UPDATE accounts a
+        SET balance = d.balance
+        FROM unnest(%s::bigint[], %s::numeric[]) AS d(id, balance)
+        WHERE a.id = d.id
+          AND a.balance IS DISTINCT FROM d.balance
+        RETURNING a.id, a.balance
+        """,
+        (ids, amounts),
+        event_type="account.balance.set",
+        payload_columns={"new_balance": "w.balance::float8"},
+    )
+
+
+# Account ids per summary notification: NOTIFY payloads are capped at 8000 bytes.
+_NOTIFY_IDS_PER_MESSAGE = 500
+
+
+def account_sync_balances(balances: dict[int, float]) -> list[int]:
+    """
+    Mirror broker balances (the streaming tracker's sync), {account_id:
+    balance}. Unlike account_set_balance_many this writes no account_events
+    and skips the per-row change notifications: one summary notification per
+    _NOTIFY_IDS_PER_MESSAGE changed accounts invalidates other processes'
+    caches. Returns the ids whose balance changed.
+    """
+    if not balances:
+        return []
+    ids = [int(i) for i in balances]
+    amounts = [float(b) for b in balances.values()]
+    with transaction() as tx:
+        tx.execute("SET LOCAL veilon.notify = 'off';", fetch_results=False)
+        rows = tx.execute(
+            """
+            UPDATE accounts a
+            SET balance = d.balance
+            FROM unnest(%s::bigint[], %s::numeric[]) AS d(id, balance)
+            WHERE a.id = d.id
+              AND a.balance IS DISTINCT FROM d.balance
+            RETURNING a.id;
+            """,
+            (ids, amounts),
+        )
+        changed = [int(r["id"]) for r in rows]
+        for i in range(0, len(changed), _NOTIFY_IDS_PER_MESSAGE):
+            payload = {"op": "UPDATE", "ids": changed[i:i + _NOTIFY_IDS_PER_MESSAGE]}
+            tx.execute("SELECT pg_notify('veilon_accounts', %s);", (json.dumps(payload),))
+    invalidate_account_caches(changed)
+    return changed
+
+
+def get_active_accounts_for_user(user_id: int) -> list[dict]:
+    rows = _user_accounts_cache.get(user_id)
+    if rows is None:
+        rows = execute_query(
+            """
+            SELECT 
+                id,
+                metaapi_account_id,
+                login
+            FROM accounts
+            WHERE user_id = %s
+            AND is_enabled = TRUE;
+            """,
+            (user_id,),
+        ) or []
+        # Empty results are not cached: they are cheap to re-check and may
+        # be a swallowed database error.
+        if rows:
+            _user_accounts_cache.set(user_id, rows)
+    return [dict(r) for r in rows]
@@ -0,0 +1,128 @@
+"""
+asyncio counterpart to veilon_core.db and the veilon_core query functions.
+
+psycopg2 is blocking, so each awaitable runs its query on a worker thread
+from an executor sized to the connection pool. Independent queries can then
+be awaited together and run concurrently, each on its own pooled connection:
+
+    user, plan = await asyncio.gather(
+        aio.get_user_by_email(email),
+        aio.get_plan_by_account_size(10_000),
+    )
+
+Streamlit pages (which are synchronous) use the `run` / `run_all` shims:
+
+    plan, buttons = aio.run_all(aio.get_plan_by_account_size(size), aio.execute_query(...))
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, TypeVar
+
+from veilon_core import accounts, coupons, daily_returns, db, plans, trades, users
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # One worker per pooled connection: more threads would only queue on the pool.
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=db.POOL_MAX_SIZE, thread_name_prefix="veilon-aio")
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Await a blocking veilon_core call on the shared DB executor."""
+    loop = asyncio.get_running_loop()
+    # Executor threads carry no Streamlit context: keep the caller's session
+    # so replica read-your-writes stickiness still applies.
+    session = db.session_key()
+
+    def call():
+        with db.bound_session(session):
+            return fn(*args, **kwargs)
+
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+def _to_async(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(fn, *args, **kwargs)
+
+    return wrapper
+
+
+# -------------------------------------------------------------------
+# Async API
+# -------------------------------------------------------------------
+execute_query = _to_async(db.execute_query)
+query_frame = _to_async(db.query_frame)
+
+get_user_by_email = _to_async(users.get_user_by_email)
+get_or_create_user_from_oidc = _to_async(users.get_or_create_user_from_oidc)
+
+account_get = _to_async(accounts.account_get)
+get_active_accounts_for_user = _to_async(accounts.get_active_accounts_for_user)
+
+get_trades_by_account_id = _to_async(trades.get_trades_by_account_id)
+get_trades_frame_by_account_id = _to_async(trades.get_trades_frame_by_account_id)
+get_trades_frame_incremental = _to_async(trades.get_trades_frame_incremental)
+
+get_daily_returns_frame = _to_async(daily_returns.get_daily_returns_frame)
+
+get_plan_by_account_size = _to_async(plans.get_plan_by_account_size)
+get_active_coupon_by_code = _to_async(coupons.get_active_coupon_by_code)
+
+
+# -------------------------------------------------------------------
+# Sync shims for Streamlit pages
+# -------------------------------------------------------------------
+def run(awaitable: Awaitable[T]) -> T:
+    """
+    Run an awaitable to completion from synchronous code.
+
+    Streamlit script threads have no running loop, so this is a plain
+    asyncio.run(); if a loop is already running in this thread, the
+    awaitable is run on a fresh loop in a helper thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_as_coroutine(awaitable))
+
+    result: dict[str, Any] = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(_as_coroutine(awaitable))
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, name="veilon-aio-run")
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def run_all(*awaitables: Awaitable[Any]) -> list[Any]:
+    """Await several independent queries concurrently and return their results in order."""
+    async def gather():
+        return await asyncio.gather(*awaitables)
+
+    return run(gather())
+
+
+async def _as_coroutine(awaitable: Awaitable[T]) -> T:
+    return await awaitable
@@ -0,0 +1,560 @@
+"""
+Historical deal backfill for newly linked accounts.
+
+The tracker only streams deals from the moment it subscribes, so when an
+account gets its `metaapi_account_id` its earlier trades must be loaded
+separately. This job does that, resumably and in parallel:
+
+- `BackfillStore.plan()` finds linked accounts without a backfill for their
+  current MetaAPI account and splits their history (from a day before
+  `accounts.created_at` to now) into BACKFILL_WINDOW_DAYS windows
+  (schema.SCHEMA["backfill"]).
+- `Backfill` leases pending windows, newest first, and fetches them
+  concurrently (BACKFILL_CONCURRENCY windows at once, at most
+  PER_ACCOUNT_CONCURRENCY per account), paging through each window's deals.
+- Each window is written in one transaction: its deals are COPYed into a
+  staging table, merged into `trade_deals` (keyed on the broker deal id, so
+  overlaps with the live tracker or a retried window are no-ops), the
+  touched positions' `trades` rows are rebuilt (trackers.rebuild_positions),
+  and the window is marked done. That commit is the checkpoint: an
+  interrupted run leaves no partial window, and the next run resumes with
+  the windows still pending. Expired leases (a crashed runner) are picked
+  up again, and several runners can share the queue.
+- Backfilled trades are older than what the trade caches have already
+  seen, so the watermark-based delta refresh (veilon_core.trades) would
+  never fetch them. A window that added deals sends one `full_reload`
+  notification for its account instead of a row-level one per trade, and
+  drops the account's cached history in this process.
+- A window that keeps failing is retried with backoff for up to
+  MAX_ATTEMPTS runs; its last error stays on the row.
+
+History sources: `MetaApiHistorySource` (metaapi-cloud-sdk RPC) for
+production and `HttpHistorySource`, which speaks MetaAPI's REST history
+endpoint, for the fake server in benchmarks/fake_history.py:
+
+    python -m veilon_core.backfill                          # MetaAPI, METAAPI_TOKEN
+    python -m veilon_core.backfill --account 42 --concurrency 16
+    python -m veilon_core.backfill --source http://127.0.0.1:8766 --watch 60
+"""
+from __future__ import annotations
+
+import abc
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from veilon_core import instrumentation
+from veilon_core.aio import run_blocking
+from veilon_core.db import db, transaction
+from veilon_core.instrumentation import timed
+from veilon_core.trackers import Deal, TrackedAccount, deal_row, parse_deal, rebuild_positions
+from veilon_core.trades import invalidate_trades_cache
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_WINDOW_DAYS = float(db.get("BACKFILL_WINDOW_DAYS", 7))
+BACKFILL_LOOKBACK_DAYS = int(db.get("BACKFILL_LOOKBACK_DAYS", 90))   # accounts without created_at
+BACKFILL_CONCURRENCY = int(db.get("BACKFILL_CONCURRENCY", 8))        # windows fetched at once
+PER_ACCOUNT_CONCURRENCY = 2        # windows of one account fetched at once (broker rate limits)
+PAGE_SIZE = 1000                   # MetaAPI's history page limit
+PAGE_RETRIES = 4
+PAGE_TIMEOUT = 60.0
+MAX_ATTEMPTS = 5                   # leases of one window before it is left to an operator
+LEASE_SECONDS = 600.0
+
+
+@dataclass(frozen=True)
+class Window:
+    account_id: int
+    metaapi_account_id: str
+    start: datetime
+    end: datetime
+    attempts: int = 0
+
+    @property
+    def account(self) -> TrackedAccount:
+        return TrackedAccount(self.account_id, self.metaapi_account_id)
+
+
+# -------------------------------------------------------------------
+# History sources
+# -------------------------------------------------------------------
+class HistoryUnavailable(Exception):
+    """The broker cannot serve this history yet (synchronizing, throttled, down): retry later."""
+
+
+class HistorySource(abc.ABC):
+    @abc.abstractmethod
+    async def deals(
+        self, account: TrackedAccount, start: datetime, end: datetime, offset: int, limit: int,
+    ) -> list[dict]:
+        """
+        One page of the account's MetaAPI deals with start <= time < end,
+        oldest first. Raise HistoryUnavailable for retryable failures.
+        """
+
+    async def close(self):
+        pass
+
+
+class MetaApiHistorySource(HistorySource):
+    def __init__(self, token: str, **options):
+        from metaapi_cloud_sdk import MetaApi  # optional dependency: production only
+
+        self._api = MetaApi(token, options or None)
+        self._connections: dict[str, asyncio.Task] = {}
+
+    async def _connection(self, metaapi_account_id: str):
+        task = self._connections.get(metaapi_account_id)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = self._connections[metaapi_account_id] = asyncio.ensure_future(self._connect(metaapi_account_id))
+        return await asyncio.shield(task)
+
+    async def _connect(self, metaapi_account_id: str):
+        remote = await self._api.metatrader_account_api.get_account(metaapi_account_id)
+        connection = remote.get_rpc_connection()
+        await connection.connect()
+        await connection.wait_synchronized()
+        return connection
+
+    async def deals(
+        self, account: TrackedAccount, start: datetime, end: datetime, offset: int, limit: int,
+    ) -> list[dict]:
+        connection = await self._connection(account.metaapi_account_id)
+        result = await connection.get_deals_by_time_range(start, end, offset, limit)
+        if result.get("synchronizing"):
+            raise HistoryUnavailable(f"{account.metaapi_account_id}: terminal history still synchronizing")
+        return result.get("deals") or []
+
+    async def close(self):
+        for task in self._connections.values():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                await task.result().close()
+        self._connections.clear()
+
+
+class HttpHistorySource(HistorySource):
+    """
+    MetaAPI's REST history endpoint (or the fake in benchmarks/fake_history.py):
+
+        GET {base_url}/users/current/accounts/{id}/history-deals/time/{start}/{end}?offset=&limit=
+        -> [ {...MetaAPI deal...}, ... ]
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: Optional[str] = None,
+        *,
+        timeout: float = PAGE_TIMEOUT,
+        max_requests: int = BACKFILL_CONCURRENCY,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        # urllib blocks: one thread per request in flight, apart from the
+        # DB executor and asyncio's small default pool.
+        self._executor = ThreadPoolExecutor(max_workers=max_requests, thread_name_prefix="veilon-history")
+
+    def _get(self, url: str) -> list[dict]:
+        request = urllib.request.Request(url, headers={"auth-token": self.token} if self.token else {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                if response.status == 202:   # MetaAPI: account not deployed / synchronized yet
+                    raise HistoryUnavailable(f"{url}: HTTP 202")
+                return json.load(response)
+        except urllib.error.HTTPError as exc:
+            if exc.code == 429 or exc.code >= 500:
+                raise HistoryUnavailable(f"{url}: HTTP {exc.code}") from exc
+            raise RuntimeError(f"{url}: HTTP {exc.code}") from exc
+        except (urllib.error.URLError, TimeoutError) as exc:
+            raise HistoryUnavailable(f"{url}: {exc}") from exc
+
+    async def deals(
+        self, account: TrackedAccount, start: datetime, end: datetime, offset: int, limit: int,
+    ) -> list[dict]:
+        url = "{}/users/current/accounts/{}/history-deals/time/{}/{}?{}".format(
+            self.base_url,
+            urllib.parse.quote(account.metaapi_account_id, safe=""),
+            _iso(start),
+            _iso(end),
+            urllib.parse.urlencode({"offset": offset, "limit": limit}),
+        )
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._get, url)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def source_from_url(url: str, concurrency: int = BACKFILL_CONCURRENCY) -> HistorySource:
+    """'metaapi' (token from METAAPI_TOKEN) or an http(s):// REST base URL."""
+    from veilon_core.config import METAAPI_TOKEN
+
+    if url == "metaapi":
+        if not METAAPI_TOKEN:
+            raise SystemExit("METAAPI_TOKEN is not set.")
+        return MetaApiHistorySource(METAAPI_TOKEN)
+    if url.startswith(("http://", "https://")):
+        return HttpHistorySource(url, METAAPI_TOKEN or None, max_requests=concurrency)
+    raise ValueError(f"Unknown history source: {url!r}")
+
+
+# -------------------------------------------------------------------
+# Checkpoint store
+# -------------------------------------------------------------------
+# Plan linked accounts that have no backfill for their current MetaAPI
+# account. Re-linking replans; the DO UPDATE condition keeps a concurrent
+# planner from resetting a plan that was just made.
+_PLAN_SQL = """
+    INSERT INTO account_backfills AS b (account_id, metaapi_account_id, history_from, history_to)
+    SELECT
+        a.id,
+        a.metaapi_account_id,
+        COALESCE(a.created_at, now() - make_interval(days => %(lookback)s)) - interval '1 day',
+        now()
+    FROM accounts a
+    WHERE a.metaapi_account_id IS NOT NULL
+      AND (%(ids)s::bigint[] IS NULL OR a.id = ANY(%(ids)s::bigint[]))
+      AND NOT EXISTS (
+          SELECT 1 FROM account_backfills x
+          WHERE x.account_id = a.id AND x.metaapi_account_id = a.metaapi_account_id
+      )
+    ON CONFLICT (account_id) DO UPDATE SET
+        metaapi_account_id = EXCLUDED.metaapi_account_id,
+        history_from       = EXCLUDED.history_from,
+        history_to         = EXCLUDED.history_to,
+        planned_at         = now(),
+        completed_at       = NULL
+    WHERE b.metaapi_account_id IS DISTINCT FROM EXCLUDED.metaapi_account_id
+    RETURNING b.account_id;
+"""
+
+_PLAN_WINDOWS_SQL = """
+    INSERT INTO account_backfill_windows (account_id, window_start, window_end)
+    SELECT b.account_id, s, LEAST(s + %(window)s, b.history_to)
+    FROM account_backfills b,
+         generate_series(b.history_from, b.history_to, %(window)s) AS s
+    WHERE b.account_id = ANY(%(ids)s::bigint[])
+      AND s < b.history_to;
+"""
+
+# Lease pending windows, newest first: recent trades matter most to the
+# dashboard and the risk rules. Each lease counts as an attempt, so a
+# window that crashes its runner is not retried forever.
+_CLAIM_SQL = """
+    UPDATE account_backfill_windows w
+    SET leased_until = now() + make_interval(secs => %(lease)s),
+        attempts     = w.attempts + 1
+    FROM account_backfills b
+    WHERE b.account_id = w.account_id
+      AND (w.account_id, w.window_start) IN (
+          SELECT account_id, window_start
+          FROM account_backfill_windows
+          WHERE done_at IS NULL
+            AND attempts < %(max_attempts)s
+            AND (leased_until IS NULL OR leased_until < now())
+          ORDER BY window_start DESC
+          LIMIT %(limit)s
+          FOR UPDATE SKIP LOCKED
+      )
+    RETURNING w.account_id, b.metaapi_account_id, w.window_start, w.window_end, w.attempts;
+"""
+
+# Session-local staging table for COPY; LIKE copies no constraints.
+_STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS backfill_deals (LIKE trade_deals) ON COMMIT DELETE ROWS;
+"""
+
+_DEAL_COLUMNS = "account_id, deal_id, position_id, entry, side, symbol, volume, price, profit, commission, swap, time"
+
+_COPY_SQL = f"COPY backfill_deals ({_DEAL_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+
+# Sorted: concurrent writers take unique-index locks in one order.
+_MERGE_SQL = f"""
+    INSERT INTO trade_deals ({_DEAL_COLUMNS})
+    SELECT {_DEAL_COLUMNS} FROM backfill_deals
+    ORDER BY account_id, deal_id
+    ON CONFLICT (account_id, deal_id) DO NOTHING
+    RETURNING account_id, position_id;
+"""
+
+# Rebuilt rows carry was_closed = false, which the trade caches take as
+# "the next delta refresh picks it up": silence them and send one full
+# reload per window instead. Delivered on commit.
+_SILENCE_SQL = "SET LOCAL veilon.notify = 'off';"
+_RELOAD_NOTIFY_SQL = "SELECT pg_notify('veilon_trades', %s);"
+
+_WINDOW_DONE_SQL = """
+    UPDATE account_backfill_windows
+    SET done_at = now(), deals = %s, leased_until = NULL, last_error = NULL
+    WHERE account_id = %s AND window_start = %s;
+"""
+
+# The plan row lock serializes windows of one account finishing at once,
+# so the last one always sees the others done.
+_LOCK_PLAN_SQL = "SELECT 1 FROM account_backfills WHERE account_id = %s FOR UPDATE;"
+
+_PLAN_DONE_SQL = """
+    UPDATE account_backfills b
+    SET completed_at = now()
+    WHERE b.account_id = %s
+      AND b.completed_at IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM account_backfill_windows w
+          WHERE w.account_id = b.account_id AND w.done_at IS NULL
+      )
+    RETURNING b.account_id;
+"""
+
+_WINDOW_FAILED_SQL = """
+    UPDATE account_backfill_windows
+    SET last_error = %s, leased_until = now() + make_interval(secs => %s)
+    WHERE account_id = %s AND window_start = %s;
+"""
+
+
+class BackfillStore:
+    """Plans, leases and checkpoints in Postgres; blocking, called on the aio executor."""
+
+    def __init__(
+        self,
+        *,
+        window: timedelta = timedelta(days=BACKFILL_WINDOW_DAYS),
+        lookback_days: int = BACKFILL_LOOKBACK_DAYS,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.window = window
+        self.lookback_days = lookback_days
+        self.max_attempts = max_attempts
+
+    def plan(self, account_ids: Optional[Iterable[int]] = None) -> int:
+        """Plan backfills for newly linked (or re-linked) accounts. Returns accounts planned."""
+        ids = sorted({int(a) for a in account_ids}) if account_ids is not None else None
+        with transaction() as tx:
+            planned = [r["account_id"] for r in tx.execute(_PLAN_SQL, {"lookback": self.lookback_days, "ids": ids})]
+            if planned:
+                tx.execute("DELETE FROM account_backfill_windows WHERE account_id = ANY(%s::bigint[]);",
+                           (planned,), fetch_results=False)
+                tx.execute(_PLAN_WINDOWS_SQL, {"window": self.window, "ids": planned}, fetch_results=False)
+        if planned:
+            logger.info("Planned backfills for %d accounts", len(planned))
+        return len(planned)
+
+    def claim(self, limit: int, lease: float = LEASE_SECONDS) -> list[Window]:
+        if limit <= 0:
+            return []
+        with transaction() as tx:
+            rows = tx.execute(_CLAIM_SQL, {"lease": lease, "max_attempts": self.max_attempts, "limit": limit})
+        return [
+            Window(int(r["account_id"]), str(r["metaapi_account_id"]), r["window_start"], r["window_end"],
+                   int(r["attempts"]))
+            for r in rows
+        ]
+
+    def complete(self, window: Window, deals: list[Deal]) -> int:
+        """Write the window's deals and mark it done, atomically. Returns new deals."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for deal in deals:
+            writer.writerow(_csv_value(v) for v in deal_row(deal))
+        buffer.seek(0)
+
+        with transaction() as tx, tx.conn.cursor() as cursor:
+            inserted = []
+            if deals:
+                cursor.execute(_STAGE_SQL)
+                with timed(_COPY_SQL) as timing:
+                    cursor.copy_expert(_COPY_SQL, buffer)
+                    timing.rows = len(deals)
+                with timed(_MERGE_SQL) as timing:
+                    cursor.execute(_MERGE_SQL)
+                    inserted = cursor.fetchall()
+                    timing.rows = len(inserted)
+                if inserted:
+                    cursor.execute(_SILENCE_SQL)
+                    rebuild_positions(cursor, inserted)
+                    payload = {"op": "BACKFILL", "account_id": window.account_id, "full_reload": True}
+                    cursor.execute(_RELOAD_NOTIFY_SQL, (json.dumps(payload),))
+            cursor.execute(_LOCK_PLAN_SQL, (window.account_id,))
+            cursor.execute(_WINDOW_DONE_SQL, (len(deals), window.account_id, window.start))
+            cursor.execute(_PLAN_DONE_SQL, (window.account_id,))
+            if cursor.fetchone() is not None:
+                logger.info("Backfill of account %s complete", window.account_id)
+        if inserted:
+            invalidate_trades_cache(window.account_id)
+        return len(inserted)
+
+    def fail(self, window: Window, error: str, retry_after: float):
+        with transaction() as tx:
+            tx.execute(_WINDOW_FAILED_SQL, (error[:2000], retry_after, window.account_id, window.start),
+                       fetch_results=False)
+
+
+def _csv_value(value):
+    # COPY csv reads an unquoted empty field as NULL.
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# -------------------------------------------------------------------
+# Runner
+# -------------------------------------------------------------------
+class Backfill:
+    def __init__(
+        self,
+        source: HistorySource,
+        *,
+        store: Optional[BackfillStore] = None,
+        concurrency: int = BACKFILL_CONCURRENCY,
+        per_account: int = PER_ACCOUNT_CONCURRENCY,
+        page_size: int = PAGE_SIZE,
+        lease: float = LEASE_SECONDS,
+        retry_delay: float = 1.0,
+    ):
+        self.source = source
+        self.store = store or BackfillStore()
+        self.concurrency = concurrency
+        self.per_account = per_account
+        self.page_size = page_size
+        self.lease = lease
+        self.retry_delay = retry_delay
+        self._account_limits: dict[int, asyncio.Semaphore] = {}
+        self._stopping = asyncio.Event()
+        self._stats = {
+            "planned": 0, "windows": 0, "windows_failed": 0, "pages": 0, "page_retries": 0,
+            "deals_fetched": 0, "deals_written": 0,
+        }
+
+    async def run(self, account_ids: Optional[Iterable[int]] = None, *, watch: Optional[float] = None):
+        """
+        Plan and work through pending windows until none are left; with
+        `watch`, keep planning newly linked accounts every `watch` seconds.
+        """
+        instrumentation.register_collector("backfill", self.stats)
+        account_ids = list(account_ids) if account_ids is not None else None
+        try:
+            while not self._stopping.is_set():
+                self._stats["planned"] += await run_blocking(self.store.plan, account_ids)
+                await self._drain()
+                if watch is None:
+                    break
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), watch)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.source.close()
+
+    def stop(self):
+        """Finish the windows in flight and return; the rest stay pending."""
+        self._stopping.set()
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    async def _drain(self):
+        running: set[asyncio.Task] = set()
+        try:
+            while True:
+                if not self._stopping.is_set() and len(running) < self.concurrency:
+                    for window in await run_blocking(self.store.claim, self.concurrency - len(running), self.lease):
+                        running.add(asyncio.create_task(self._window(window)))
+                if not running:
+                    return
+                _, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in running:
+                task.cancel()   # its lease expires and another run picks it up
+
+    async def _window(self, window: Window):
+        limit = self._account_limits.setdefault(window.account_id, asyncio.Semaphore(self.per_account))
+        async with limit:
+            try:
+                raw = await self._fetch(window)
+                # Pages of a window being traded while we read can overlap.
+                deals = {}
+                for item in raw:
+                    deal = parse_deal(window.account_id, item)
+                    if deal is not None:
+                        deals[deal.deal_id] = deal
+                written = await run_blocking(self.store.complete, window, list(deals.values()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._stats["windows_failed"] += 1
+                retry_after = min(60.0 * 2 ** window.attempts, 3600.0)
+                logger.warning("Backfill window %s %s..%s failed (attempt %d), retrying in %.0f s: %s",
+                               window.account_id, window.start, window.end, window.attempts, retry_after, exc)
+                await run_blocking(self.store.fail, window, repr(exc), retry_after)
+                return
+        self._stats["windows"] += 1
+        self._stats["deals_fetched"] += len(raw)
+        self._stats["deals_written"] += written
+
+    async def _fetch(self, window: Window) -> list[dict]:
+        deals: list[dict] = []
+        while True:
+            page = await self._page(window, len(deals))
+            deals.extend(page)
+            if len(page) < self.page_size:
+                return deals
+
+    async def _page(self, window: Window, offset: int) -> list[dict]:
+        for attempt in range(PAGE_RETRIES):
+            try:
+                page = await asyncio.wait_for(
+                    self.source.deals(window.account, window.start, window.end, offset, self.page_size),
+                    PAGE_TIMEOUT,
+                )
+                self._stats["pages"] += 1
+                return page
+            except (HistoryUnavailable, asyncio.TimeoutError):
+                if attempt == PAGE_RETRIES - 1:
+                    raise
+                self._stats["page_retries"] += 1
+                await asyncio.sleep(self.retry_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+        raise AssertionError("unreachable")
+
+
+# -------------------------------------------------------------------
+# Entry point
+# -------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical MetaAPI deals of newly linked accounts.")
+    parser.add_argument("--source", default="metaapi", help="'metaapi' or a REST base URL (fake server)")
+    parser.add_argument("--account", type=int, action="append", help="only these account ids (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="keep polling for newly linked accounts")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    backfill = Backfill(source_from_url(args.source, args.concurrency), concurrency=args.concurrency)
+    started = time.perf_counter()
+    try:
+        asyncio.run(backfill.run(args.account, watch=args.watch))
+    except KeyboardInterrupt:
+        pass
+    logger.info("Backfill stopped after %.0f s: %s", time.perf_counter() - started, backfill.stats())
+
+
+if __name__ == "__main__":
+    main()
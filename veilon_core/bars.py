@@ -0,0 +1,347 @@
+"""
+Tick-to-bar downsampling of live equity.
+
+The tracker sees an account information update (balance + equity) per
+account several times a second. `EquityBars` folds those ticks into OHLC
+equity bars at a few fixed intervals (EQUITY_BAR_INTERVALS, default
+1s / 1m / 1h):
+
+- each interval keeps, per account, the open bar plus a ring of the last
+  `capacity` closed bars in preallocated NumPy arrays, so memory is fixed
+  by (accounts x capacity);
+- ticks are buffered and folded into bars in vectorized batches (sort by
+  account and bar, then reduceat), not one NumPy call per tick;
+- closed bars are handed out in batches by `drain()` (one DataFrame for all
+  accounts and intervals) and written with `write_bars()`;
+- `window()` returns an account's recent bars.
+
+Ticks are stamped by the caller (MetaAPI account information carries no
+time). A tick older than the open bar is folded into the open bar rather
+than reopening a closed one. Not thread-safe: owned by the tracker's loop.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from veilon_core.db import db, transaction
+from veilon_core.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+EQUITY_BAR_INTERVALS = str(db.get("EQUITY_BAR_INTERVALS", "1s,1m,1h"))
+# Closed bars kept in memory per account and interval; older bars are in
+# account_equity_bars. 60 + 60 + 24 bars x 52 bytes ~ 7.5 KB per account.
+DEFAULT_CAPACITY = {1: 60, 60: 60, 3600: 24}
+
+BAR_DTYPE = np.dtype([
+    ("start", "i8"),      # bar open, epoch seconds (multiple of the interval)
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("balance", "f8"),    # balance at the bar's last tick
+    ("ticks", "i4"),
+])
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86_400}
+
+
+def parse_interval(spec: str) -> int:
+    """'1s' / '5m' / '1h' / '1d' (or plain seconds) -> seconds."""
+    match = re.fullmatch(r"\s*(\d+)\s*([smhd]?)\s*", spec)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid bar interval: {spec!r}")
+    return int(match.group(1)) * _UNITS[match.group(2) or "s"]
+
+
+class BarSeries:
+    """
+    Bars of one interval, one row per account slot: the open bar plus a ring
+    of the last `capacity` closed bars. Slots are assigned by EquityBars.
+    """
+
+    def __init__(self, interval: int, capacity: int, slots: int):
+        self.interval = interval
+        self.capacity = capacity
+        self._current = np.zeros(0, BAR_DTYPE)
+        self._ring = np.zeros((0, capacity), BAR_DTYPE)
+        self._head = np.zeros(0, np.int64)        # next ring position to write
+        self._count = np.zeros(0, np.int64)       # closed bars held (<= capacity)
+        self._unflushed = np.zeros(0, np.int64)   # closed bars not yet drained
+        self.overruns = 0                         # closed bars lost before a drain
+        self.grow(slots)
+
+    def grow(self, slots: int):
+        old = len(self._current)
+        current = np.zeros(slots, BAR_DTYPE)
+        current["start"] = -1
+        current[:old] = self._current
+        self._current = current
+        ring = np.zeros((slots, self.capacity), BAR_DTYPE)
+        ring[:old] = self._ring
+        self._ring = ring
+        for name in ("_head", "_count", "_unflushed"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(slots - old, np.int64)]))
+
+    def reset(self, slot: int):
+        self._current[slot] = (-1, 0.0, 0.0, 0.0, 0.0, 0.0, 0)
+        self._head[slot] = self._count[slot] = self._unflushed[slot] = 0
+
+    # ---------------------------------------------------------------
+    # Ingest
+    # ---------------------------------------------------------------
+    def fold(self, slots: np.ndarray, ts: np.ndarray, equity: np.ndarray, balance: np.ndarray):
+        """Fold a batch of ticks (arrival order) into the open and closed bars."""
+        current = self._current
+        # Late ticks land in the open bar instead of reopening a closed one.
+        start = np.maximum(ts.astype(np.int64) // self.interval * self.interval, current["start"][slots])
+
+        order = np.lexsort((start, slots))   # stable: arrival order within a bar
+        slots, start, equity, balance = slots[order], start[order], equity[order], balance[order]
+        first = np.flatnonzero(np.r_[True, (slots[1:] != slots[:-1]) | (start[1:] != start[:-1])])
+        last = np.r_[first[1:], len(slots)] - 1
+
+        groups = np.zeros(len(first), BAR_DTYPE)
+        groups["start"] = start[first]
+        groups["open"] = equity[first]
+        groups["high"] = np.maximum.reduceat(equity, first)
+        groups["low"] = np.minimum.reduceat(equity, first)
+        groups["close"] = equity[last]
+        groups["balance"] = balance[last]
+        groups["ticks"] = last - first + 1
+        group_slots = slots[first]
+
+        # A slot's first group may continue its open bar; otherwise the open
+        # bar (if any) closes ahead of the batch's bars.
+        slot_first = np.r_[True, group_slots[1:] != group_slots[:-1]]
+        slot_last = np.r_[group_slots[1:] != group_slots[:-1], True]
+        prior = current[group_slots[slot_first]]
+        is_open = prior["start"] >= 0
+        continues = is_open & (prior["start"] == groups["start"][slot_first])
+        merge = np.flatnonzero(slot_first)[continues]
+        carried = prior[continues]
+        groups["open"][merge] = carried["open"]
+        groups["high"][merge] = np.maximum(groups["high"][merge], carried["high"])
+        groups["low"][merge] = np.minimum(groups["low"][merge], carried["low"])
+        groups["ticks"][merge] += carried["ticks"]
+
+        superseded = is_open & ~continues
+        closed = np.concatenate([prior[superseded], groups[~slot_last]])
+        closed_slots = np.concatenate([group_slots[slot_first][superseded], group_slots[~slot_last]])
+        current[group_slots[slot_last]] = groups[slot_last]
+        if len(closed):
+            order = np.lexsort((closed["start"], closed_slots))
+            self._push(closed_slots[order], closed[order])
+
+    def close_due(self, now: float):
+        """Close open bars whose interval has ended (accounts that went quiet)."""
+        starts = self._current["start"]
+        due = np.flatnonzero((starts >= 0) & (starts + self.interval <= now))
+        if len(due):
+            self._push(due, self._current[due])
+            self._current["start"][due] = -1
+
+    def _push(self, slots: np.ndarray, bars: np.ndarray):
+        """Append closed bars (grouped by slot, oldest first) to the rings."""
+        first = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+        counts = np.diff(np.r_[first, len(slots)])
+        rank = np.arange(len(slots)) - np.repeat(first, counts)
+        owners = slots[first]
+
+        # More bars than the ring holds: only the newest `capacity` survive.
+        keep = rank >= np.repeat(counts, counts) - self.capacity
+        positions = (self._head[slots] + rank) % self.capacity
+        self._ring[slots[keep], positions[keep]] = bars[keep]
+
+        self._head[owners] = (self._head[owners] + counts) % self.capacity
+        self._count[owners] = np.minimum(self._count[owners] + counts, self.capacity)
+        unflushed = self._unflushed[owners] + counts
+        self.overruns += int(np.maximum(unflushed - self.capacity, 0).sum())
+        self._unflushed[owners] = np.minimum(unflushed, self.capacity)
+
+    # ---------------------------------------------------------------
+    # Read
+    # ---------------------------------------------------------------
+    def _last(self, slots: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(slot, bar) pairs of the last `counts[i]` closed bars of each slot, oldest first."""
+        rows = np.repeat(slots, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = (np.repeat(self._head[slots] - counts, counts) + offsets) % self.capacity
+        return rows, self._ring[rows, positions]
+
+    def drain(self) -> tuple[np.ndarray, np.ndarray]:
+        """(slots, bars) closed since the last drain."""
+        slots = np.flatnonzero(self._unflushed)
+        rows, bars = self._last(slots, self._unflushed[slots])
+        self._unflushed[slots] = 0
+        return rows, bars
+
+    def window(self, slot: int, *, include_open: bool = True) -> np.ndarray:
+        """The slot's closed bars in memory (plus the open one), oldest first."""
+        slots = np.array([slot])
+        _, bars = self._last(slots, self._count[slots])
+        if include_open and self._current["start"][slot] >= 0:
+            bars = np.concatenate([bars, self._current[slots]])
+        return bars
+
+
+class EquityBars:
+    """
+    Equity bars at several intervals, fed from the same ticks.
+
+    `update()` only buffers the tick; buffered ticks are folded into every
+    interval's bars in one vectorized pass when the buffer fills, on
+    `drain()` and before `window()`.
+    """
+
+    def __init__(
+        self,
+        intervals: Sequence[int] | str = EQUITY_BAR_INTERVALS,
+        *,
+        capacity: Optional[dict] = None,
+        slots: int = 1024,
+        max_pending_ticks: int = 65_536,
+    ):
+        if isinstance(intervals, str):
+            intervals = [parse_interval(spec) for spec in intervals.split(",")]
+        capacity = {**DEFAULT_CAPACITY, **(capacity or {})}
+        self.series = {
+            interval: BarSeries(interval, capacity.get(interval, 60), slots)
+            for interval in sorted(set(intervals))
+        }
+        self.max_pending_ticks = max_pending_ticks
+        self._slot_of: dict[int, int] = {}
+        self._accounts = np.zeros(slots, np.int64)
+        self._free = list(range(slots - 1, -1, -1))
+        self._ticks: tuple[list, list, list, list] = ([], [], [], [])
+
+    def update(self, account_id: int, equity: float, balance: float, ts: Optional[float] = None):
+        ids, times, equities, balances = self._ticks
+        ids.append(account_id)
+        times.append(time.time() if ts is None else ts)
+        equities.append(equity)
+        balances.append(balance)
+        if len(ids) >= self.max_pending_ticks:
+            self._fold()
+
+    def _fold(self):
+        ids, times, equities, balances = self._ticks
+        if not ids:
+            return
+        self._ticks = ([], [], [], [])
+        accounts, inverse = np.unique(np.asarray(ids, np.int64), return_inverse=True)
+        slots = np.fromiter((self._slot(a) for a in accounts.tolist()), np.int64, len(accounts))[inverse]
+        ts = np.asarray(times, np.float64)
+        equity = np.asarray(equities, np.float64)
+        balance = np.asarray(balances, np.float64)
+        for series in self.series.values():
+            series.fold(slots, ts, equity, balance)
+
+    def _slot(self, account_id: int) -> int:
+        slot = self._slot_of.get(account_id)
+        if slot is None:
+            if not self._free:
+                size = len(self._accounts)
+                self._accounts = np.concatenate([self._accounts, np.zeros(size, np.int64)])
+                for series in self.series.values():
+                    series.grow(size * 2)
+                self._free.extend(range(size * 2 - 1, size - 1, -1))
+            slot = self._free.pop()
+            self._slot_of[account_id] = slot
+            self._accounts[slot] = account_id
+        return slot
+
+    def discard(self, account_id: int):
+        """Forget an account (its undrained bars are dropped)."""
+        self._fold()
+        slot = self._slot_of.pop(account_id, None)
+        if slot is not None:
+            for series in self.series.values():
+                series.reset(slot)
+            self._free.append(slot)
+
+    def drain(self, now: Optional[float] = None) -> pd.DataFrame:
+        """
+        All bars closed since the last drain, for every account and interval
+        (bars whose interval has passed are closed first). Columns match
+        account_equity_bars.
+        """
+        self._fold()
+        now = time.time() if now is None else now
+        parts = []
+        for interval, series in self.series.items():
+            series.close_due(now)
+            slots, bars = series.drain()
+            if len(bars):
+                parts.append(_bars_frame(bars, account_id=self._accounts[slots], interval_seconds=interval))
+        if not parts:
+            return _bars_frame(np.zeros(0, BAR_DTYPE), account_id=np.zeros(0, np.int64), interval_seconds=0)
+        return pd.concat(parts, ignore_index=True)
+
+    def window(self, account_id: int, interval: int) -> pd.DataFrame:
+        """The account's recent bars at `interval` (oldest first, open bar last)."""
+        self._fold()
+        slot = self._slot_of.get(account_id)
+        bars = np.zeros(0, BAR_DTYPE) if slot is None else self.series[interval].window(slot)
+        return _bars_frame(bars, account_id=account_id, interval_seconds=interval)
+
+    def stats(self) -> dict:
+        return {
+            "accounts": len(self._slot_of),
+            "pending_ticks": len(self._ticks[0]),
+            "overruns": sum(s.overruns for s in self.series.values()),
+        }
+
+
+def _bars_frame(bars: np.ndarray, **keys) -> pd.DataFrame:
+    return pd.DataFrame({
+        **{k: np.broadcast_to(v, len(bars)) for k, v in keys.items()},
+        "bar_time": pd.to_datetime(bars["start"], unit="s", utc=True),
+        **{name: bars[name] for name in ("open", "high", "low", "close", "balance", "ticks")},
+    })
+
+
+# -------------------------------------------------------------------
+# Storage and charting
+# -------------------------------------------------------------------
+_WRITE_BARS_SQL = """
+    INSERT INTO account_equity_bars AS b
+        (account_id, interval_seconds, bar_time, open, high, low, close, balance, ticks)
+    VALUES %s
+    ON CONFLICT (account_id, interval_seconds, bar_time) DO UPDATE SET
+        high    = GREATEST(b.high, EXCLUDED.high),
+        low     = LEAST(b.low, EXCLUDED.low),
+        close   = EXCLUDED.close,
+        balance = EXCLUDED.balance,
+        ticks   = b.ticks + EXCLUDED.ticks;
+"""
+
+
+def write_bars(bars: pd.DataFrame) -> int:
+    """Upsert a drain() batch into account_equity_bars."""
+    if bars.empty:
+        return 0
+    rows = list(zip(
+        bars["account_id"].tolist(),
+        bars["interval_seconds"].tolist(),
+        bars["bar_time"].dt.to_pydatetime().tolist(),
+        bars["open"].tolist(),
+        bars["high"].tolist(),
+        bars["low"].tolist(),
+        bars["close"].tolist(),
+        bars["balance"].tolist(),
+        bars["ticks"].tolist(),
+    ))
+    with transaction() as tx, tx.conn.cursor() as cursor:
+        with timed(_WRITE_BARS_SQL) as timing:
+            execute_values(cursor, _WRITE_BARS_SQL, rows, page_size=1000)
+            timing.rows = len(rows)
+    return len(rows)
+
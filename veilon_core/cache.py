@@ -0,0 +1,111 @@
+"""
+Small in-process caches for veilon_core read paths.
+
+`TTLCache` is a thread-safe LRU with a per-entry time-to-live. Every cache
+created here is registered by name, so its hit/miss counters show up in the
+query metrics export and other modules can invalidate it by name.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from veilon_core import instrumentation
+
+_MISSING = object()
+
+_registry: dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    def __init__(self, name: str, *, ttl: float, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        # Bumped on every invalidation so a load that raced with a mutation
+        # does not put the pre-mutation value back.
+        self._version = 0
+
+        _registry[name] = self
+        instrumentation.register_collector(f"cache_{name}", self.stats)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Return the cached value, or call `load()` and cache its result."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            version = self._version
+        value = load()
+        with self._lock:
+            if version == self._version:
+                self._store(key, value)
+        return value
+
+    def invalidate(self, *keys: Hashable):
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                if self._data.pop(key, _MISSING) is not _MISSING:
+                    self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+def get_cache(name: str) -> Optional[TTLCache]:
+    return _registry.get(name)
+
+
+def cache_stats() -> dict[str, dict]:
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -1,9 +1,39 @@
+from datetime import datetime, timezone
+
+from veilon_core.cache import TTLCache
 from veilon_core.db import execute_query
+from veilon_core.listener import LISTEN_NOTIFY, on_change
+
+# Only found coupons are cached; validity is re-checked on every hit so an
+# expiring coupon stops applying on time regardless of the TTL.
+_coupon_cache = TTLCache("coupons", ttl=3600 if LISTEN_NOTIFY else 60, maxsize=1024)
+
+on_change("coupons", lambda payload: _coupon_cache.clear(), reset=_coupon_cache.clear)
+
+
+def _is_valid_now(coupon: dict) -> bool:
+    now = datetime.now(timezone.utc)
+    valid_from, valid_until = coupon.get("valid_from"), coupon.get("valid_until")
+    if valid_from is not None and valid_from.tzinfo is None:
+        valid_from = valid_from.replace(tzinfo=timezone.utc)
+    if valid_until is not None and valid_until.tzinfo is None:
+        valid_until = valid_until.replace(tzinfo=timezone.utc)
+    return (
+        bool(coupon.get("is_active"))
+        and (valid_from is None or valid_from <= now)
+        and (valid_until is None or valid_until >= now)
+    )
+
 
 def get_active_coupon_by_code(code: str) -> dict | None:
     if not code:
         return None
 
+    key = code.strip().lower()
+    coupon = _coupon_cache.get(key)
+    if coupon is not None:
+        return dict(coupon) if _is_valid_now(coupon) else None
+
     rows = execute_query(
         """
         SELECT
@@ -27,4 +57,7 @@ def get_active_coupon_by_code(code: str) -> dict | None:
         """,
         (code.strip(),),
     )
-    return rows[0] if rows else None
+    if not rows:
+        return None
+    _coupon_cache.set(key, rows[0])
+    return dict(rows[0])
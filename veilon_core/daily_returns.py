@@ -0,0 +1,143 @@
+"""
+Per-account daily returns, read from the `account_daily_returns` rollup.
+
+The rollup (schema.SCHEMA["daily_returns"]) is maintained by a trigger as
+trades close, so rendering `daily_return_chart` is one primary-key range
+read instead of a scan over the account's trade history.
+`rebuild_daily_returns()` recomputes it from `trades`. Use it to backfill
+after applying the schema, and after editing or deleting closed trades,
+which the trigger does not track.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+
+from veilon_core.db import query_frame, transaction
+from veilon_core.instrumentation import timed
+from veilon_core.schema import NET_PNL_SQL, ROLLUP_TZ
+
+_DAILY_RETURNS_SQL = """
+    SELECT
+        trading_day AS "Date",
+        (pnl / NULLIF(start_balance, 0))::float8 AS "Gain",
+        pnl::float8 AS "PnL",
+        trade_count AS "Trades",
+        start_balance::float8 AS "Start Balance",
+        end_balance::float8 AS "End Balance",
+        high_balance::float8 AS "High",
+        low_balance::float8 AS "Low"
+    FROM account_daily_returns
+    WHERE account_id = %s
+      AND trading_day >= COALESCE(%s::date, '-infinity'::date)
+      AND trading_day <= COALESCE(%s::date, 'infinity'::date)
+    ORDER BY trading_day ASC;
+"""
+
+
+def get_daily_returns_frame(
+    account_id: int,
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> pd.DataFrame:
+    """
+    Chart-ready daily returns (Date, Gain, plus PnL / Trades / balances) for
+    one account, oldest first; `start` / `end` bound the trading days.
+    """
+    return query_frame(_DAILY_RETURNS_SQL, (account_id, start, end))
+
+
+_REBUILD_SQL = f"""
+    WITH closed AS (
+        SELECT
+            t.account_id,
+            (t.close_time AT TIME ZONE %(tz)s)::date AS trading_day,
+            {NET_PNL_SQL.format(t="t")} AS net,
+            t.close_time,
+            t.id
+        FROM trades t
+        WHERE t.close_time IS NOT NULL
+          AND (%(account_id)s::bigint IS NULL OR t.account_id = %(account_id)s::bigint)
+    ),
+    path AS (
+        SELECT
+            c.account_id,
+            c.trading_day,
+            c.net,
+            COALESCE(p.account_size, 0) AS account_size,
+            COALESCE(p.account_size, 0)
+                + SUM(c.net) OVER (PARTITION BY c.account_id ORDER BY c.close_time, c.id) AS balance
+        FROM closed c
+        LEFT JOIN accounts a ON a.id = c.account_id
+        LEFT JOIN plans p ON p.id = a.plan_id
+    ),
+    days AS (
+        SELECT
+            account_id,
+            trading_day,
+            account_size,
+            SUM(net) AS pnl,
+            COUNT(*) AS trade_count,
+            MAX(balance) AS high_seen,
+            MIN(balance) AS low_seen
+        FROM path
+        GROUP BY account_id, trading_day, account_size
+    ),
+    opened AS (
+        SELECT
+            d.*,
+            d.account_size
+                + SUM(d.pnl) OVER (PARTITION BY d.account_id ORDER BY d.trading_day)
+                - d.pnl AS start_balance
+        FROM days d
+    ),
+    peaks AS (
+        SELECT
+            o.*,
+            GREATEST(o.high_seen, o.start_balance) AS high_balance,
+            GREATEST(
+                o.account_size,
+                MAX(GREATEST(o.high_seen, o.start_balance))
+                    OVER (PARTITION BY o.account_id ORDER BY o.trading_day)
+            ) AS peak_balance
+        FROM opened o
+    )
+    INSERT INTO account_daily_returns
+        (account_id, trading_day, pnl, trade_count, start_balance, end_balance, high_balance, low_balance,
+         peak_balance)
+    SELECT
+        account_id,
+        trading_day,
+        pnl,
+        trade_count,
+        start_balance,
+        start_balance + pnl,
+        high_balance,
+        LEAST(low_seen, start_balance),
+        peak_balance
+    FROM peaks;
+"""
+
+
+def rebuild_daily_returns(account_id: Optional[int] = None, *, tz: str = ROLLUP_TZ) -> int:
+    """
+    Recompute the rollup from `trades` for one account (or all), in one
+    transaction. Returns the number of day rows written.
+    """
+    params = {"account_id": account_id, "tz": tz}
+    with transaction() as tx:
+        tx.execute(
+            """
+            DELETE FROM account_daily_returns
+            WHERE %(account_id)s::bigint IS NULL OR account_id = %(account_id)s::bigint;
+            """,
+            params,
+            fetch_results=False,
+        )
+        with tx.conn.cursor() as cursor, timed(_REBUILD_SQL, params) as timing:
+            cursor.execute(_REBUILD_SQL, params)
+            timing.rows = cursor.rowcount
+            return cursor.rowcount
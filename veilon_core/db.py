@@ -1,7 +1,32 @@
+import contextvars
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
+import pandas as pd
 import streamlit as st
 
+from veilon_core import instrumentation
+from veilon_core.frames import frame_from_tuples
+from veilon_core.instrumentation import fingerprint, timed
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # older/newer Streamlit layouts: fall back to per-thread sessions
+    get_script_run_ctx = None
+
+logger = logging.getLogger(__name__)
+
 db = st.secrets["database"]
 host = db["DB_HOST"]
 port = db["DB_PORT"]
@@ -9,38 +34,711 @@ dbname = db["DB_NAME"]
 user = db["DB_USER"]
 password = db["DB_PASSWORD"]
 
+# -------------------------------------------------------------------
+# Pool settings (optional, under [database] in secrets.toml)
+# -------------------------------------------------------------------
+POOL_MIN_SIZE = int(db.get("POOL_MIN_SIZE", 1))
+POOL_MAX_SIZE = int(db.get("POOL_MAX_SIZE", 10))
+POOL_TIMEOUT = float(db.get("POOL_TIMEOUT", 30))              # seconds to wait for a free connection
+POOL_MAX_LIFETIME = float(db.get("POOL_MAX_LIFETIME", 1800))  # recycle connections older than this
+POOL_MAX_IDLE = float(db.get("POOL_MAX_IDLE", 300))           # close spare connections idle this long
+POOL_CHECK_AFTER = float(db.get("POOL_CHECK_AFTER", 30))      # ping connections idle longer than this
+
+# Rows fetched per network round trip by streaming (server-side) cursors
+STREAM_ITERSIZE = int(db.get("STREAM_ITERSIZE", 2000))
+
+# -------------------------------------------------------------------
+# Query metrics (optional)
+# -------------------------------------------------------------------
+SLOW_QUERY_MS = float(db.get("SLOW_QUERY_MS", 500))   # log statements slower than this
+METRICS_PORT = db.get("METRICS_PORT")                 # serve /metrics locally when set
+
+instrumentation.configure(slow_query_seconds=SLOW_QUERY_MS / 1000)
+
+# -------------------------------------------------------------------
+# Read replicas (optional). Each entry only needs the keys that differ
+# from the primary:
+#
+#   [[database.REPLICAS]]
+#   DB_HOST = "replica-1.internal"
+# -------------------------------------------------------------------
+REPLICAS = [dict(r) for r in db.get("REPLICAS", [])]
+REPLICA_STRATEGY = db.get("REPLICA_STRATEGY", "round_robin")           # or "least_loaded"
+REPLICA_MAX_LAG = float(db.get("REPLICA_MAX_LAG", 10))                  # seconds; laggier replicas are skipped
+REPLICA_LAG_CHECK_INTERVAL = float(db.get("REPLICA_LAG_CHECK_INTERVAL", 5))
+READ_YOUR_WRITES = float(db.get("READ_YOUR_WRITES", 5))                 # seconds a session stays on primary after a write
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool shared by every Streamlit session
+    in the process.
+
+    - Connections are opened lazily up to `max_size`; callers wait up to
+      `timeout` seconds when the pool is exhausted.
+    - On checkout, closed connections are dropped and connections idle for
+      longer than `check_after` seconds are pinged with `SELECT 1`.
+    - Connections older than `max_lifetime` are recycled, and spare idle
+      connections (above `min_size`) are reaped after `max_idle` seconds.
+    """
+
+    def __init__(
+        self,
+        connect,
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30,
+        max_lifetime: float = 1800,
+        max_idle: float = 300,
+        check_after: float = 30,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Invalid pool size: need 0 <= min_size <= max_size and max_size >= 1.")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_after = check_after
+
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._idle: deque = deque()   # (conn, last_used_at), most recently used on the right
+        self._born: dict[int, float] = {}
+        self._size = 0                # open + opening connections
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        self._reaper = threading.Thread(target=self._reap_loop, name="veilon-db-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    # ---------------------------------------------------------------
+    # Checkout / return
+    # ---------------------------------------------------------------
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            conn = None
+            create = False
+
+            with self._cond:
+                self._check_fork()
+                if self._closed:
+                    raise psycopg2.InterfaceError("Connection pool is closed.")
+
+                self._waiting += 1
+                try:
+                    while not self._idle and self._size >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeout(
+                                f"No database connection available after {self.timeout:.1f}s "
+                                f"(max_size={self.max_size})."
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+                self._in_use += 1
+
+            if create:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._usable(conn, last_used):
+                self._discard(conn, checked_out=True)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return conn
+
+    def putconn(self, conn, *, discard: bool = False):
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        if discard or conn.closed or self._expired(conn):
+            self._discard(conn, checked_out=True)
+            return
+
+        with self._cond:
+            if self._closed or os.getpid() != self._pid:
+                self._in_use -= 1
+                self._size -= 1
+                self._born.pop(id(conn), None)
+                _close_quietly(conn)
+                return
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a `with` block."""
+        conn = self.getconn()
+        try:
+            yield conn
+        except BaseException:
+            self.putconn(conn, discard=bool(conn.closed))
+            raise
+        else:
+            self.putconn(conn)
+
+    # ---------------------------------------------------------------
+    # Maintenance
+    # ---------------------------------------------------------------
+    def reap(self):
+        """Close spare idle connections and recycle expired ones."""
+        now = time.monotonic()
+        to_close = []
+
+        with self._cond:
+            self._check_fork()
+            keep = deque()
+            # Oldest idle connections sit on the left.
+            while self._idle:
+                conn, last_used = self._idle.popleft()
+                spare = self._size - len(to_close) > self.min_size
+                if conn.closed or self._expired(conn) or (spare and now - last_used > self.max_idle):
+                    to_close.append(conn)
+                else:
+                    keep.append((conn, last_used))
+            self._idle = keep
+            self._size -= len(to_close)
+            self._discarded += len(to_close)
+            for conn in to_close:
+                self._born.pop(id(conn), None)
+            if to_close:
+                self._cond.notify_all()
+
+            missing = 0 if self._closed else max(0, self.min_size - self._size)
+            self._size += missing
+
+        for conn in to_close:
+            _close_quietly(conn)
+
+        for _ in range(missing):
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                continue
+            with self._cond:
+                self._idle.appendleft((conn, time.monotonic()))
+                self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            _close_quietly(conn)
+
+    def load(self) -> float:
+        """Busy share of the pool (checked out + waiting) / max_size."""
+        return (self._in_use + self._waiting) / self.max_size
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "connections_opened": self._opened,
+                "connections_discarded": self._discarded,
+                "checkout_wait_avg_ms": (self._wait_total / self._checkouts * 1000) if self._checkouts else 0.0,
+                "checkout_wait_max_ms": self._wait_max * 1000,
+            }
+
+    # ---------------------------------------------------------------
+    # Internals
+    # ---------------------------------------------------------------
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._opened += 1
+        return conn
+
+    def _expired(self, conn) -> bool:
+        born = self._born.get(id(conn))
+        return born is not None and time.monotonic() - born > self.max_lifetime
+
+    def _usable(self, conn, last_used: float) -> bool:
+        if conn.closed or self._expired(conn):
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn, *, checked_out: bool):
+        with self._cond:
+            self._size -= 1
+            if checked_out:
+                self._in_use -= 1
+            self._discarded += 1
+            self._born.pop(id(conn), None)
+            self._cond.notify()
+        _close_quietly(conn)
+
+    def _check_fork(self):
+        # Sockets inherited across fork() must not be shared with the parent:
+        # forget them (without closing) and start from an empty pool.
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._born.clear()
+            self._size = 0
+            self._in_use = 0
+            self._waiting = 0
+
+    def _reap_loop(self):
+        interval = max(1.0, min(self.max_idle, 60.0) / 2)
+        while not self._closed:
+            time.sleep(interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.warning("Connection pool maintenance failed: %s", e)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _connector(overrides=None):
+    cfg = {**dict(db), **(overrides or {})}
+
+    def connect():
+        return psycopg2.connect(
+            host=cfg["DB_HOST"],
+            port=cfg["DB_PORT"],
+            database=cfg["DB_NAME"],
+            user=cfg["DB_USER"],
+            password=cfg["DB_PASSWORD"],
+        )
+
+    return connect
+
+
+def connect():
+    """Open a dedicated, unpooled connection to the primary (LISTEN, long-lived sessions)."""
+    return _connector()()
+
+
+def _new_pool(overrides=None) -> ConnectionPool:
+    return ConnectionPool(
+        _connector(overrides),
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        timeout=POOL_TIMEOUT,
+        max_lifetime=POOL_MAX_LIFETIME,
+        max_idle=POOL_MAX_IDLE,
+        check_after=POOL_CHECK_AFTER,
+    )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Process-wide connection pool for the primary, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _new_pool()
+                instrumentation.register_collector("db_pool", _pool.stats)
+                if METRICS_PORT:
+                    instrumentation.serve_metrics(int(METRICS_PORT))
+    return _pool
+
+
+def pool_stats() -> dict:
+    """Snapshot of pool usage: size, idle, in_use, waiting, checkout latency."""
+    return get_pool().stats()
+
+
+# -------------------------------------------------------------------
+# Replica routing
+# -------------------------------------------------------------------
+# Zero when the replica has replayed everything it received (an idle
+# primary would otherwise look like growing lag).
+_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END;
+"""
+
+
+class Replica:
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.lag = 0.0
+        self.checked_at = float("-inf")
+        self._checking = threading.Lock()
+
+    def usable(self) -> bool:
+        if time.monotonic() - self.checked_at > REPLICA_LAG_CHECK_INTERVAL:
+            self.refresh_lag()
+        return self.lag <= REPLICA_MAX_LAG
+
+    def refresh_lag(self):
+        # One checker at a time; everyone else uses the last known value.
+        if not self._checking.acquire(blocking=False):
+            return
+        try:
+            with self.pool.connection() as conn:
+                with conn, conn.cursor() as cursor:
+                    cursor.execute(_LAG_SQL)
+                    self.lag = float(cursor.fetchone()[0] or 0)
+        except psycopg2.Error as e:
+            logger.warning("Replica %s unavailable, routing reads to primary: %s", self.name, e)
+            self.lag = float("inf")
+        finally:
+            self.checked_at = time.monotonic()
+            self._checking.release()
+
+    def stats(self) -> dict:
+        return {"lag_seconds": self.lag, **self.pool.stats()}
+
+
+_replicas = None
+_round_robin = itertools.count()
+
+
+def get_replicas() -> list[Replica]:
+    global _replicas
+    if _replicas is None:
+        with _pool_lock:
+            if _replicas is None:
+                replicas = [Replica(f"replica-{i}", _new_pool(cfg)) for i, cfg in enumerate(REPLICAS)]
+                for replica in replicas:
+                    instrumentation.register_collector(f"db_{replica.name}", replica.stats)
+                _replicas = replicas
+    return _replicas
+
+
+_WRITE_RE = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE)\b"
+    r"|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b"
+    r"|\b(NEXTVAL|SETVAL|PG_ADVISORY_\w+|PG_NOTIFY)\s*\(",
+    re.I,
+)
+
+
+@lru_cache(maxsize=2048)
+def is_read_only(query) -> bool:
+    """True for plain SELECT/WITH statements that neither write nor lock rows."""
+    text = fingerprint(query)
+    words = text.split(None, 1)
+    first = words[0].upper() if words else ""
+    # EXPLAIN without ANALYZE only plans the statement.
+    if first == "EXPLAIN" and len(words) > 1 and not re.search(r"\bANALY[SZ]E\b", words[1], re.I):
+        return is_read_only(re.sub(r"^\([^)]*\)\s*", "", words[1]))
+    return first in ("SELECT", "WITH", "TABLE", "VALUES") and not _WRITE_RE.search(text)
+
+
+# -------------------------------------------------------------------
+# Read-your-writes: a session that just wrote reads from the primary
+# for READ_YOUR_WRITES seconds, so it never sees a replica behind itself.
+# -------------------------------------------------------------------
+_session_override = contextvars.ContextVar("veilon_db_session", default=None)
+_last_write: dict[str, float] = {}
+
+
+def session_key() -> str:
+    """Streamlit session id when running inside a page, else the thread."""
+    key = _session_override.get()
+    if key is not None:
+        return key
+    if get_script_run_ctx is not None:
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is not None:
+            return ctx.session_id
+    return f"thread-{threading.get_ident()}"
+
+
+@contextmanager
+def bound_session(key: str):
+    """Attribute work done on another thread (e.g. an executor) to `key`'s session."""
+    token = _session_override.set(key)
+    try:
+        yield
+    finally:
+        _session_override.reset(token)
+
+
+def _mark_write():
+    if READ_YOUR_WRITES <= 0 or not REPLICAS:
+        return
+    now = time.monotonic()
+    _last_write[session_key()] = now
+    if len(_last_write) > 10_000:
+        for key, at in list(_last_write.items()):
+            if now - at > READ_YOUR_WRITES:
+                _last_write.pop(key, None)
+
+
+def _recently_wrote() -> bool:
+    at = _last_write.get(session_key())
+    return at is not None and time.monotonic() - at < READ_YOUR_WRITES
+
+
+def pool_for(query) -> ConnectionPool:
+    """
+    Pick the pool a statement should run on: read-only statements go to a
+    replica (round-robin or least-loaded) unless the session just wrote or
+    every replica lags beyond REPLICA_MAX_LAG; everything else goes to the
+    primary.
+    """
+    if not REPLICAS or not is_read_only(query):
+        return get_pool()
+    if _recently_wrote():
+        return get_pool()
+
+    candidates = [r for r in get_replicas() if r.usable()]
+    if not candidates:
+        return get_pool()
+    if REPLICA_STRATEGY == "least_loaded":
+        return min(candidates, key=lambda r: r.pool.load()).pool
+    return candidates[next(_round_robin) % len(candidates)].pool
+
+
 def execute_query(query, params=None, fetch_results=True):
     """
-    Executes a SQL query and optionally fetches results.
+    Executes a SQL query on a pooled connection and optionally fetches results.
+    Read-only statements may be served by a replica (see `pool_for`).
 
     Returns:
       - If fetch_results=True: always returns a list (possibly empty)
-      - If fetch_results=False: returns None on success (raises/prints on error)
+      - If fetch_results=False: returns None
+    Errors are logged (veilon_core.db logger), never raised.
     """
+    pool = pool_for(query)
+    if pool is get_pool() and not is_read_only(query):
+        _mark_write()
+
     try:
-        with psycopg2.connect(
-            host=host,
-            port=port,
-            database=dbname,
-            user=user,
-            password=password,
-        ) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, params)
-
-                if not fetch_results:
-                    # Using "with conn" commits automatically on normal exit,
-                    # but explicit commit is fine and clear.
-                    conn.commit()
-                    return None
-
-                rows = cursor.fetchall()
-                return rows if rows is not None else []
+        with pool.connection() as conn:
+            # "with conn" commits on normal exit and rolls back on error;
+            # the connection itself goes back to the pool.
+            with conn, timed(query, params) as timing:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute(query, params)
+                    timing.rows = max(cursor.rowcount, 0)
+
+                    # Statements without a result set (plain UPDATE etc.)
+                    # have nothing to fetch.
+                    if not fetch_results or cursor.description is None:
+                        return None if not fetch_results else []
+
+                    rows = cursor.fetchall()
+                    return rows if rows is not None else []
 
     except psycopg2.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         # Critical change: never return None for SELECT-style calls
         return [] if fetch_results else None
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return [] if fetch_results else None
\ No newline at end of file
+        logger.exception("An unexpected error occurred: %s", e)
+        return [] if fetch_results else None
+
+
+class Transaction:
+    """
+    Unit of work bound to a single pooled connection.
+
+    Statements run through `execute` share one connection and are committed
+    together when the surrounding `transaction()` block exits. Unlike
+    `execute_query`, errors are raised (and the whole unit is rolled back).
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None, fetch_results=True):
+        with timed(query, params) as timing, self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            timing.rows = max(cursor.rowcount, 0)
+            if not fetch_results:
+                return None
+            if cursor.description is None:
+                return []
+            return cursor.fetchall()
+
+
+@contextmanager
+def transaction():
+    """
+    Group several statements into one connection and one commit:
+
+        with transaction() as tx:
+            order = tx.execute("INSERT INTO orders ... RETURNING id;", (...))[0]
+            tx.execute("UPDATE accounts SET order_id = %s WHERE id = %s;", (...))
+    """
+    # Transactions always run on the primary and count as a write for
+    # read-your-writes purposes.
+    _mark_write()
+    with get_pool().connection() as conn:
+        with conn:
+            yield Transaction(conn)
+
+
+# numeric -> float straight from the wire text, skipping Decimal objects.
+_NUMERIC_AS_FLOAT = extensions.new_type(
+    extensions.DECIMAL.values,
+    "VEILON_NUMERIC_AS_FLOAT",
+    lambda value, cursor: float(value) if value is not None else None,
+)
+
+
+@contextmanager
+def _server_cursor(query, params, itersize, cursor_factory=None):
+    # Named cursors live server-side and only exist inside a transaction, so
+    # the pooled connection is held until the caller is done iterating.
+    with pool_for(query).connection() as conn:
+        with conn:
+            name = f"veilon_stream_{uuid.uuid4().hex}"
+            with timed(query, params) as timing:
+                with conn.cursor(name=name, cursor_factory=cursor_factory) as cursor:
+                    cursor.itersize = itersize
+                    cursor.execute(query, params)
+                    try:
+                        yield cursor
+                    finally:
+                        # Whole-stream latency, including time spent by the consumer.
+                        timing.rows = max(cursor.rownumber or 0, 0)
+
+
+def stream_query(query, params=None, *, itersize=STREAM_ITERSIZE, chunksize=None):
+    """
+    Stream a SELECT through a server-side cursor instead of fetchall().
+
+    Yields RealDictRows one at a time, or lists of up to `chunksize` rows when
+    `chunksize` is given. Rows are pulled from Postgres `itersize` at a time,
+    so memory stays flat however large the result is. Errors are raised.
+
+    Exhaust or close() the generator to hand the connection back to the pool.
+    """
+    with _server_cursor(query, params, itersize, RealDictCursor) as cursor:
+        if chunksize is None:
+            yield from cursor
+            return
+
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield rows
+
+
+def stream_frames(query, params=None, *, chunksize=50_000, itersize=None):
+    """
+    Like `stream_query`, but yields DataFrames of up to `chunksize` rows.
+
+    Rows are fetched as plain tuples (no per-row dicts) and each chunk is
+    built column-wise, so consumers can render the first chunk before the
+    scan finishes.
+    """
+    with _server_cursor(query, params, itersize or chunksize) as cursor:
+        extensions.register_type(_NUMERIC_AS_FLOAT, cursor)
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            columns = [col.name for col in cursor.description]
+            type_codes = [col.type_code for col in cursor.description]
+            # No categoricals: per-chunk categories would not line up on concat.
+            yield frame_from_tuples(columns, type_codes, rows, category_max_ratio=0)
+
+
+def query_frame(query, params=None, *, category_max_ratio=None):
+    """
+    Run a SELECT and return a typed DataFrame, built column-wise.
+
+    Rows come back as plain tuples (no per-row dicts) and are pivoted once
+    into typed columns: integers -> int64, numeric -> float64, timestamps ->
+    datetime64, low-cardinality text -> category.
+
+    Returns an empty DataFrame on error (logged), like `execute_query`.
+    """
+    kwargs = {} if category_max_ratio is None else {"category_max_ratio": category_max_ratio}
+    try:
+        with pool_for(query).connection() as conn:
+            with conn:
+                with timed(query, params) as timing, conn.cursor() as cursor:
+                    extensions.register_type(_NUMERIC_AS_FLOAT, cursor)
+                    cursor.execute(query, params)
+                    if cursor.description is None:
+                        return pd.DataFrame()
+
+                    rows = cursor.fetchall()
+                    timing.rows = len(rows)
+                    columns = [col.name for col in cursor.description]
+                    type_codes = [col.type_code for col in cursor.description]
+
+        return frame_from_tuples(columns, type_codes, rows, **kwargs)
+
+    except psycopg2.Error as e:
+        logger.error("Database error: %s", e)
+        return pd.DataFrame()
+    except Exception as e:
+        logger.exception("An unexpected error occurred: %s", e)
+        return pd.DataFrame()
@@ -0,0 +1,281 @@
+"""
+Intraday drawdown breach detection on live equity.
+
+risk.run_risk_pass checks the rules in periodic batches; this catches a
+breach on the equity update that causes it. `DrawdownDetector` keeps, per
+account slot, the rule inputs in flat NumPy arrays (account size, balance
+high-water mark, start-of-day balance and the two floors derived from
+them) and checks each update in O(1):
+
+- max drawdown:   equity <= high-water mark - MAX_DRAWDOWN_PCT * size
+- daily drawdown: equity <= start-of-day balance - DAILY_DRAWDOWN_PCT * size
+
+The same rules and snapshot as risk.py (`load()` takes risk.load_snapshot()).
+The high-water mark follows the balance as it rises; the start-of-day
+balance rolls over at midnight in ROLLUP_TZ to the first balance seen that
+day. An account breaches at most once; `apply_breach()` then closes it (or
+puts it in review, BREACH_ACTION = "review") with the breach snapshot in
+the account event payload.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from veilon_core.accounts import account_close, account_set_in_review
+from veilon_core.analytics import DAILY_DRAWDOWN_PCT, MAX_DRAWDOWN_PCT
+from veilon_core.db import db
+from veilon_core.risk import DAILY_DRAWDOWN, MAX_DRAWDOWN
+from veilon_core.schema import ROLLUP_TZ
+
+logger = logging.getLogger(__name__)
+
+BREACH_ACTION = str(db.get("BREACH_ACTION", "close"))   # "close" | "review"
+
+
+@dataclass(frozen=True)
+class Breach:
+    account_id: int
+    rule: str                 # risk.MAX_DRAWDOWN | risk.DAILY_DRAWDOWN
+    equity: float
+    balance: float
+    floor: float
+    high_water_mark: float
+    day_start_balance: float
+    account_size: float
+    detected_at: str          # ISO 8601, UTC
+
+    def payload(self) -> dict:
+        return asdict(self)
+
+
+class DrawdownDetector:
+    def __init__(
+        self,
+        *,
+        tz: str = ROLLUP_TZ,
+        max_drawdown_pct: float = MAX_DRAWDOWN_PCT,
+        daily_drawdown_pct: float = DAILY_DRAWDOWN_PCT,
+        slots: int = 1024,
+    ):
+        self.tz = ZoneInfo(tz)
+        self.max_drawdown_pct = max_drawdown_pct
+        self.daily_drawdown_pct = daily_drawdown_pct
+        self._slot_of: dict[int, int] = {}
+        self._accounts = np.zeros(slots, np.int64)
+        self._size = np.zeros(slots)
+        self._max_allowance = np.zeros(slots)      # size * max drawdown pct
+        self._daily_allowance = np.zeros(slots)    # size * daily drawdown pct
+        self._high_water = np.zeros(slots)
+        self._day_start = np.zeros(slots)
+        self._max_floor = np.full(slots, -np.inf)
+        self._daily_floor = np.full(slots, -np.inf)
+        self._floor = np.full(slots, -np.inf)      # the higher of the two: one compare per update
+        self._day = np.zeros(slots, np.int64)
+        self._breached = np.zeros(slots, bool)
+        self._free = list(range(slots - 1, -1, -1))
+        self._today = -1
+        self._day_end = -np.inf
+        self.updates = 0
+        self.breaches = 0
+        self._bind_views()
+
+    # ---------------------------------------------------------------
+    # Accounts
+    # ---------------------------------------------------------------
+    def load(self, snapshot: pd.DataFrame):
+        """Add (or reset) the accounts of a risk.load_snapshot() frame."""
+        if snapshot.empty:
+            return
+        for account_id in snapshot["account_id"].tolist():
+            self._slot(int(account_id))
+        slots = np.array([self._slot_of[int(a)] for a in snapshot["account_id"].tolist()])
+        size = snapshot["account_size"].to_numpy(np.float64)
+        balance = snapshot["balance"].to_numpy(np.float64)
+        self._size[slots] = size
+        self._max_allowance[slots] = size * np.asarray(snapshot.get("max_drawdown_pct", self.max_drawdown_pct), np.float64)
+        self._daily_allowance[slots] = size * np.asarray(snapshot.get("daily_drawdown_pct", self.daily_drawdown_pct), np.float64)
+        self._high_water[slots] = np.maximum(snapshot["high_water_mark"].to_numpy(np.float64), balance)
+        self._day_start[slots] = snapshot["day_start_balance"].to_numpy(np.float64)
+        self._day[slots] = self._current_day(time.time())
+        self._breached[slots] = False
+        self._refloor(slots)
+
+    def add(
+        self,
+        account_id: int,
+        account_size: float,
+        *,
+        balance: float,
+        high_water_mark: Optional[float] = None,
+        day_start_balance: Optional[float] = None,
+    ):
+        self.load(pd.DataFrame({
+            "account_id": [account_id],
+            "account_size": [account_size],
+            "balance": [balance],
+            "high_water_mark": [high_water_mark if high_water_mark is not None else max(balance, account_size)],
+            "day_start_balance": [day_start_balance if day_start_balance is not None else balance],
+        }))
+
+    def discard(self, account_id: int):
+        slot = self._slot_of.pop(account_id, None)
+        if slot is not None:
+            self._floor[slot] = self._max_floor[slot] = self._daily_floor[slot] = -np.inf
+            self._breached[slot] = True   # an unused slot never fires
+            self._accounts[slot] = 0
+            self._free.append(slot)       # load() resets every field on reuse
+
+    def __contains__(self, account_id: int) -> bool:
+        return account_id in self._slot_of
+
+    def _slot(self, account_id: int) -> int:
+        slot = self._slot_of.get(account_id)
+        if slot is None:
+            if not self._free:
+                size = len(self._accounts)
+                self._grow(size * 2)
+                self._free.extend(range(size * 2 - 1, size - 1, -1))
+            slot = self._free.pop()
+            self._slot_of[account_id] = slot
+            self._accounts[slot] = account_id
+        return slot
+
+    def _grow(self, slots: int):
+        fill = {"_max_floor": -np.inf, "_daily_floor": -np.inf, "_floor": -np.inf}
+        for name in ("_accounts", "_size", "_max_allowance", "_daily_allowance", "_high_water", "_day_start",
+                     "_max_floor", "_daily_floor", "_floor", "_day", "_breached"):
+            old = getattr(self, name)
+            grown = np.full(slots, fill.get(name, 0), old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+        self._bind_views()
+
+    def _bind_views(self):
+        # Scalar reads through a memoryview are ~3x cheaper than NumPy
+        # indexing and see the same memory; update() only uses these.
+        self._day_v = memoryview(self._day)
+        self._high_water_v = memoryview(self._high_water)
+        self._floor_v = memoryview(self._floor)
+        self._breached_v = memoryview(self._breached)
+        self._day_start_v = memoryview(self._day_start)
+        self._max_allowance_v = memoryview(self._max_allowance)
+        self._daily_allowance_v = memoryview(self._daily_allowance)
+
+    def _refloor(self, slots):
+        self._max_floor[slots] = self._high_water[slots] - self._max_allowance[slots]
+        self._daily_floor[slots] = self._day_start[slots] - self._daily_allowance[slots]
+        self._floor[slots] = np.maximum(self._max_floor[slots], self._daily_floor[slots])
+
+    # ---------------------------------------------------------------
+    # Trading day
+    # ---------------------------------------------------------------
+    def _current_day(self, ts: float) -> int:
+        if ts >= self._day_end:
+            local = datetime.fromtimestamp(ts, self.tz)
+            midnight = datetime(local.year, local.month, local.day, tzinfo=self.tz)
+            self._today = midnight.toordinal()
+            self._day_end = (midnight + timedelta(days=1)).timestamp()
+        return self._today
+
+    # ---------------------------------------------------------------
+    # Updates
+    # ---------------------------------------------------------------
+    def update(self, account_id: int, equity: float, balance: float, ts: Optional[float] = None) -> Optional[Breach]:
+        """Check one equity update; returns the Breach it causes, if any."""
+        self.updates += 1
+        slot = self._slot_of.get(account_id)
+        if slot is None:
+            return None
+        if ts is None:
+            ts = time.time()
+        if ts >= self._day_end or self._day_v[slot] != self._today:
+            today = self._current_day(ts)
+            if self._day_v[slot] != today:
+                self._day_v[slot] = today
+                self._day_start[slot] = balance
+                self._refloor(slot)
+        if balance > self._high_water_v[slot]:
+            self._high_water_v[slot] = balance
+            self._refloor(slot)
+        if equity > self._floor_v[slot] or self._breached_v[slot]:
+            return None
+        return self._breach(slot, equity, balance)
+
+    def update_many(
+        self,
+        account_ids: np.ndarray,
+        equities: np.ndarray,
+        balances: np.ndarray,
+        ts: Optional[float] = None,
+    ) -> list[Breach]:
+        """
+        Vectorized `update` for a batch holding at most one update per
+        account (e.g. the latest per account since the last batch).
+        """
+        self.updates += len(account_ids)
+        known = np.fromiter((self._slot_of.get(a, -1) for a in np.asarray(account_ids).tolist()),
+                            np.int64, len(account_ids))
+        mask = known >= 0
+        slots = known[mask]
+        equities = np.asarray(equities, np.float64)[mask]
+        balances = np.asarray(balances, np.float64)[mask]
+
+        today = self._current_day(time.time() if ts is None else ts)
+        rolled = self._day[slots] != today
+        self._day[slots[rolled]] = today
+        self._day_start[slots[rolled]] = balances[rolled]
+        self._high_water[slots] = np.maximum(self._high_water[slots], balances)
+        self._refloor(slots)
+
+        hit = np.flatnonzero((equities <= self._floor[slots]) & ~self._breached[slots])
+        return [self._breach(int(slots[i]), float(equities[i]), float(balances[i])) for i in hit]
+
+    def usage(self, account_id: int, equity: float) -> Optional[tuple[float, float]]:
+        """(max, daily) drawdown used at `equity`, as fractions of each limit."""
+        slot = self._slot_of.get(account_id)
+        if slot is None:
+            return None
+        max_allowance = self._max_allowance_v[slot]
+        daily_allowance = self._daily_allowance_v[slot]
+        return (
+            max(self._high_water_v[slot] - equity, 0.0) / max_allowance if max_allowance else 0.0,
+            max(self._day_start_v[slot] - equity, 0.0) / daily_allowance if daily_allowance else 0.0,
+        )
+
+    def _breach(self, slot: int, equity: float, balance: float) -> Breach:
+        self._breached[slot] = True
+        self.breaches += 1
+        max_floor = float(self._max_floor[slot])
+        rule = MAX_DRAWDOWN if equity <= max_floor else DAILY_DRAWDOWN
+        return Breach(
+            account_id=int(self._accounts[slot]),
+            rule=rule,
+            equity=float(equity),
+            balance=float(balance),
+            floor=max_floor if rule == MAX_DRAWDOWN else float(self._daily_floor[slot]),
+            high_water_mark=float(self._high_water[slot]),
+            day_start_balance=float(self._day_start[slot]),
+            account_size=float(self._size[slot]),
+            detected_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+    def stats(self) -> dict:
+        return {"accounts": len(self._slot_of), "updates": self.updates, "breaches": self.breaches}
+
+
+def apply_breach(breach: Breach, action: str = BREACH_ACTION) -> dict:
+    """Close the account (or put it in review) with the breach as event payload."""
+    details = {"breach": breach.payload()}
+    if action == "review":
+        return account_set_in_review(
+            breach.account_id, True, reason=breach.rule, actor_type="system", details=details,
+        )
+    return account_close(breach.account_id, close_reason=breach.rule, details=details)
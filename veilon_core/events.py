@@ -0,0 +1,309 @@
+"""
+Buffered, background writer for `account_events`.
+
+By default every account mutation writes its audit event in the same SQL
+statement. Processes that mutate at high rates (risk trackers adjusting many
+balances per second) can instead enable this writer: events are queued in
+memory and a background thread inserts them in batches with one multi-row
+INSERT, taking audit logging off the critical path.
+
+Trade-off: an event is no longer atomic with its mutation. Events still
+queued when the process dies abruptly are lost; a normal shutdown flushes
+the queue (atexit). A row the database rejects for good (e.g. its account
+was deleted before the flush) is logged and dropped rather than holding
+up every event behind it.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import psycopg2
+import streamlit as st
+from psycopg2.extras import Json, execute_values
+
+from veilon_core import instrumentation
+from veilon_core.db import transaction
+from veilon_core.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+_settings = st.secrets["database"]
+BUFFERED_EVENTS = bool(_settings.get("BUFFERED_EVENTS", False))  # enable the writer process-wide
+
+
+_INSERT_SQL = """
+    INSERT INTO account_events
+        (account_id, event_type, event_status, actor_type, actor_id, payload, occurred_at)
+    VALUES %s;
+"""
+
+# Errors that retrying the same rows cannot fix.
+_PERMANENT_ERRORS = (psycopg2.IntegrityError, psycopg2.DataError)
+
+
+class EventQueueFull(RuntimeError):
+    """Raised when the queue stayed full for longer than `put_timeout`."""
+
+
+class AccountEventWriter:
+    """
+    Bounded queue + background flusher for account_events.
+
+    - Flushes when `batch_size` events are waiting or `flush_interval`
+      seconds after the oldest queued event, whichever comes first.
+    - `submit` blocks while the queue is full (backpressure) and raises
+      EventQueueFull after `put_timeout` seconds.
+    - Failed batches are retried with backoff. After `bisect_after`
+      failures in a row the batch is written in halves, down to single
+      rows, so rows the database rejects (constraint or data errors) are
+      isolated, logged and dropped while the rest get through.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        put_timeout: float = 5.0,
+        bisect_after: int = 3,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.bisect_after = bisect_after
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending: list[tuple] = []   # taken off the queue, not yet committed
+
+        self._submitted = 0
+        self._written = 0
+        self._blocked = 0
+        self._failed_flushes = 0
+        self._dropped = 0
+        self._batches = 0
+        self._last_flush = 0.0
+        self._max_flush = 0.0
+
+    # ---------------------------------------------------------------
+    # Producer side
+    # ---------------------------------------------------------------
+    def submit(
+        self,
+        account_id: int,
+        *,
+        event_type: str,
+        actor_type: str = "system",
+        actor_id: Optional[int] = None,
+        event_status: Optional[str] = None,
+        payload: Optional[dict[str, Any]] = None,
+    ) -> dict:
+        occurred_at = datetime.now(timezone.utc)
+        row = (account_id, event_type, event_status, actor_type, actor_id, Json(payload or {}), occurred_at)
+
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._blocked += 1
+            try:
+                self._queue.put(row, timeout=self.put_timeout)
+            except queue.Full:
+                raise EventQueueFull(
+                    f"account_events queue full ({self._queue.maxsize}) for {self.put_timeout:.1f}s"
+                ) from None
+
+        with self._lock:
+            self._submitted += 1
+        return {"id": None, "account_id": account_id, "event_type": event_type, "occurred_at": occurred_at}
+
+    # ---------------------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------------------
+    def start(self) -> "AccountEventWriter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="veilon-event-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything submitted so far is written. Returns False on timeout."""
+        with self._lock:
+            target = self._submitted
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self._written + self._dropped >= target:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def close(self, timeout: float = 10.0):
+        """Stop the background thread after writing out everything queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Anything left (thread never started / timed out): one last attempt.
+        self._drain_into_pending()
+        if self._pending and not (self._write_pending() or self._write_bisected()):
+            logger.error("Dropping %d account events that could not be written on shutdown.", len(self._pending))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize() + len(self._pending),
+                "queue_max": self._queue.maxsize,
+                "submitted": self._submitted,
+                "written": self._written,
+                "blocked_submits": self._blocked,
+                "batches": self._batches,
+                "failed_flushes": self._failed_flushes,
+                "dropped": self._dropped,
+                "last_flush_ms": self._last_flush * 1000,
+                "max_flush_ms": self._max_flush * 1000,
+            }
+
+    # ---------------------------------------------------------------
+    # Consumer side
+    # ---------------------------------------------------------------
+    def _run(self):
+        backoff = 0.1
+        failures = 0
+        while not self._stop.is_set() or not self._queue.empty() or self._pending:
+            if not self._pending:
+                self._collect_batch()
+            if not self._pending:
+                continue
+            written = self._write_bisected() if failures >= self.bisect_after else self._write_pending()
+            if written:
+                backoff = 0.1
+                failures = 0
+            else:
+                failures += 1
+                if self._stop.is_set():
+                    return  # close() makes the final attempt and reports losses
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+
+    def _collect_batch(self):
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Past the deadline: only take what is already queued.
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        with self._lock:
+            self._pending = batch
+
+    def _drain_into_pending(self):
+        with self._lock:
+            while True:
+                try:
+                    self._pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+    @staticmethod
+    def _insert(rows: list[tuple]):
+        with transaction() as tx, tx.conn.cursor() as cursor, timed(_INSERT_SQL) as timing:
+            execute_values(cursor, _INSERT_SQL, rows, page_size=len(rows))
+            timing.rows = len(rows)
+
+    def _write_pending(self) -> bool:
+        batch = self._pending
+        started = time.perf_counter()
+        try:
+            self._insert(batch)
+        except Exception as e:
+            logger.warning("Writing %d account events failed, will retry: %s", len(batch), e)
+            with self._lock:
+                self._failed_flushes += 1
+            return False
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._pending = []
+            self._written += len(batch)
+            self._batches += 1
+            self._last_flush = elapsed
+            self._max_flush = max(self._max_flush, elapsed)
+        return True
+
+    def _write_bisected(self) -> bool:
+        """
+        Write the pending batch in halves, down to single rows, dropping
+        rows that fail alone with a permanent error. Any other error stops
+        the split; what is left stays pending for the next retry.
+        """
+        chunks = [self._pending]   # a stack: first half on top
+        while chunks:
+            rows = chunks.pop()
+            try:
+                self._insert(rows)
+            except _PERMANENT_ERRORS as e:
+                if len(rows) > 1:
+                    middle = len(rows) // 2
+                    chunks += [rows[middle:], rows[:middle]]
+                    continue
+                account_id, event_type = rows[0][:2]
+                logger.error("Dropping account event %s for account %s rejected by the database: %s",
+                             event_type, account_id, e)
+                with self._lock:
+                    self._dropped += 1
+            except Exception as e:
+                logger.warning("Writing account events failed, will retry: %s", e)
+                with self._lock:
+                    self._pending = [row for chunk in [rows, *reversed(chunks)] for row in chunk]
+                    self._failed_flushes += 1
+                return False
+            else:
+                with self._lock:
+                    self._written += len(rows)
+                    self._batches += 1
+        with self._lock:
+            self._pending = []
+        return True
+
+
+_writer: Optional[AccountEventWriter] = None
+_writer_lock = threading.Lock()
+
+
+def enable_event_writer(**options) -> AccountEventWriter:
+    """Start the process-wide buffered writer (idempotent)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AccountEventWriter(**options).start()
+            instrumentation.register_collector("account_events", _writer.stats)
+            atexit.register(_writer.close)
+    return _writer
+
+
+def get_event_writer() -> Optional[AccountEventWriter]:
+    """The buffered writer if enabled (explicitly or via BUFFERED_EVENTS), else None."""
+    if _writer is None and BUFFERED_EVENTS:
+        return enable_event_writer()
+    return _writer
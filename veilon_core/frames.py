@@ -0,0 +1,98 @@
+"""
+Column-wise DataFrame construction from DB-API tuple rows.
+
+Kept free of any Streamlit / connection state so it can be reused (and
+benchmarked) outside the app.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    # pandas' C-level row -> object matrix pivot (what DataFrame.from_records
+    # uses internally); several times faster than zip(*rows).
+    from pandas._libs.lib import to_object_array_tuples as _object_matrix
+except ImportError:  # pragma: no cover - private API, keep a pure-Python path
+    _object_matrix = None
+
+# Postgres type OIDs (pg_type.oid) we know how to build typed columns for.
+INT_OIDS = {20, 21, 23}                 # int8, int2, int4
+FLOAT_OIDS = {700, 701, 1700}           # float4, float8, numeric
+BOOL_OIDS = {16}
+TIMESTAMP_OIDS = {1114}                 # timestamp
+TIMESTAMPTZ_OIDS = {1184}               # timestamptz
+DATE_OIDS = {1082}
+TEXT_OIDS = {25, 1042, 1043}            # text, bpchar, varchar
+
+# Text columns with at most this share of distinct values become categoricals.
+CATEGORY_MAX_RATIO = 0.5
+
+
+def frame_from_tuples(
+    columns: Sequence[str],
+    type_codes: Sequence[int],
+    rows: Sequence[tuple],
+    *,
+    category_max_ratio: float = CATEGORY_MAX_RATIO,
+) -> pd.DataFrame:
+    """
+    Build a DataFrame from tuple rows one column at a time.
+
+    - int2/4/8    -> int64 (float64 when the column has NULLs)
+    - float/numeric -> float64
+    - bool        -> bool (object when the column has NULLs)
+    - timestamp(tz) / date -> datetime64
+    - low-cardinality text -> category
+    - anything else -> object
+    """
+    n = len(rows)
+    data = {}
+    for name, oid, values in zip(columns, type_codes, _object_columns(rows, len(columns))):
+        data[name] = _typed_column(values, oid, n, category_max_ratio)
+
+    return pd.DataFrame(data, columns=list(columns))
+
+
+def _object_columns(rows: Sequence[tuple], width: int) -> list[np.ndarray]:
+    """Pivot tuple rows into one 1-d object array per column."""
+    n = len(rows)
+    if n and _object_matrix is not None:
+        matrix = _object_matrix(rows if isinstance(rows, list) else list(rows))
+        return [matrix[:, i] for i in range(width)]
+
+    columns = [np.empty(n, dtype=object) for _ in range(width)]
+    for i, row in enumerate(rows):
+        for column, value in zip(columns, row):
+            column[i] = value
+    return columns
+
+
+def _typed_column(values: np.ndarray, oid: int, n: int, category_max_ratio: float):
+    if oid in INT_OIDS:
+        if pd.isna(values).any():
+            return values.astype(np.float64)
+        return values.astype(np.int64)
+
+    if oid in FLOAT_OIDS:
+        return values.astype(np.float64)
+
+    if oid in BOOL_OIDS:
+        if pd.isna(values).any():
+            return values
+        return values.astype(bool)
+
+    if oid in TIMESTAMPTZ_OIDS:
+        return pd.to_datetime(values, utc=True)
+
+    if oid in TIMESTAMP_OIDS or oid in DATE_OIDS:
+        return pd.to_datetime(values)
+
+    if oid in TEXT_OIDS and n:
+        codes, categories = pd.factorize(values)
+        if len(categories) <= n * category_max_ratio:
+            return pd.Categorical.from_codes(codes, categories)
+
+    return values
@@ -0,0 +1,285 @@
+"""
+Per-statement query metrics for veilon_core.
+
+Every statement run through `veilon_core.db` is recorded under its
+fingerprint (SQL with literals and placeholders normalised away): call
+count, error count, rows returned and a latency histogram. Statements slower
+than the slow-query threshold are logged with their normalised SQL and the
+*shape* of their parameters (types only, never values).
+
+Snapshots can be exported as JSON or Prometheus text, and `serve_metrics`
+exposes both over HTTP for local scraping.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("veilon_core.db")
+
+# Histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_slow_query_seconds = 0.5
+
+_lock = threading.Lock()
+_stats: dict[str, "_QueryStats"] = {}
+_collectors: dict[str, Callable[[], dict[str, float]]] = {}
+
+
+class _QueryStats:
+    __slots__ = ("fingerprint", "count", "errors", "rows", "total_seconds", "max_seconds", "buckets")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+
+
+# -------------------------------------------------------------------
+# Fingerprinting
+# -------------------------------------------------------------------
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """
+    Normalise SQL so every execution of the same statement shares one key:
+    comments dropped, literals and placeholders replaced by `?`, value lists
+    collapsed, whitespace squeezed.
+    """
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _LIST_RE.sub("(?...)", text)
+    return _SPACE_RE.sub(" ", text).strip().rstrip(";").strip()
+
+
+def query_id(fp: str) -> str:
+    return hashlib.sha1(fp.encode()).hexdigest()[:12]
+
+
+def params_shape(params: Any) -> str:
+    """Describe bind parameters by type (and length), never by value."""
+    if params is None:
+        return "none"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {_value_shape(v)}" for k, v in params.items()) + "}"
+    if isinstance(params, (list, tuple)):
+        return "(" + ", ".join(_value_shape(v) for v in params) + ")"
+    return _value_shape(params)
+
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+# -------------------------------------------------------------------
+# Recording
+# -------------------------------------------------------------------
+def configure(*, slow_query_seconds: Optional[float] = None):
+    global _slow_query_seconds
+    if slow_query_seconds is not None:
+        _slow_query_seconds = slow_query_seconds
+
+
+def record(sql: str, params: Any, seconds: float, *, rows: int = 0, error: bool = False):
+    fp = fingerprint(sql)
+
+    with _lock:
+        stats = _stats.get(fp)
+        if stats is None:
+            stats = _stats[fp] = _QueryStats(fp)
+        stats.count += 1
+        stats.errors += int(error)
+        stats.rows += rows
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                stats.buckets[i] += 1
+                break
+        else:
+            stats.buckets[-1] += 1
+
+    if seconds >= _slow_query_seconds:
+        logger.warning(
+            "Slow query (%.1f ms, rows=%s, error=%s) params=%s: %s",
+            seconds * 1000, rows, error, params_shape(params), fp,
+        )
+
+
+class _Timing:
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = 0
+
+
+@contextmanager
+def timed(sql: str, params: Any = None):
+    """
+    Time a statement and record it on exit; set `.rows` on the yielded
+    object once the row count is known. Exceptions are recorded as errors
+    and re-raised.
+    """
+    timing = _Timing()
+    started = time.perf_counter()
+    try:
+        yield timing
+    except BaseException:
+        record(sql, params, time.perf_counter() - started, rows=timing.rows, error=True)
+        raise
+    record(sql, params, time.perf_counter() - started, rows=timing.rows)
+
+
+def register_collector(name: str, collect: Callable[[], dict[str, float]]):
+    """
+    Export extra gauges/counters (pool usage, queue depth, ...) alongside the
+    query metrics. `collect()` returns a flat {metric: number} dict.
+    """
+    with _lock:
+        _collectors[name] = collect
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+# -------------------------------------------------------------------
+# Export
+# -------------------------------------------------------------------
+def snapshot() -> dict:
+    with _lock:
+        queries = [
+            {
+                "query_id": query_id(s.fingerprint),
+                "fingerprint": s.fingerprint,
+                "count": s.count,
+                "errors": s.errors,
+                "rows": s.rows,
+                "total_ms": s.total_seconds * 1000,
+                "mean_ms": s.total_seconds / s.count * 1000 if s.count else 0.0,
+                "max_ms": s.max_seconds * 1000,
+                "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], s.buckets)),
+            }
+            for s in _stats.values()
+        ]
+        collectors = dict(_collectors)
+
+    queries.sort(key=lambda q: q["total_ms"], reverse=True)
+    return {
+        "slow_query_ms": _slow_query_seconds * 1000,
+        "queries": queries,
+        "collectors": {name: _collect(name, fn) for name, fn in collectors.items()},
+    }
+
+
+def snapshot_json(**kwargs) -> str:
+    return json.dumps(snapshot(), **kwargs)
+
+
+def render_prometheus() -> str:
+    snap = snapshot()
+    lines = [
+        "# HELP veilon_db_query_duration_seconds Statement latency by query fingerprint.",
+        "# TYPE veilon_db_query_duration_seconds histogram",
+    ]
+    for q in snap["queries"]:
+        labels = f'query_id="{q["query_id"]}",statement="{_escape(q["fingerprint"][:200])}"'
+        cumulative = 0
+        for le, n in q["buckets"].items():
+            cumulative += n
+            lines.append(f'veilon_db_query_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"veilon_db_query_duration_seconds_sum{{{labels}}} {q['total_ms'] / 1000:.6f}")
+        lines.append(f"veilon_db_query_duration_seconds_count{{{labels}}} {q['count']}")
+
+    for metric, key, help_text in (
+        ("veilon_db_query_errors_total", "errors", "Failed executions by query fingerprint."),
+        ("veilon_db_query_rows_total", "rows", "Rows returned by query fingerprint."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for q in snap["queries"]:
+            lines.append(f'{metric}{{query_id="{q["query_id"]}"}} {q[key]}')
+
+    for name, values in snap["collectors"].items():
+        for key, value in values.items():
+            metric = re.sub(r"[^a-zA-Z0-9_]", "_", f"veilon_{name}_{key}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {float(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _collect(name: str, fn: Callable[[], dict[str, float]]) -> dict[str, float]:
+    try:
+        return {k: v for k, v in fn().items() if isinstance(v, (int, float))}
+    except Exception as e:
+        logger.warning("Metrics collector %s failed: %s", name, e)
+        return {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+# -------------------------------------------------------------------
+# Local HTTP endpoint
+# -------------------------------------------------------------------
+_server: Optional[ThreadingHTTPServer] = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, content_type = render_prometheus(), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = snapshot_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a daemon thread.
+    Idempotent: one server per process.
+    """
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="veilon-metrics", daemon=True).start()
+    return _server
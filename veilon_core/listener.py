@@ -0,0 +1,162 @@
+"""
+Cross-process cache invalidation via Postgres LISTEN/NOTIFY.
+
+Triggers from `veilon_core.schema.NOTIFY_TRIGGERS` publish one notification
+per changed row on `veilon_<table>`. Each process runs a single listener
+thread on one dedicated (non-pooled) connection to the primary and hands
+every notification to the handlers registered for that table, which drop
+the matching cache keys.
+
+If the connection drops, notifications sent meanwhile are lost, so after
+every (re)connect the registered `reset` callbacks run and clear the
+caches outright.
+
+Enable with LISTEN_NOTIFY = true under [database] in secrets (or call
+`start_listener()`); caches can then use long TTLs.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import select
+import threading
+from typing import Callable, Optional
+
+import psycopg2
+from psycopg2 import extensions
+
+from veilon_core import db, instrumentation
+from veilon_core.schema import NOTIFY_TABLES
+
+logger = logging.getLogger(__name__)
+
+LISTEN_NOTIFY = bool(db.db.get("LISTEN_NOTIFY", False))
+
+Handler = Callable[[dict], None]
+
+_handlers: dict[str, list[Handler]] = {}
+_resets: list[Callable[[], None]] = []
+_lock = threading.Lock()
+
+
+def on_change(table: str, handler: Handler, *, reset: Optional[Callable[[], None]] = None):
+    """
+    Call `handler(payload)` for every change notification on `table`;
+    `reset()` runs whenever notifications may have been missed.
+
+    Registration also starts the listener when LISTEN_NOTIFY is enabled.
+    """
+    with _lock:
+        _handlers.setdefault(table, []).append(handler)
+        if reset is not None:
+            _resets.append(reset)
+    if LISTEN_NOTIFY:
+        start_listener()
+
+
+class ChangeListener:
+    def __init__(self, tables, *, poll_interval: float = 5.0):
+        self.tables = tuple(tables)
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._received = 0
+        self._reconnects = 0
+        self._handler_errors = 0
+        self._connected = False
+
+    def start(self) -> "ChangeListener":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="veilon-listener", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "connected": int(self._connected),
+            "received": self._received,
+            "reconnects": self._reconnects,
+            "handler_errors": self._handler_errors,
+        }
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = db.connect()
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    for table in self.tables:
+                        cursor.execute(f"LISTEN veilon_{table};")
+                self._connected = True
+                backoff = 1.0
+                _run_resets()
+                self._listen(conn)
+            except psycopg2.Error as e:
+                logger.warning("Change listener disconnected, retrying in %.0fs: %s", backoff, e)
+            finally:
+                self._connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if not self._stop.is_set():
+                self._reconnects += 1
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([conn], [], [], self.poll_interval)
+            if not ready:
+                # Idle: a cheap round trip surfaces dead connections.
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1;")
+            conn.poll()
+            while conn.notifies:
+                self._dispatch(conn.notifies.pop(0))
+
+    def _dispatch(self, notify):
+        self._received += 1
+        table = notify.channel.removeprefix("veilon_")
+        try:
+            payload = json.loads(notify.payload) if notify.payload else {}
+        except ValueError:
+            payload = {}
+        with _lock:
+            handlers = list(_handlers.get(table, ()))
+        for handler in handlers:
+            try:
+                handler(payload)
+            except Exception as e:
+                self._handler_errors += 1
+                logger.warning("Change handler for %s failed: %s", table, e)
+
+
+def _run_resets():
+    with _lock:
+        resets = list(_resets)
+    for reset in resets:
+        try:
+            reset()
+        except Exception as e:
+            logger.warning("Cache reset failed: %s", e)
+
+
+_listener: Optional[ChangeListener] = None
+
+
+def start_listener() -> ChangeListener:
+    """Start the process-wide listener (idempotent)."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = ChangeListener(NOTIFY_TABLES).start()
+            instrumentation.register_collector("listener", _listener.stats)
+    return _listener
@@ -0,0 +1,247 @@
+"""
+Shared-memory table of live equity per account.
+
+Tracker processes publish each account's latest balance, equity and
+drawdown usage into a fixed-layout, memory-mapped file (LIVE_EQUITY_PATH,
+on /dev/shm by default). Any process on the host, e.g. every Streamlit
+session, maps it read-only and looks an account up with no database or
+broker round trip.
+
+Layout: a 64-byte header, then `capacity` (power of two) slots of 64
+bytes, one cache line each:
+
+    0 seq  1 account_id  2 balance  3 equity  4 max_drawdown_used
+    5 daily_drawdown_used  6 updated_at (epoch seconds)  7 reserved
+
+Slots are found by open addressing on the account id (linear probing from
+`account_id & (capacity - 1)`), so sequential ids rarely collide. Claiming
+a slot takes an flock on the file. Claims are rare, once per account, and
+a slot idle for RECLAIM_AFTER may be taken over. Publishing is lock-free
+under a per-slot seqlock: the writer makes `seq` odd, writes the fields,
+then makes it even again. A reader retries while `seq` is odd or changed
+under it, so it never returns a torn row. A writer killed mid-row leaves
+`seq` odd; the next publish still goes odd then even from there.
+
+The seqlock does not arbitrate between two live writers of one account.
+The supervisor prevents that: an account moves to its new worker only
+after the old worker has acknowledged releasing it, or has died (see
+veilon_core.supervisor). Trackers started by hand outside the supervisor
+must not share accounts. Visibility also relies on stores becoming
+visible in program order (x86-64).
+"""
+from __future__ import annotations
+
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from veilon_core.db import db
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+LIVE_EQUITY_PATH = str(db.get("LIVE_EQUITY_PATH", os.path.join(_DEFAULT_DIR, "veilon-live-equity")))
+LIVE_EQUITY_SLOTS = int(db.get("LIVE_EQUITY_SLOTS", 1 << 18))   # 16 MB
+LIVE_EQUITY_MAX_AGE = float(db.get("LIVE_EQUITY_MAX_AGE", 30))  # seconds before a row counts as stale
+RECLAIM_AFTER = 86_400.0                                          # idle seconds before a slot may be reused
+
+_MAGIC = b"VLEQ"
+_VERSION = 1
+_HEADER = struct.Struct("<4sII")     # magic, version, capacity
+_HEADER_SIZE = 64
+_FIELDS = 8                          # 8-byte words per slot
+_SEQ, _ACCOUNT, _BALANCE, _EQUITY, _MAX_DD, _DAILY_DD, _UPDATED = range(7)
+_READ_RETRIES = 100
+
+
+class LiveEquity(NamedTuple):   # a tuple: ~6x cheaper to build per read than a frozen dataclass
+    account_id: int
+    balance: float
+    equity: float
+    max_drawdown_used: float     # NaN when the publisher has no rule state
+    daily_drawdown_used: float
+    updated_at: float            # epoch seconds
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.age <= LIVE_EQUITY_MAX_AGE
+
+
+class LiveEquityTable:
+    """A mapping of the table file; writable in tracker processes, read-only elsewhere."""
+
+    def __init__(self, path: str = LIVE_EQUITY_PATH, *, writable: bool = False, capacity: int = LIVE_EQUITY_SLOTS):
+        self.path = path
+        self.writable = writable
+        if writable:
+            _create(path, capacity)
+        self._fd = os.open(path, os.O_RDWR if writable else os.O_RDONLY)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            magic, version, capacity = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path} is not a live equity table (version {_VERSION})")
+            self.capacity = capacity
+            self._mask = capacity - 1
+            self._map = mmap.mmap(
+                self._fd, _HEADER_SIZE + capacity * _FIELDS * 8,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+            )
+        except Exception:
+            os.close(self._fd)
+            raise
+        # Two typed views of the same bytes (no copies): ids / seq as integers,
+        # values as floats. memoryviews make scalar access cheap.
+        words = np.frombuffer(self._map, np.uint64, capacity * _FIELDS, _HEADER_SIZE)
+        self._u = memoryview(words)
+        self._f = memoryview(words.view(np.float64))
+        self._slots: dict[int, int] = {}
+
+    # ---------------------------------------------------------------
+    # Lookup
+    # ---------------------------------------------------------------
+    def _find(self, account_id: int) -> Optional[int]:
+        slot = self._slots.get(account_id)
+        if slot is not None and self._u[slot * _FIELDS + _ACCOUNT] == account_id:
+            return slot
+        i = account_id & self._mask
+        for _ in range(self.capacity):
+            owner = self._u[i * _FIELDS + _ACCOUNT]
+            if owner == account_id:
+                self._slots[account_id] = i
+                return i
+            if owner == 0:
+                return None
+            i = (i + 1) & self._mask
+        return None
+
+    def read(self, account_id: int) -> Optional[LiveEquity]:
+        """The account's latest published row, or None if it has none."""
+        slot = self._find(account_id)
+        if slot is None:
+            return None
+        base = slot * _FIELDS
+        u, f = self._u, self._f
+        for _ in range(_READ_RETRIES):
+            before = u[base + _SEQ]
+            if before & 1:
+                continue   # write in progress
+            values = f[base + _BALANCE:base + _UPDATED + 1].tolist()
+            owner = u[base + _ACCOUNT]
+            if u[base + _SEQ] == before:
+                if owner != account_id:
+                    return None   # slot reclaimed meanwhile
+                return LiveEquity(account_id, *values)
+        return None
+
+    # ---------------------------------------------------------------
+    # Publish
+    # ---------------------------------------------------------------
+    def publish(
+        self,
+        account_id: int,
+        balance: float,
+        equity: float,
+        max_drawdown_used: float = float("nan"),
+        daily_drawdown_used: float = float("nan"),
+        updated_at: Optional[float] = None,
+    ) -> bool:
+        slot = self._find(account_id)
+        if slot is None:
+            slot = self._claim(account_id)
+            if slot is None:
+                return False
+        base = slot * _FIELDS
+        u, f = self._u, self._f
+        seq = (u[base + _SEQ] + 1) | 1   # odd even if a killed writer left it odd
+        u[base + _SEQ] = seq
+        f[base + _BALANCE] = balance
+        f[base + _EQUITY] = equity
+        f[base + _MAX_DD] = max_drawdown_used
+        f[base + _DAILY_DD] = daily_drawdown_used
+        f[base + _UPDATED] = time.time() if updated_at is None else updated_at
+        u[base + _SEQ] = seq + 1
+        return True
+
+    def _claim(self, account_id: int) -> Optional[int]:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            slot = self._find(account_id)   # claimed by another process meanwhile?
+            if slot is not None:
+                return slot
+            stale_before = time.time() - RECLAIM_AFTER
+            i = account_id & self._mask
+            for _ in range(self.capacity):
+                base = i * _FIELDS
+                if self._u[base + _ACCOUNT] == 0 or self._f[base + _UPDATED] < stale_before:
+                    seq = self._u[base + _SEQ] + 1
+                    self._u[base + _SEQ] = seq | 1
+                    self._u[base + _ACCOUNT] = account_id
+                    for field in range(_BALANCE, _UPDATED + 1):
+                        self._f[base + field] = float("nan")
+                    self._f[base + _UPDATED] = time.time()
+                    self._u[base + _SEQ] = (seq | 1) + 1
+                    self._slots[account_id] = i
+                    return i
+                i = (i + 1) & self._mask
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        logger.error("Live equity table %s is full (%d slots).", self.path, self.capacity)
+        return None
+
+    def close(self):
+        self._u.release()
+        self._f.release()
+        self._map.close()
+        os.close(self._fd)
+
+
+def _create(path: str, capacity: int):
+    """Create the table file if it does not exist (atomically: temp file + link)."""
+    if capacity & (capacity - 1):
+        raise ValueError("Live equity table capacity must be a power of two.")
+    if os.path.exists(path):
+        return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, capacity).ljust(_HEADER_SIZE, b"\0"))
+        f.truncate(_HEADER_SIZE + capacity * _FIELDS * 8)
+    try:
+        os.link(tmp, path)   # fails if another process created it first
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp)
+
+
+_reader: Optional[LiveEquityTable] = None
+_reader_lock = threading.Lock()
+
+
+def read_live_equity(account_id: int) -> Optional[LiveEquity]:
+    """
+    The account's live row from this host's table, or None when there is
+    no table (no tracker running here) or no fresh row for the account.
+    """
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                try:
+                    _reader = LiveEquityTable(LIVE_EQUITY_PATH)
+                except (OSError, ValueError):
+                    return None
+    row = _reader.read(int(account_id))
+    return row if row is not None and row.is_fresh else None
@@ -1,6 +1,20 @@
+from veilon_core.cache import TTLCache
 from veilon_core.db import execute_query
+from veilon_core.listener import LISTEN_NOTIFY, on_change
+
+# Plans change a few times a year; with LISTEN/NOTIFY on, other processes'
+# edits invalidate this cache immediately.
+_plan_cache = TTLCache("plans", ttl=3600 if LISTEN_NOTIFY else 60, maxsize=256)
+
+# Tiny table: any change simply drops every cached plan.
+on_change("plans", lambda payload: _plan_cache.clear(), reset=_plan_cache.clear)
+
 
 def get_plan_by_account_size(account_size: int) -> dict | None:
+    plan = _plan_cache.get(("size", account_size))
+    if plan is not None:
+        return dict(plan)
+
     rows = execute_query(
         """
         SELECT
@@ -17,4 +31,32 @@ def get_plan_by_account_size(account_size: int) -> dict | None:
         """,
         (account_size,),
     )
-    return rows[0] if rows else None
+    if not rows:
+        return None
+    _plan_cache.set(("size", account_size), rows[0])
+    return dict(rows[0])
+
+
+def get_plan_by_id(plan_id: int) -> dict | None:
+    plan = _plan_cache.get(("id", plan_id))
+    if plan is not None:
+        return dict(plan)
+
+    rows = execute_query(
+        """
+        SELECT
+            id,
+            name,
+            code,
+            account_size,
+            price,
+            stripe_link
+        FROM plans
+        WHERE id = %s;
+        """,
+        (plan_id,),
+    )
+    if not rows:
+        return None
+    _plan_cache.set(("id", plan_id), rows[0])
+    return dict(rows[0])
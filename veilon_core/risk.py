@@ -0,0 +1,204 @@
+"""
+Batch evaluation of the challenge rules across all live accounts.
+
+One query loads every open account with its plan's rules, its start-of-day
+balance and balance high-water mark (from the daily returns rollup); the
+rules are then checked for all accounts at once over NumPy arrays, and the
+outcomes are applied with the bulk account mutations:
+
+- max / daily drawdown breached -> account_close_many (close_reason = rule)
+- profit target reached         -> account_change_phase_many (next phase), or
+                                   account_set_in_review_many on the final phase
+
+Drawdowns are checked against equity (live, when the caller has it) and the
+profit target against realized balance, measured from the balance the
+account entered its current phase with (`accounts.phase_start_balance`,
+schema.SCHEMA["phases"]; the account size in the first phase). Plans may override the defaults
+from veilon_core.analytics with `profit_target_pct`, `daily_drawdown_pct`,
+`max_drawdown_pct` and `phases` columns.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from veilon_core.accounts import (
+    account_change_phase_many,
+    account_close_many,
+    account_set_in_review_many,
+)
+from veilon_core.analytics import DAILY_DRAWDOWN_PCT, MAX_DRAWDOWN_PCT, PROFIT_TARGET_PCT
+from veilon_core.db import query_frame
+from veilon_core.schema import ROLLUP_TZ
+
+logger = logging.getLogger(__name__)
+
+# Outcomes, in precedence order (a breach beats a pass).
+MAX_DRAWDOWN = "max_drawdown"
+DAILY_DRAWDOWN = "daily_drawdown"
+PROFIT_TARGET = "profit_target"
+OK = "ok"
+
+DEFAULT_PHASES = 1   # "1-Step" plans: passing the only phase goes to review
+
+_SNAPSHOT_SQL = """
+    WITH rules AS (
+        SELECT
+            p.id,
+            p.account_size::float8 AS account_size,
+            COALESCE((to_jsonb(p) ->> 'profit_target_pct')::float8, %(profit_target_pct)s) AS profit_target_pct,
+            COALESCE((to_jsonb(p) ->> 'daily_drawdown_pct')::float8, %(daily_drawdown_pct)s) AS daily_drawdown_pct,
+            COALESCE((to_jsonb(p) ->> 'max_drawdown_pct')::float8, %(max_drawdown_pct)s) AS max_drawdown_pct,
+            COALESCE((to_jsonb(p) ->> 'phases')::int, %(phases)s) AS phases
+        FROM plans p
+    )
+    SELECT
+        a.id AS account_id,
+        a.plan_id,
+        COALESCE(a.phase, 1)::int AS phase,
+        (a.is_funded IS TRUE OR a.funded_at IS NOT NULL) AS is_funded,
+        COALESCE(a.balance::float8, r.account_size) AS balance,
+        r.account_size,
+        COALESCE(a.phase_start_balance::float8, r.account_size) AS phase_start_balance,
+        COALESCE(
+            CASE WHEN d.trading_day = today.day THEN d.start_balance ELSE d.end_balance END,
+            r.account_size
+        )::float8 AS day_start_balance,
+        GREATEST(r.account_size, COALESCE(d.peak_balance::float8, r.account_size)) AS high_water_mark,
+        r.profit_target_pct,
+        r.daily_drawdown_pct,
+        r.max_drawdown_pct,
+        r.phases
+    FROM accounts a
+    JOIN rules r ON r.id = a.plan_id
+    CROSS JOIN (SELECT (now() AT TIME ZONE %(tz)s)::date AS day) today
+    LEFT JOIN LATERAL (
+        SELECT trading_day, start_balance, end_balance, peak_balance
+        FROM account_daily_returns
+        WHERE account_id = a.id AND trading_day <= today.day
+        ORDER BY trading_day DESC
+        LIMIT 1
+    ) d ON TRUE
+    WHERE a.closed_at IS NULL
+      AND a.is_enabled IS TRUE
+      AND a.in_review IS NOT TRUE
+      AND (%(ids)s::bigint[] IS NULL OR a.id = ANY(%(ids)s::bigint[]))
+    ORDER BY a.id;
+"""
+
+
+def load_snapshot(account_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """
+    Every open, enabled, not-in-review account (or only those of
+    `account_ids`) with its rule inputs.
+    """
+    return query_frame(
+        _SNAPSHOT_SQL,
+        {
+            "profit_target_pct": PROFIT_TARGET_PCT,
+            "daily_drawdown_pct": DAILY_DRAWDOWN_PCT,
+            "max_drawdown_pct": MAX_DRAWDOWN_PCT,
+            "phases": DEFAULT_PHASES,
+            "tz": ROLLUP_TZ,
+            "ids": sorted({int(a) for a in account_ids}) if account_ids is not None else None,
+        },
+        category_max_ratio=0,
+    )
+
+
+def evaluate(snapshot: pd.DataFrame, equities: Optional[Mapping[int, float]] = None) -> pd.DataFrame:
+    """
+    Check every account's rules in one vectorized pass.
+
+    `equities` maps account_id -> live equity; accounts without one are
+    judged on balance. Returns account_id, outcome, phase, next_phase and
+    the drawdown / profit figures behind the outcome.
+    """
+    ids = snapshot["account_id"].to_numpy()
+    size = snapshot["account_size"].to_numpy(np.float64)
+    balance = snapshot["balance"].to_numpy(np.float64)
+
+    equity = balance
+    if equities:
+        live = pd.Series(equities, dtype=np.float64).reindex(ids).to_numpy()
+        equity = np.where(np.isnan(live), balance, live)
+
+    high_water = np.maximum(snapshot["high_water_mark"].to_numpy(np.float64), balance)
+    max_floor = high_water - size * snapshot["max_drawdown_pct"].to_numpy(np.float64)
+    daily_floor = (
+        snapshot["day_start_balance"].to_numpy(np.float64)
+        - size * snapshot["daily_drawdown_pct"].to_numpy(np.float64)
+    )
+    # Each phase's target counts from the balance the phase started with.
+    phase_start = (
+        snapshot["phase_start_balance"].to_numpy(np.float64)
+        if "phase_start_balance" in snapshot.columns else size
+    )
+    profit = balance - np.where(np.isnan(phase_start), size, phase_start)
+    target = size * snapshot["profit_target_pct"].to_numpy(np.float64)
+    funded = snapshot["is_funded"].to_numpy(bool)
+
+    outcome = np.select(
+        [equity <= max_floor, equity <= daily_floor, ~funded & (profit >= target)],
+        [MAX_DRAWDOWN, DAILY_DRAWDOWN, PROFIT_TARGET],
+        default=OK,
+    )
+
+    phase = snapshot["phase"].to_numpy(np.int64)
+    final_phase = phase >= snapshot["phases"].to_numpy(np.int64)
+    return pd.DataFrame({
+        "account_id": ids,
+        "outcome": outcome,
+        "phase": phase,
+        "next_phase": np.where(final_phase, 0, phase + 1),
+        "equity": equity,
+        "max_drawdown_floor": max_floor,
+        "daily_drawdown_floor": daily_floor,
+        "profit": profit,
+        "profit_target": target,
+    })
+
+
+def apply_outcomes(results: pd.DataFrame) -> dict[str, int]:
+    """
+    Apply breaches and passes with one bulk mutation per outcome (and per
+    target phase). Returns how many accounts each action touched.
+    """
+    applied = {"closed": 0, "phase_changed": 0, "in_review": 0}
+
+    for rule in (MAX_DRAWDOWN, DAILY_DRAWDOWN):
+        ids = results.loc[results["outcome"] == rule, "account_id"].tolist()
+        if ids:
+            applied["closed"] += len(account_close_many(ids, close_reason=rule))
+
+    passed = results[results["outcome"] == PROFIT_TARGET]
+    to_review = passed.loc[passed["next_phase"] == 0, "account_id"].tolist()
+    if to_review:
+        applied["in_review"] += len(account_set_in_review_many(to_review, True, reason=PROFIT_TARGET))
+    for next_phase, group in passed[passed["next_phase"] > 0].groupby("next_phase"):
+        applied["phase_changed"] += len(account_change_phase_many(group["account_id"].tolist(), int(next_phase)))
+
+    return applied
+
+
+def run_risk_pass(
+    equities: Optional[Mapping[int, float]] = None,
+    *,
+    apply: bool = True,
+) -> tuple[pd.DataFrame, dict[str, int]]:
+    """
+    Load, evaluate and (unless `apply=False`, a dry run) enforce the rules
+    for all live accounts. Returns the non-OK results and the action counts.
+    """
+    snapshot = load_snapshot()
+    if snapshot.empty:
+        return pd.DataFrame(), {"closed": 0, "phase_changed": 0, "in_review": 0}
+
+    results = evaluate(snapshot, equities)
+    flagged = results[results["outcome"] != OK].reset_index(drop=True)
+    applied = apply_outcomes(flagged) if apply else {"closed": 0, "phase_changed": 0, "in_review": 0}
+    logger.info("Risk pass: %d accounts, %d flagged, applied %s", len(snapshot), len(flagged), applied)
+    return flagged, applied
@@ -0,0 +1,276 @@
+"""
+Database objects veilon_core relies on beyond the base tables.
+
+Each entry is idempotent DDL; apply with `apply_schema()` (all) or
+`apply_schema("notify_triggers")` from a one-off script or admin shell.
+"""
+from __future__ import annotations
+
+from veilon_core.db import db, transaction
+
+
+def _literal(value: str) -> str:
+    """Quote a config value as an SQL string literal for DDL."""
+    return "'" + value.replace("'", "''") + "'"
+
+# -------------------------------------------------------------------
+# Change notifications (veilon_core.listener)
+# -------------------------------------------------------------------
+# One NOTIFY per changed row on channel `veilon_<table>`, carrying the keys
+# caches are indexed by. Old and new owner are both sent so moving an
+# account between users invalidates both users' lists; `was_closed` tells
+# trade caches whether an already-closed trade (which incremental refresh
+# does not re-read) changed. Bulk writers that send their own summary
+# notification (accounts.account_sync_balances) turn the per-row ones off
+# for their transaction with SET LOCAL veilon.notify = 'off'.
+NOTIFY_TABLES = ("accounts", "plans", "coupons", "trades")
+
+NOTIFY_TRIGGERS = """
+CREATE OR REPLACE FUNCTION veilon_notify_change() RETURNS trigger AS $$
+DECLARE
+    new_row jsonb := CASE WHEN TG_OP = 'DELETE' THEN NULL ELSE to_jsonb(NEW) END;
+    old_row jsonb := CASE WHEN TG_OP = 'INSERT' THEN NULL ELSE to_jsonb(OLD) END;
+    rec jsonb := COALESCE(new_row, old_row);
+BEGIN
+    IF current_setting('veilon.notify', true) = 'off' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify(
+        'veilon_' || TG_TABLE_NAME,
+        jsonb_build_object(
+            'op', TG_OP,
+            'id', rec -> 'id',
+            'account_id', rec -> 'account_id',
+            'user_id', rec -> 'user_id',
+            'old_user_id', old_row -> 'user_id',
+            'was_closed', COALESCE(old_row ->> 'close_time', '') <> ''
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""" + "".join(
+    f"""
+DROP TRIGGER IF EXISTS veilon_notify_change ON {table};
+CREATE TRIGGER veilon_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION veilon_notify_change();
+"""
+    for table in NOTIFY_TABLES
+)
+
+# -------------------------------------------------------------------
+# Daily returns rollup (veilon_core.daily_returns)
+# -------------------------------------------------------------------
+# One row per account per trading day, kept current by a trigger as trades
+# close. Trading days are cut in ROLLUP_TZ; changing it means re-applying
+# this block and running daily_returns.rebuild_daily_returns().
+ROLLUP_TZ = str(db.get("DAILY_ROLLUP_TZ", "UTC"))
+
+# Net PnL of trades row `t`; commission / swap are optional columns.
+NET_PNL_SQL = """(
+    COALESCE((to_jsonb({t}) ->> 'profit')::numeric, 0)
+    + COALESCE((to_jsonb({t}) ->> 'commission')::numeric, 0)
+    + COALESCE((to_jsonb({t}) ->> 'swap')::numeric, 0)
+)"""
+
+DAILY_RETURNS = f"""
+CREATE TABLE IF NOT EXISTS account_daily_returns (
+    account_id     bigint      NOT NULL,
+    trading_day    date        NOT NULL,
+    pnl            numeric     NOT NULL,
+    trade_count    integer     NOT NULL,
+    start_balance  numeric     NOT NULL,
+    end_balance    numeric     NOT NULL,
+    high_balance   numeric     NOT NULL,
+    low_balance    numeric     NOT NULL,
+    updated_at     timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (account_id, trading_day)
+);
+-- Running balance high-water mark up to and including the day (risk rules).
+ALTER TABLE account_daily_returns ADD COLUMN IF NOT EXISTS peak_balance numeric;
+
+CREATE OR REPLACE FUNCTION veilon_rollup_closed_trade() RETURNS trigger AS $$
+DECLARE
+    close_day date;
+    net numeric := {NET_PNL_SQL.format(t="NEW")};
+    opening numeric;
+    prior_peak numeric;
+BEGIN
+    -- Only the transition to closed is rolled up; later edits to a closed
+    -- trade go through daily_returns.rebuild_daily_returns().
+    IF NEW.close_time IS NULL OR (TG_OP = 'UPDATE' AND OLD.close_time IS NOT NULL) THEN
+        RETURN NULL;
+    END IF;
+    close_day := (NEW.close_time AT TIME ZONE {_literal(ROLLUP_TZ)})::date;
+
+    SELECT r.end_balance, r.peak_balance INTO opening, prior_peak
+    FROM account_daily_returns r
+    WHERE r.account_id = NEW.account_id AND r.trading_day < close_day
+    ORDER BY r.trading_day DESC
+    LIMIT 1;
+    IF opening IS NULL THEN
+        SELECT p.account_size INTO opening
+        FROM accounts a JOIN plans p ON p.id = a.plan_id
+        WHERE a.id = NEW.account_id;
+    END IF;
+    opening := COALESCE(opening, 0);
+    prior_peak := GREATEST(COALESCE(prior_peak, opening), opening);
+
+    INSERT INTO account_daily_returns AS r
+        (account_id, trading_day, pnl, trade_count, start_balance, end_balance, high_balance, low_balance,
+         peak_balance)
+    VALUES
+        (NEW.account_id, close_day, net, 1, opening, opening + net,
+         GREATEST(opening, opening + net), LEAST(opening, opening + net),
+         GREATEST(prior_peak, opening + net))
+    ON CONFLICT (account_id, trading_day) DO UPDATE SET
+        pnl          = r.pnl + EXCLUDED.pnl,
+        trade_count  = r.trade_count + 1,
+        end_balance  = r.end_balance + EXCLUDED.pnl,
+        high_balance = GREATEST(r.high_balance, r.end_balance + EXCLUDED.pnl),
+        low_balance  = LEAST(r.low_balance, r.end_balance + EXCLUDED.pnl),
+        peak_balance = GREATEST(r.peak_balance, r.end_balance + EXCLUDED.pnl),
+        updated_at   = now();
+
+    -- A trade closing into an earlier day (late sync) shifts every later day.
+    -- Their peaks can only be raised here; rebuild for exact peaks.
+    UPDATE account_daily_returns r SET
+        start_balance = r.start_balance + net,
+        end_balance   = r.end_balance + net,
+        high_balance  = r.high_balance + net,
+        low_balance   = r.low_balance + net,
+        peak_balance  = GREATEST(r.peak_balance, r.high_balance + net),
+        updated_at    = now()
+    WHERE r.account_id = NEW.account_id AND r.trading_day > close_day;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS veilon_rollup_closed_trade ON trades;
+CREATE TRIGGER veilon_rollup_closed_trade
+    AFTER INSERT OR UPDATE OF close_time ON trades
+    FOR EACH ROW EXECUTE FUNCTION veilon_rollup_closed_trade();
+"""
+
+# -------------------------------------------------------------------
+# Challenge phases (veilon_core.risk)
+# -------------------------------------------------------------------
+# The profit target of a phase is measured from the balance the account had
+# when it entered that phase, recorded by the phase-change mutations. NULL
+# means the account is still in its first phase, which starts at the plan's
+# account size.
+PHASES = """
+ALTER TABLE accounts
+    ADD COLUMN IF NOT EXISTS phase_start_balance numeric;
+"""
+
+# -------------------------------------------------------------------
+# Streaming tracker (veilon_core.trackers)
+# -------------------------------------------------------------------
+# Deals from MetaAPI land in trade_deals, keyed by the broker's deal id, so
+# redelivered deals (resyncs, reconnects) are no-ops. The tracker then
+# rebuilds each touched position's `trades` row from all of its deals:
+# order-independent and idempotent, and close_time is only set once the
+# whole position volume is closed.
+TRACKER = """
+CREATE TABLE IF NOT EXISTS trade_deals (
+    account_id   bigint      NOT NULL,
+    deal_id      text        NOT NULL,
+    position_id  text        NOT NULL,
+    entry        text        NOT NULL,   -- in | out | inout
+    side         text        NOT NULL,   -- buy | sell
+    symbol       text,
+    volume       numeric     NOT NULL,
+    price        numeric,
+    profit       numeric     NOT NULL DEFAULT 0,
+    commission   numeric     NOT NULL DEFAULT 0,
+    swap         numeric     NOT NULL DEFAULT 0,
+    time         timestamptz NOT NULL,
+    PRIMARY KEY (account_id, deal_id)
+);
+CREATE INDEX IF NOT EXISTS trade_deals_position_idx ON trade_deals (account_id, position_id);
+
+ALTER TABLE trades
+    ADD COLUMN IF NOT EXISTS position_id text,
+    ADD COLUMN IF NOT EXISTS symbol      text,
+    ADD COLUMN IF NOT EXISTS side        text,
+    ADD COLUMN IF NOT EXISTS volume      numeric,
+    ADD COLUMN IF NOT EXISTS open_price  numeric,
+    ADD COLUMN IF NOT EXISTS close_price numeric,
+    ADD COLUMN IF NOT EXISTS commission  numeric,
+    ADD COLUMN IF NOT EXISTS swap        numeric;
+
+CREATE UNIQUE INDEX IF NOT EXISTS trades_account_position_key
+    ON trades (account_id, position_id);
+"""
+
+# -------------------------------------------------------------------
+# Equity bars (veilon_core.bars)
+# -------------------------------------------------------------------
+# OHLC equity per account and bar interval, folded from live ticks by the
+# tracker. A bar is written once when it closes; re-writes (a restarted
+# tracker re-closing a bar) merge into the stored one.
+EQUITY_BARS = """
+CREATE TABLE IF NOT EXISTS account_equity_bars (
+    account_id        bigint      NOT NULL,
+    interval_seconds  integer     NOT NULL,
+    bar_time          timestamptz NOT NULL,
+    open              numeric     NOT NULL,
+    high              numeric     NOT NULL,
+    low               numeric     NOT NULL,
+    close             numeric     NOT NULL,
+    balance           numeric     NOT NULL,
+    ticks             integer     NOT NULL,
+    PRIMARY KEY (account_id, interval_seconds, bar_time)
+);
+"""
+
+# -------------------------------------------------------------------
+# Historical deal backfill (veilon_core.backfill)
+# -------------------------------------------------------------------
+# One plan per linked account (re-planned if it is linked to another
+# MetaAPI account), split into time windows. A window is leased by one
+# runner at a time and marked done in the transaction that writes its
+# deals, so an interrupted backfill resumes at the first unfinished window.
+BACKFILL = """
+CREATE TABLE IF NOT EXISTS account_backfills (
+    account_id          bigint      PRIMARY KEY,
+    metaapi_account_id  text        NOT NULL,
+    history_from        timestamptz NOT NULL,
+    history_to          timestamptz NOT NULL,
+    planned_at          timestamptz NOT NULL DEFAULT now(),
+    completed_at        timestamptz
+);
+
+CREATE TABLE IF NOT EXISTS account_backfill_windows (
+    account_id    bigint      NOT NULL REFERENCES account_backfills (account_id) ON DELETE CASCADE,
+    window_start  timestamptz NOT NULL,
+    window_end    timestamptz NOT NULL,
+    deals         integer,
+    attempts      integer     NOT NULL DEFAULT 0,
+    last_error    text,
+    leased_until  timestamptz,
+    done_at       timestamptz,
+    PRIMARY KEY (account_id, window_start)
+);
+CREATE INDEX IF NOT EXISTS account_backfill_windows_pending_idx
+    ON account_backfill_windows (window_start DESC) WHERE done_at IS NULL;
+"""
+
+SCHEMA = {
+    "notify_triggers": NOTIFY_TRIGGERS,
+    "daily_returns": DAILY_RETURNS,
+    "phases": PHASES,
+    "tracker": TRACKER,
+    "equity_bars": EQUITY_BARS,
+    "backfill": BACKFILL,
+}
+
+
+def apply_schema(*names: str):
+    """Apply the named DDL blocks (default: all) in one transaction."""
+    with transaction() as tx:
+        for name in names or SCHEMA:
+            tx.execute(SCHEMA[name], fetch_results=False)
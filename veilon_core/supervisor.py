@@ -0,0 +1,400 @@
+"""
+Sharded tracker: a supervisor process spreading the tracked accounts over
+N tracker worker processes.
+
+- Accounts are placed on workers by consistent hashing of the account id
+  (`HashRing`, with virtual nodes per worker). Enabling or disabling an
+  account moves only that account. Adding or removing a worker moves
+  only the ~1/N of accounts that hash to it.
+- Every SUPERVISOR_REFRESH seconds the supervisor reloads the tracked
+  accounts (trackers.load_tracked_accounts) and sends each worker only the
+  difference (track / untrack commands over its queue).
+- An account has at most one writer. A worker is sent "untrack" for an
+  account moving away and acknowledges with "released" on the status
+  queue once its tracker has let go of it (Tracker.release: streams
+  ended, breach enforcement and balance writes done). Only then is the
+  new owner sent "track". The two queues are independent, so without the
+  acknowledgement both workers could write the account's balance,
+  live-equity slot and breach outcome at once. A worker that does not
+  acknowledge within HANDOFF_TIMEOUT is terminated. A dead worker writes
+  nothing, so its accounts move right away.
+- A worker that dies is restarted with the same ring position, so it gets
+  the same accounts back; repeated quick crashes back off.
+
+Each worker runs one trackers.Tracker on its own event loop, with a
+drawdown detector holding only its own shard's accounts, and reports its
+stats to the supervisor, which exposes them as the "supervisor" collector.
+
+    python -m veilon_core.supervisor --workers 4
+    python -m veilon_core.supervisor --workers 4 --transport jsonl://127.0.0.1:8765 \\
+        --fake-accounts 20000 --dry-run      # against benchmarks/fake_metaapi.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing as mp
+import queue
+import signal
+import time
+from typing import Callable, Iterable, Optional
+
+from veilon_core import instrumentation
+from veilon_core.db import db
+from veilon_core.trackers import TrackedAccount, load_tracked_accounts
+
+logger = logging.getLogger(__name__)
+
+SUPERVISOR_REFRESH = float(db.get("SUPERVISOR_REFRESH", 30))   # seconds between account reloads
+VNODES = 128                                                     # ring points per worker
+STATUS_INTERVAL = 5.0                                            # seconds between worker stats reports
+HANDOFF_TIMEOUT = 60.0                                           # seconds a worker may take to release accounts
+
+
+# -------------------------------------------------------------------
+# Consistent hashing
+# -------------------------------------------------------------------
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Iterable[str] = (), *, vnodes: int = VNODES):
+        self.vnodes = vnodes
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        self.nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for v in range(self.vnodes):
+            point = _hash(f"{node}#{v}")
+            i = bisect.bisect(self._points, point)
+            self._points.insert(i, point)
+            self._owners.insert(i, node)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def owner(self, account_id: int) -> str:
+        if not self._points:
+            raise LookupError("Hash ring has no nodes.")
+        i = bisect.bisect(self._points, _hash(str(account_id))) % len(self._points)
+        return self._owners[i]
+
+    def assign(self, account_ids: Iterable[int]) -> dict[str, set[int]]:
+        placement: dict[str, set[int]] = {node: set() for node in self.nodes}
+        for account_id in account_ids:
+            placement[self.owner(account_id)].add(account_id)
+        return placement
+
+
+# -------------------------------------------------------------------
+# Worker process
+# -------------------------------------------------------------------
+def _worker_main(name: str, transport_url: str, commands, status, dry_run: bool):
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s {name} %(levelname)s %(name)s: %(message)s")
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # the supervisor stops workers
+    asyncio.run(_run_worker(name, transport_url, commands, status, dry_run))
+
+
+async def _run_worker(name: str, transport_url: str, commands, status, dry_run: bool):
+    from veilon_core.bars import EquityBars
+    from veilon_core.drawdown import DrawdownDetector
+    from veilon_core.live_equity import LiveEquityTable
+    from veilon_core.trackers import NullWriter, Tracker, transport_from_url
+
+    tracker = Tracker(
+        transport_from_url(transport_url),
+        writer=NullWriter() if dry_run else None,
+        bars=EquityBars(),
+        detector=None if dry_run else DrawdownDetector(),
+        live=LiveEquityTable(writable=True),
+    )
+    runner = asyncio.create_task(tracker.run([]))
+    loop = asyncio.get_running_loop()
+    try:
+        while not runner.done():
+            try:
+                command, arg = await loop.run_in_executor(None, commands.get, True, STATUS_INTERVAL)
+            except queue.Empty:
+                command, arg = "status", None
+            if command == "track":
+                for account_id, metaapi_account_id in arg:
+                    tracker.track(TrackedAccount(account_id, metaapi_account_id))
+            elif command == "untrack":
+                await tracker.release(arg)
+                status.put((name, "released", list(arg)))
+            elif command == "stop":
+                break
+            status.put((name, "stats", tracker.stats()))
+    finally:
+        tracker.stop()
+        await runner
+
+
+class _Worker:
+    def __init__(self, name: str):
+        self.name = name
+        self.process: Optional[mp.Process] = None
+        self.commands = None
+        self.accounts: dict[int, str] = {}   # account_id -> metaapi_account_id, as sent
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start = 0.0
+        self.backoff = 1.0
+
+
+# -------------------------------------------------------------------
+# Supervisor
+# -------------------------------------------------------------------
+class Supervisor:
+    def __init__(
+        self,
+        workers: int,
+        *,
+        transport_url: str = "metaapi",
+        accounts_source: Callable[[], list[TrackedAccount]] = load_tracked_accounts,
+        refresh_interval: float = SUPERVISOR_REFRESH,
+        dry_run: bool = False,
+    ):
+        self.transport_url = transport_url
+        self.accounts_source = accounts_source
+        self.refresh_interval = refresh_interval
+        self.dry_run = dry_run
+
+        self._mp = mp.get_context("spawn")   # no forked DB connections or threads
+        self._status = self._mp.Queue()
+        self._workers: dict[str, _Worker] = {}
+        self._ring = HashRing()
+        self._accounts: dict[int, str] = {}
+        self._releasing: dict[int, tuple[str, float]] = {}   # account_id -> (releasing worker, since)
+        self._worker_stats: dict[str, dict] = {}
+        self._stopping = False
+        self._next_refresh = 0.0
+        self._stats = {"rebalances": 0, "moved": 0, "restarts": 0, "handoff_timeouts": 0}
+        self.resize(workers)
+
+    # ---------------------------------------------------------------
+    # Workers
+    # ---------------------------------------------------------------
+    def resize(self, workers: int):
+        """Grow or shrink the pool; only the accounts of added / removed workers move."""
+        names = [f"worker-{i}" for i in range(workers)]
+        for name in names:
+            if name not in self._workers:
+                self._workers[name] = _Worker(name)
+                self._ring.add(name)
+        for name in [n for n in self._workers if n not in names]:
+            self._ring.remove(name)
+        if self._accounts:
+            self._rebalance()
+        for name in [n for n in self._workers if n not in names]:
+            self._stop_worker(self._workers.pop(name))
+            self._worker_stats.pop(name, None)
+            self._released_by(name, self._releasing_from(name))   # stopped: writes nothing now
+
+    def _start_worker(self, worker: _Worker):
+        worker.commands = self._mp.Queue()
+        worker.process = self._mp.Process(
+            target=_worker_main,
+            args=(worker.name, self.transport_url, worker.commands, self._status, self.dry_run),
+            name=worker.name,
+            daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        if worker.accounts:
+            worker.commands.put(("track", list(worker.accounts.items())))
+
+    def _stop_worker(self, worker: _Worker, timeout: float = 10.0):
+        if worker.process is None:
+            return
+        worker.commands.put(("stop", None))
+        worker.process.join(timeout)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join()
+
+    @staticmethod
+    def _alive(worker: _Worker) -> bool:
+        return worker.process is not None and worker.process.is_alive()
+
+    def _check_workers(self):
+        now = time.monotonic()
+        stalled = {name for name, since in self._releasing.values() if now - since > HANDOFF_TIMEOUT}
+        for name in stalled:
+            worker = self._workers.get(name)
+            if worker is not None and self._alive(worker):
+                logger.error("%s did not release its moved accounts in %.0f s; terminating it",
+                             name, HANDOFF_TIMEOUT)
+                self._stats["handoff_timeouts"] += 1
+                worker.process.terminate()
+                worker.process.join(5.0)
+        for worker in self._workers.values():
+            if self._alive(worker):
+                if now - worker.started_at > 60:
+                    worker.backoff = 1.0
+                continue
+            if worker.process is not None:
+                logger.warning("%s exited with code %s; restarting with %d accounts",
+                               worker.name, worker.process.exitcode, len(worker.accounts))
+                worker.process = None
+                # A dead worker writes nothing: what it was releasing can move.
+                self._released_by(worker.name, self._releasing_from(worker.name))
+                worker.restarts += 1
+                self._stats["restarts"] += 1
+                # Crashing soon after start: back off before the next try.
+                if now - worker.started_at < 60:
+                    worker.next_start = now + worker.backoff
+                    worker.backoff = min(worker.backoff * 2, 60.0)
+            if now >= worker.next_start:
+                self._start_worker(worker)
+
+    # ---------------------------------------------------------------
+    # Accounts
+    # ---------------------------------------------------------------
+    def refresh(self):
+        accounts = {a.account_id: a.metaapi_account_id for a in self.accounts_source()}
+        if not accounts and self._accounts:
+            # load_tracked_accounts returns [] on a database error.
+            logger.warning("Tracked account reload returned nothing; keeping the current assignment.")
+            return
+        self._accounts = accounts
+        self._rebalance()
+
+    def _rebalance(self):
+        placement = self._ring.assign(self._accounts)
+        moved = 0
+        # Removals first. A live worker keeps writing an account until it
+        # acknowledges the untrack, so the account is only handed to its new
+        # owner in _released_by.
+        now = time.monotonic()
+        for name, worker in self._workers.items():
+            target = placement.get(name, set())
+            removed = [a for a in worker.accounts if a not in target]
+            for account_id in removed:
+                del worker.accounts[account_id]
+            if removed and worker.process is not None:
+                worker.commands.put(("untrack", removed))
+                if self._alive(worker):
+                    self._releasing.update((a, (name, now)) for a in removed)
+        for name, target in placement.items():
+            worker = self._workers[name]
+            added = [(a, self._accounts[a]) for a in target
+                     if a not in worker.accounts and a not in self._releasing]
+            moved += self._assign(worker, added)
+        self._stats["rebalances"] += 1
+        self._stats["moved"] += moved
+        logger.info("Rebalanced %d accounts over %d workers (%d assigned, %d awaiting release)",
+                    len(self._accounts), len(self._workers), moved, len(self._releasing))
+
+    def _assign(self, worker: _Worker, added: list[tuple[int, str]]) -> int:
+        worker.accounts.update(added)
+        if added and worker.process is not None:
+            worker.commands.put(("track", added))
+        return len(added)
+
+    def _releasing_from(self, name: str) -> list[int]:
+        return [a for a, (source, _) in self._releasing.items() if source == name]
+
+    def _released_by(self, name: str, account_ids: Iterable[int]):
+        """`name` no longer writes these accounts: track them on their current owners."""
+        released = [a for a in account_ids if self._releasing.get(a, (None,))[0] == name]
+        for account_id in released:
+            del self._releasing[account_id]
+        by_owner: dict[str, list[tuple[int, str]]] = {}
+        for account_id in released:
+            if account_id in self._accounts and self._ring.nodes:
+                owner = self._ring.owner(account_id)
+                if account_id not in self._workers[owner].accounts:
+                    by_owner.setdefault(owner, []).append((account_id, self._accounts[account_id]))
+        for owner, added in by_owner.items():
+            self._stats["moved"] += self._assign(self._workers[owner], added)
+
+    def placement(self) -> dict[str, int]:
+        return {name: len(worker.accounts) for name, worker in self._workers.items()}
+
+    # ---------------------------------------------------------------
+    # Loop
+    # ---------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "workers": len(self._workers),
+            "accounts": len(self._accounts),
+            "awaiting_release": len(self._releasing),
+            "placement": self.placement(),
+            "worker_stats": dict(self._worker_stats),
+        }
+
+    def step(self):
+        """One supervision pass: restart dead workers, reload accounts when due, read stats."""
+        self._check_workers()
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+            self._next_refresh = time.monotonic() + self.refresh_interval
+        while True:
+            try:
+                name, kind, data = self._status.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "released":
+                self._released_by(name, data)
+            elif name in self._workers:
+                self._worker_stats[name] = data
+
+    def run(self, poll_interval: float = 0.5):
+        instrumentation.register_collector("supervisor", self.stats)
+        try:
+            while not self._stopping:
+                self.step()
+                time.sleep(poll_interval)
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self._stopping = True
+
+    def shutdown(self):
+        for worker in self._workers.values():
+            self._stop_worker(worker)
+            worker.process = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run tracker workers over consistently hashed account shards.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--transport", default="metaapi", help="'metaapi' or jsonl://host:port")
+    parser.add_argument("--fake-accounts", type=int, default=0, help="track N synthetic accounts instead of the DB's")
+    parser.add_argument("--dry-run", action="store_true", help="discard writes (no database needed)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    source = load_tracked_accounts
+    if args.fake_accounts:
+        fake = [TrackedAccount(i, f"fake-{i}") for i in range(1, args.fake_accounts + 1)]
+        source = lambda: fake  # noqa: E731
+
+    supervisor = Supervisor(args.workers, transport_url=args.transport, accounts_source=source, dry_run=args.dry_run)
+    signal.signal(signal.SIGTERM, lambda *_: supervisor.stop())
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,763 @@
+"""
+Streaming account tracker: MetaAPI deals and equity -> Postgres.
+
+One asyncio event loop multiplexes every tracked account's stream. A
+`Transport` delivers normalized events to the `Tracker`:
+
+- deals are queued (bounded: a slow database applies backpressure to the
+  streams) and written in batches to `trade_deals`, from which each touched
+  position's `trades` row is rebuilt (schema.SCHEMA["tracker"]);
+- account information updates are coalesced per account (latest wins), so
+  equity ticks never queue; balances are written in bulk when they change
+  and live equity is kept in memory (`Tracker.equities()`, e.g. for
+  risk.run_risk_pass). With `bars=EquityBars()` the ticks are also folded
+  into OHLC equity bars (veilon_core.bars), written as bars close. With
+  `detector=DrawdownDetector()` each update is checked for a drawdown
+  breach (veilon_core.drawdown), which closes the account right away.
+  With `live=LiveEquityTable(writable=True)` the latest balance, equity and
+  drawdown usage are published to shared memory (veilon_core.live_equity).
+
+Database work runs on the veilon_core.aio executor, never on the loop.
+Deals from before an account was first tracked are loaded by
+veilon_core.backfill, through the same `trade_deals` path.
+
+Transports: `MetaApiTransport` (metaapi-cloud-sdk) for production and
+`JsonLinesTransport`, a plain TCP line-delimited JSON protocol, for running
+against the fake server in benchmarks/fake_metaapi.py:
+
+    python -m veilon_core.trackers                       # MetaAPI, METAAPI_TOKEN
+    python -m veilon_core.trackers --jsonl 127.0.0.1:8765
+"""
+from __future__ import annotations
+
+import abc
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Protocol
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from veilon_core import instrumentation, risk
+from veilon_core.accounts import account_sync_balances
+from veilon_core.aio import run_blocking
+from veilon_core.bars import EquityBars, write_bars
+from veilon_core.db import execute_query, transaction
+from veilon_core.drawdown import Breach, DrawdownDetector, apply_breach
+from veilon_core.live_equity import LiveEquityTable
+from veilon_core.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------------------------
+# Events
+# -------------------------------------------------------------------
+@dataclass(frozen=True)
+class TrackedAccount:
+    account_id: int
+    metaapi_account_id: str
+
+
+@dataclass(frozen=True)
+class Deal:
+    account_id: int
+    deal_id: str
+    position_id: str
+    entry: str          # in | out | inout
+    side: str           # buy | sell
+    symbol: Optional[str]
+    volume: float
+    price: Optional[float]
+    profit: float
+    commission: float
+    swap: float
+    time: datetime
+
+
+@dataclass(frozen=True)
+class AccountInfo:
+    account_id: int
+    balance: float
+    equity: float
+
+
+_ENTRIES = {
+    "DEAL_ENTRY_IN": "in",
+    "DEAL_ENTRY_OUT": "out",
+    "DEAL_ENTRY_INOUT": "inout",
+    "DEAL_ENTRY_OUT_BY": "out",
+}
+_SIDES = {"DEAL_TYPE_BUY": "buy", "DEAL_TYPE_SELL": "sell"}
+
+
+def parse_deal(account_id: int, raw: dict) -> Optional[Deal]:
+    """
+    Normalize a MetaAPI deal (SDK dict or JSON). Returns None for deals that
+    are not trades (balance, credit, ...).
+    """
+    side = _SIDES.get(raw.get("type"))
+    entry = _ENTRIES.get(raw.get("entryType"))
+    if side is None or entry is None or raw.get("positionId") is None:
+        return None
+    return Deal(
+        account_id=account_id,
+        deal_id=str(raw["id"]),
+        position_id=str(raw["positionId"]),
+        entry=entry,
+        side=side,
+        symbol=raw.get("symbol"),
+        volume=float(raw.get("volume") or 0),
+        price=float(raw["price"]) if raw.get("price") is not None else None,
+        profit=float(raw.get("profit") or 0),
+        commission=float(raw.get("commission") or 0),
+        swap=float(raw.get("swap") or 0),
+        time=_as_datetime(raw.get("time")),
+    )
+
+
+def parse_account_info(account_id: int, raw: dict) -> Optional[AccountInfo]:
+    if raw.get("balance") is None:
+        return None
+    balance = float(raw["balance"])
+    equity = float(raw["equity"]) if raw.get("equity") is not None else balance
+    return AccountInfo(account_id=account_id, balance=balance, equity=equity)
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return datetime.now(timezone.utc)
+
+
+# -------------------------------------------------------------------
+# Transports
+# -------------------------------------------------------------------
+class EventSink(Protocol):
+    async def on_deal(self, deal: Deal) -> None: ...
+    def on_account_info(self, info: AccountInfo) -> None: ...
+
+
+class Transport(abc.ABC):
+    """Delivers one account's events to a sink until the stream ends."""
+
+    @abc.abstractmethod
+    async def stream(self, account: TrackedAccount, sink: EventSink, ready: asyncio.Event) -> None:
+        """
+        Subscribe and forward events until disconnected (return or raise;
+        the tracker reconnects). Set `ready` once subscribed.
+        """
+
+    async def close(self):
+        pass
+
+
+class MetaApiTransport(Transport):
+    def __init__(self, token: str, **options):
+        from metaapi_cloud_sdk import MetaApi  # optional dependency: production only
+
+        self._api = MetaApi(token, options or None)
+
+    async def stream(self, account: TrackedAccount, sink: EventSink, ready: asyncio.Event) -> None:
+        from metaapi_cloud_sdk import SynchronizationListener
+
+        disconnected = asyncio.Event()
+
+        class Listener(SynchronizationListener):
+            async def on_deal_added(self, instance_index, deal):
+                parsed = parse_deal(account.account_id, deal)
+                if parsed is not None:
+                    await sink.on_deal(parsed)
+
+            async def on_account_information_updated(self, instance_index, account_information):
+                info = parse_account_info(account.account_id, account_information)
+                if info is not None:
+                    sink.on_account_info(info)
+
+            async def on_disconnected(self, instance_index):
+                disconnected.set()
+
+        remote = await self._api.metatrader_account_api.get_account(account.metaapi_account_id)
+        connection = remote.get_streaming_connection()
+        listener = Listener()
+        connection.add_synchronization_listener(listener)
+        try:
+            await connection.connect()
+            await connection.wait_synchronized()
+            ready.set()
+            await disconnected.wait()
+        finally:
+            connection.remove_synchronization_listener(listener)
+            await connection.close()
+
+
+class JsonLinesTransport(Transport):
+    """
+    Multiplexes all accounts over one TCP connection speaking newline-
+    delimited JSON:
+
+        -> {"op": "subscribe", "account": "<metaapi id>"}
+        <- {"type": "deal", "account": "<metaapi id>", "deal": {...MetaAPI deal...}}
+        <- {"type": "account_information", "account": "<metaapi id>", "info": {"balance": .., "equity": ..}}
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._subscribers: dict[str, tuple[TrackedAccount, EventSink]] = {}
+        self._closed: Optional[asyncio.Future] = None
+
+    async def _ensure_connected(self) -> asyncio.Future:
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=2**20)
+                self._closed = asyncio.get_running_loop().create_future()
+                self._reader_task = asyncio.create_task(self._read(reader, self._closed))
+            return self._closed
+
+    async def _read(self, reader: asyncio.StreamReader, closed: asyncio.Future):
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                subscriber = self._subscribers.get(message.get("account"))
+                if subscriber is None:
+                    continue
+                account, sink = subscriber
+                if message.get("type") == "deal":
+                    deal = parse_deal(account.account_id, message["deal"])
+                    if deal is not None:
+                        await sink.on_deal(deal)
+                elif message.get("type") == "account_information":
+                    info = parse_account_info(account.account_id, message["info"])
+                    if info is not None:
+                        sink.on_account_info(info)
+        except (OSError, ValueError) as e:
+            logger.warning("Tracker stream connection failed: %s", e)
+        finally:
+            if not closed.done():
+                closed.set_result(None)
+            if self._writer is not None:
+                self._writer.close()
+
+    async def _send(self, message: dict):
+        self._writer.write(json.dumps(message).encode() + b"\n")
+        await self._writer.drain()
+
+    async def stream(self, account: TrackedAccount, sink: EventSink, ready: asyncio.Event) -> None:
+        closed = await self._ensure_connected()
+        self._subscribers[account.metaapi_account_id] = (account, sink)
+        try:
+            await self._send({"op": "subscribe", "account": account.metaapi_account_id})
+            ready.set()
+            await asyncio.shield(closed)
+        finally:
+            self._subscribers.pop(account.metaapi_account_id, None)
+            if not closed.done():
+                try:
+                    await self._send({"op": "unsubscribe", "account": account.metaapi_account_id})
+                except (OSError, RuntimeError):
+                    pass
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+
+# -------------------------------------------------------------------
+# Database writer
+# -------------------------------------------------------------------
+_INSERT_DEALS_SQL = """
+    INSERT INTO trade_deals
+        (account_id, deal_id, position_id, entry, side, symbol, volume, price, profit, commission, swap, time)
+    VALUES %s
+    ON CONFLICT (account_id, deal_id) DO NOTHING
+    RETURNING account_id, position_id;
+"""
+
+# Rebuild the touched positions' trades rows from all of their deals.
+_UPSERT_TRADES_SQL = """
+    INSERT INTO trades AS t
+        (account_id, position_id, symbol, side, volume, open_price, open_time,
+         close_price, close_time, profit, commission, swap)
+    SELECT
+        p.account_id,
+        p.position_id,
+        p.symbol,
+        p.side,
+        p.volume,
+        p.open_price,
+        p.open_time,
+        p.close_price,
+        CASE WHEN p.volume IS NULL OR p.closed_volume >= p.volume THEN p.last_close END,
+        p.profit,
+        p.commission,
+        p.swap
+    FROM (
+        SELECT
+            d.account_id,
+            d.position_id,
+            MAX(d.symbol) AS symbol,
+            COALESCE(
+                (ARRAY_AGG(d.side ORDER BY d.time) FILTER (WHERE d.entry = 'in'))[1],
+                CASE (ARRAY_AGG(d.side ORDER BY d.time))[1] WHEN 'buy' THEN 'sell' ELSE 'buy' END
+            ) AS side,
+            SUM(d.volume) FILTER (WHERE d.entry = 'in') AS volume,
+            COALESCE(SUM(d.volume) FILTER (WHERE d.entry <> 'in'), 0) AS closed_volume,
+            (ARRAY_AGG(d.price ORDER BY d.time) FILTER (WHERE d.entry = 'in'))[1] AS open_price,
+            COALESCE(MIN(d.time) FILTER (WHERE d.entry = 'in'), MIN(d.time)) AS open_time,
+            (ARRAY_AGG(d.price ORDER BY d.time DESC) FILTER (WHERE d.entry <> 'in'))[1] AS close_price,
+            MAX(d.time) FILTER (WHERE d.entry <> 'in') AS last_close,
+            SUM(d.profit) AS profit,
+            SUM(d.commission) AS commission,
+            SUM(d.swap) AS swap
+        FROM trade_deals d
+        JOIN unnest(%s::bigint[], %s::text[]) AS touched(account_id, position_id)
+          ON touched.account_id = d.account_id AND touched.position_id = d.position_id
+        GROUP BY d.account_id, d.position_id
+    ) p
+    ON CONFLICT (account_id, position_id) DO UPDATE SET
+        symbol      = EXCLUDED.symbol,
+        side        = EXCLUDED.side,
+        volume      = EXCLUDED.volume,
+        open_price  = EXCLUDED.open_price,
+        open_time   = EXCLUDED.open_time,
+        close_price = EXCLUDED.close_price,
+        close_time  = EXCLUDED.close_time,
+        profit      = EXCLUDED.profit,
+        commission  = EXCLUDED.commission,
+        swap        = EXCLUDED.swap;
+"""
+
+
+# Writers of the same account's positions (tracker workers, backfill) take
+# turns: a rebuild must see every committed deal, or a concurrent upsert
+# could overwrite a trade with an aggregate missing the other's deals.
+_LOCK_ACCOUNTS_SQL = """
+    SELECT pg_advisory_xact_lock(hashtextextended('veilon_trades:' || a, 0))
+    FROM (SELECT DISTINCT a FROM unnest(%s::bigint[]) AS a ORDER BY a) ordered;
+"""
+
+
+def deal_row(d: Deal) -> tuple:
+    """A Deal as a trade_deals row, in column order."""
+    return (d.account_id, d.deal_id, d.position_id, d.entry, d.side, d.symbol, d.volume, d.price,
+            d.profit, d.commission, d.swap, d.time)
+
+
+def rebuild_positions(cursor, touched: list[tuple[int, str]]) -> int:
+    """
+    Rebuild the trades rows of (account_id, position_id) pairs from their
+    deals, inside the caller's transaction. Returns rows written.
+    """
+    touched = sorted(set(touched))
+    if not touched:
+        return 0
+    cursor.execute(_LOCK_ACCOUNTS_SQL, ([a for a, _ in touched],))
+    with timed(_UPSERT_TRADES_SQL) as timing:
+        cursor.execute(_UPSERT_TRADES_SQL, ([a for a, _ in touched], [p for _, p in touched]))
+        timing.rows = cursor.rowcount
+    return cursor.rowcount
+
+
+class DatabaseWriter:
+    """Blocking writes; the tracker calls these on the aio executor."""
+
+    def write_deals(self, deals: list[Deal]) -> int:
+        """Store deals (duplicates ignored) and rebuild their trades. Returns new deals."""
+        # Sorted: concurrent writers then take unique-index locks in one order.
+        rows = sorted((deal_row(d) for d in deals), key=lambda r: (r[0], r[1]))
+        with transaction() as tx, tx.conn.cursor() as cursor:
+            with timed(_INSERT_DEALS_SQL) as timing:
+                inserted = execute_values(cursor, _INSERT_DEALS_SQL, rows, page_size=len(rows), fetch=True)
+                timing.rows = len(inserted)
+            rebuild_positions(cursor, [tuple(r) for r in inserted])
+        return len(inserted)
+
+    def write_balances(self, balances: dict[int, float]) -> int:
+        # A broker sync, not a business event: no account_events rows.
+        return len(account_sync_balances(balances))
+
+    def write_bars(self, bars) -> int:
+        return write_bars(bars)
+
+
+class NullWriter(DatabaseWriter):
+    """Discards every write: dry runs and load tests without a database."""
+
+    def write_deals(self, deals: list[Deal]) -> int:
+        return len(deals)
+
+    def write_balances(self, balances: dict[int, float]) -> int:
+        return len(balances)
+
+    def write_bars(self, bars) -> int:
+        return len(bars)
+
+
+# -------------------------------------------------------------------
+# Tracker
+# -------------------------------------------------------------------
+def load_tracked_accounts() -> list[TrackedAccount]:
+    """Open, enabled accounts linked to a MetaAPI account."""
+    rows = execute_query(
+        """
+        SELECT id, metaapi_account_id
+        FROM accounts
+        WHERE metaapi_account_id IS NOT NULL
+          AND closed_at IS NULL
+          AND is_enabled IS TRUE;
+        """
+    )
+    return [TrackedAccount(int(r["id"]), str(r["metaapi_account_id"])) for r in rows]
+
+
+class Tracker:
+    def __init__(
+        self,
+        transport: Transport,
+        *,
+        writer: Optional[DatabaseWriter] = None,
+        flush_interval: float = 1.0,
+        max_batch: int = 5_000,
+        max_queue: int = 100_000,
+        connect_concurrency: int = 50,
+        bars: Optional[EquityBars] = None,
+        detector: Optional[DrawdownDetector] = None,
+        live: Optional[LiveEquityTable] = None,
+    ):
+        self.transport = transport
+        self.writer = writer or DatabaseWriter()
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.connect_concurrency = connect_concurrency
+        self.bars = bars
+        self.detector = detector
+        self.live = live
+        self._enforcing: dict[asyncio.Task, int] = {}   # breach task -> account_id
+
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._connect_slots = asyncio.Semaphore(connect_concurrency)
+        self._flushing = asyncio.Lock()   # held while a flush writes
+        self._stopping = asyncio.Event()
+        self._unmonitored: set[int] = set()   # tracked, not yet loaded into the detector
+        self._monitor_retry_at = 0.0
+
+        self._equity: dict[int, float] = {}
+        self._balance: dict[int, float] = {}
+        self._written_balance: dict[int, float] = {}
+        self._pending_deals: list[Deal] = []
+        self._pending_bars = []
+
+        self._stats = {
+            "deals_received": 0, "deals_written": 0, "info_updates": 0, "balances_written": 0, "bars_written": 0,
+            "breaches_applied": 0,
+            "reconnects": 0, "stream_errors": 0, "write_errors": 0, "last_flush_ms": 0.0,
+        }
+
+    # ---------------------------------------------------------------
+    # EventSink
+    # ---------------------------------------------------------------
+    async def on_deal(self, deal: Deal) -> None:
+        self._stats["deals_received"] += 1
+        await self._queue.put(deal)
+
+    def on_account_info(self, info: AccountInfo) -> None:
+        self._stats["info_updates"] += 1
+        self._equity[info.account_id] = info.equity
+        self._balance[info.account_id] = info.balance
+        if self.bars is not None:
+            self.bars.update(info.account_id, info.equity, info.balance)
+        if self.detector is not None:
+            breach = self.detector.update(info.account_id, info.equity, info.balance)
+            if breach is not None:
+                task = asyncio.create_task(self._enforce(breach))
+                self._enforcing[task] = info.account_id
+                task.add_done_callback(lambda t: self._enforcing.pop(t, None))
+        if self.live is not None:
+            usage = self.detector.usage(info.account_id, info.equity) if self.detector is not None else None
+            self.live.publish(info.account_id, info.balance, info.equity, *(usage or ()))
+
+    # ---------------------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------------------
+    async def run(self, accounts: Optional[Iterable[TrackedAccount]] = None):
+        """
+        Track `accounts` (default: load_tracked_accounts()) until stop().
+        More can be added and removed meanwhile with track() / untrack().
+        """
+        instrumentation.register_collector("tracker", self.stats)
+
+        if accounts is None:
+            accounts = await run_blocking(load_tracked_accounts)
+        for account in accounts:
+            self.track(account)
+        if self._unmonitored:
+            await self._monitor_new_accounts()
+
+        flusher = asyncio.create_task(self._flush_loop())
+        await self._stopping.wait()
+
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        await flusher   # drains what was queued
+        await asyncio.gather(*list(self._enforcing), return_exceptions=True)
+        await self.transport.close()
+
+    def stop(self):
+        self._stopping.set()
+
+    def track(self, account: TrackedAccount):
+        if account.account_id not in self._tasks:
+            self._tasks[account.account_id] = asyncio.create_task(self._track(account))
+            if self.detector is not None and account.account_id not in self.detector:
+                self._unmonitored.add(account.account_id)
+                self._monitor_retry_at = 0.0
+
+    def untrack(self, account_id: int) -> Optional[asyncio.Task]:
+        """Stop tracking; returns the cancelled stream task, if any."""
+        task = self._tasks.pop(account_id, None)
+        if task is not None:
+            task.cancel()
+        self._unmonitored.discard(account_id)
+        self._equity.pop(account_id, None)
+        self._balance.pop(account_id, None)
+        # Forgotten too, so the first balance after the account comes back is written.
+        self._written_balance.pop(account_id, None)
+        if self.bars is not None:
+            self.bars.discard(account_id)
+        if self.detector is not None:
+            self.detector.discard(account_id)
+
+    async def release(self, account_ids: Iterable[int]):
+        """
+        Untrack the accounts and return once nothing of this tracker acts on
+        them any more: their streams have ended (no further balance, equity
+        or live-table updates) and breach enforcement in flight is done. The
+        supervisor waits for this before another worker takes them over.
+        """
+        account_ids = set(account_ids)
+        streams = [t for t in (self.untrack(a) for a in account_ids) if t is not None]
+        enforcing = [t for t, a in self._enforcing.items() if a in account_ids]
+        await asyncio.gather(*streams, *enforcing, return_exceptions=True)
+        # A flush in progress may still be writing their last balances.
+        async with self._flushing:
+            pass
+
+    def equities(self) -> dict[int, float]:
+        """Latest live equity per tracked account."""
+        return dict(self._equity)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "tracked": len(self._tasks),
+            "queue_depth": self._queue.qsize(),
+            "pending_deals": len(self._pending_deals),
+            **({"bar_" + k: v for k, v in self.bars.stats().items()} if self.bars is not None else {}),
+            **({"drawdown_" + k: v for k, v in self.detector.stats().items()} if self.detector is not None else {}),
+        }
+
+    # ---------------------------------------------------------------
+    # Per-account streams
+    # ---------------------------------------------------------------
+    async def _track(self, account: TrackedAccount):
+        backoff = 1.0
+        while not self._stopping.is_set():
+            ready = asyncio.Event()
+            # Bound concurrent (re)connects; streaming itself is unbounded.
+            async with self._connect_slots:
+                stream = asyncio.create_task(self.transport.stream(account, self, ready))
+                subscribed = asyncio.create_task(ready.wait())
+                await asyncio.wait({stream, subscribed}, return_when=asyncio.FIRST_COMPLETED)
+                subscribed.cancel()
+            try:
+                await stream
+            except asyncio.CancelledError:
+                stream.cancel()
+                raise
+            except Exception as e:
+                self._stats["stream_errors"] += 1
+                logger.warning("Stream for account %s failed: %s", account.account_id, e)
+            if ready.is_set():
+                backoff = 1.0
+            self._stats["reconnects"] += 1
+            # Jitter keeps thousands of accounts from reconnecting in lockstep.
+            await asyncio.sleep(backoff * (0.5 + random.random()))
+            backoff = min(backoff * 2, 60.0)
+
+    async def _enforce(self, breach: Breach):
+        logger.warning("Account %s breached %s: equity %.2f <= %.2f",
+                       breach.account_id, breach.rule, breach.equity, breach.floor)
+        backoff = 1.0
+        while True:
+            try:
+                await run_blocking(apply_breach, breach)
+                break
+            except Exception as e:
+                self._stats["write_errors"] += 1
+                if self._stopping.is_set():
+                    logger.error("Breach of account %s not applied on shutdown: %s", breach.account_id, e)
+                    return
+                logger.warning("Applying breach of account %s failed, will retry: %s", breach.account_id, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+        self._stats["breaches_applied"] += 1
+        self.untrack(breach.account_id)
+
+    async def _monitor_new_accounts(self):
+        """Load the rule state of newly tracked accounts (only those) into the detector."""
+        if time.monotonic() < self._monitor_retry_at:
+            return
+        wanted = set(self._unmonitored)
+        snapshot = await run_blocking(risk.load_snapshot, wanted)
+        if snapshot.empty:
+            # A failed load (query_frame returns empty) or accounts the rules
+            # skip (e.g. in review): try again later, not on every flush.
+            self._monitor_retry_at = time.monotonic() + 30.0
+            return
+        loaded = snapshot[snapshot["account_id"].isin(self._unmonitored)]   # minus any untracked meanwhile
+        self.detector.load(loaded)
+        # Accounts missing from a successful load are not under the rules.
+        self._unmonitored -= wanted
+
+    # ---------------------------------------------------------------
+    # Batched writes
+    # ---------------------------------------------------------------
+    async def _flush_loop(self):
+        backoff = self.flush_interval
+        while True:
+            stopping = self._stopping.is_set()
+            await self._collect_deals()
+            async with self._flushing:
+                ok = await self._flush()
+            if stopping and self._queue.empty():
+                if ok or not self._pending_deals:
+                    return
+                logger.error("Dropping %d unwritten deals on shutdown.", len(self._pending_deals))
+                return
+            if ok:
+                backoff = self.flush_interval
+            else:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def _collect_deals(self):
+        deadline = time.monotonic() + self.flush_interval
+        while len(self._pending_deals) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                # Past the deadline: only take what is already queued.
+                while len(self._pending_deals) < self.max_batch and not self._queue.empty():
+                    self._pending_deals.append(self._queue.get_nowait())
+                return
+            try:
+                self._pending_deals.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                return
+
+    async def _flush(self) -> bool:
+        started = time.perf_counter()
+        ok = True
+        if self._unmonitored:
+            await self._monitor_new_accounts()
+        if self._pending_deals:
+            batch = self._pending_deals
+            try:
+                self._stats["deals_written"] += await run_blocking(self.writer.write_deals, batch)
+                self._pending_deals = []
+            except Exception as e:
+                # Kept for the next attempt: trade_deals makes the retry idempotent.
+                self._stats["write_errors"] += 1
+                logger.warning("Writing %d deals failed, will retry: %s", len(batch), e)
+                ok = False
+
+        changed = {
+            account_id: balance
+            for account_id, balance in self._balance.items()
+            if self._written_balance.get(account_id) != balance
+        }
+        if changed:
+            try:
+                self._stats["balances_written"] += await run_blocking(self.writer.write_balances, changed)
+                # Not for accounts untracked while the write ran.
+                self._written_balance.update((a, b) for a, b in changed.items() if a in self._tasks)
+            except Exception as e:
+                self._stats["write_errors"] += 1
+                logger.warning("Writing %d balances failed, will retry: %s", len(changed), e)
+                ok = False
+
+        if self.bars is not None:
+            closed = self.bars.drain()
+            if not closed.empty:
+                self._pending_bars.append(closed)
+        if self._pending_bars:
+            batch = pd.concat(self._pending_bars, ignore_index=True)
+            try:
+                self._stats["bars_written"] += await run_blocking(self.writer.write_bars, batch)
+                self._pending_bars = []
+            except Exception as e:
+                # The upsert merges a re-sent bar, so a retry is safe.
+                self._stats["write_errors"] += 1
+                logger.warning("Writing %d equity bars failed, will retry: %s", len(batch), e)
+                self._pending_bars = [batch]
+                ok = False
+
+        self._stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+        return ok
+
+
+# -------------------------------------------------------------------
+# Entry point
+# -------------------------------------------------------------------
+def transport_from_url(url: str) -> Transport:
+    """'metaapi' (token from METAAPI_TOKEN) or 'jsonl://host:port'."""
+    if url == "metaapi":
+        from veilon_core.config import METAAPI_TOKEN
+
+        if not METAAPI_TOKEN:
+            raise SystemExit("METAAPI_TOKEN is not set.")
+        return MetaApiTransport(METAAPI_TOKEN)
+    if url.startswith("jsonl://"):
+        host, port = url[len("jsonl://"):].rsplit(":", 1)
+        return JsonLinesTransport(host, int(port))
+    raise ValueError(f"Unknown tracker transport: {url!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream MetaAPI deals and equity into Postgres.")
+    parser.add_argument("--jsonl", metavar="HOST:PORT", help="use the JSON-lines transport (fake server)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    transport = transport_from_url(f"jsonl://{args.jsonl}" if args.jsonl else "metaapi")
+    tracker = Tracker(
+        transport,
+        bars=EquityBars(),
+        detector=DrawdownDetector(),
+        live=LiveEquityTable(writable=True),
+    )
+    try:
+        asyncio.run(tracker.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+On-disk columnar cache of per-account trade histories (Arrow IPC files).
+
+Layout, one directory per account under TRADE_CACHE_DIR:
+
+    <account_id>/base.arrow              compacted history
+    <account_id>/delta-<ns>-<pid>.arrow  rows appended since (newer wins by id)
+
+Files are memory-mapped on read. Appends write a new small delta file
+rather than rewriting the history; once COMPACT_AFTER deltas pile up they
+are folded into a new base (written to a temp file and renamed, so readers
+never see a partial base). When the directory grows past TRADE_CACHE_MAX_MB
+the least recently used accounts are evicted.
+
+Several processes may share the directory: every write is a new file or
+an atomic rename, and compaction only deletes the deltas it folded in.
+
+Enable with TRADE_CACHE_DIR under [database] in secrets; needs pyarrow.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - optional: the store is simply disabled
+    pa = None
+
+from veilon_core import instrumentation
+from veilon_core.db import db
+
+logger = logging.getLogger(__name__)
+
+TRADE_CACHE_DIR = db.get("TRADE_CACHE_DIR")
+TRADE_CACHE_MAX_MB = int(db.get("TRADE_CACHE_MAX_MB", 1024))
+TRADE_CACHE_MAX_AGE = int(db.get("TRADE_CACHE_MAX_AGE", 86_400))   # seconds before a base is re-pulled
+COMPACT_AFTER = 8                       # delta files per account before compacting
+BUDGET_CHECK_INTERVAL = 60.0            # seconds between directory size scans
+
+_BASE = "base.arrow"
+_LAST_USED = ".last_used"
+
+
+class TradeStore:
+    def __init__(
+        self,
+        root: str | os.PathLike,
+        *,
+        max_bytes: int = TRADE_CACHE_MAX_MB * 1024 * 1024,
+        max_age: float = TRADE_CACHE_MAX_AGE,
+        compact_after: int = COMPACT_AFTER,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compact_after = compact_after
+
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._last_budget_check = 0.0
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "appends": 0, "compactions": 0,
+                       "evictions": 0, "errors": 0}
+
+    # ---------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------
+    def load(self, account_id) -> Optional[pd.DataFrame]:
+        """The cached history, or None if absent, too old or unreadable."""
+        directory = self._dir(account_id)
+        base = directory / _BASE
+        try:
+            base_mtime = base.stat().st_mtime
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        if time.time() - base_mtime > self.max_age:
+            self._count("stale")
+            return None
+
+        try:
+            frame = _merge([_read(path) for path in self._files(directory)])
+        except (OSError, pa.ArrowException) as e:
+            logger.warning("Dropping unreadable trade cache for account %s: %s", account_id, e)
+            self._count("errors")
+            self.drop(account_id)
+            return None
+
+        _touch(directory / _LAST_USED)
+        self._count("hits")
+        return frame
+
+    def replace(self, account_id, frame: pd.DataFrame):
+        """Write `frame` as the account's whole history (drops older deltas)."""
+        directory = self._dir(account_id)
+        directory.mkdir(exist_ok=True)
+        older = self._deltas(directory)
+        if self._write(directory / _BASE, frame):
+            _unlink(older)
+            _touch(directory / _LAST_USED)
+            self._enforce_budget()
+
+    def append(self, account_id, rows: pd.DataFrame):
+        """Persist new / changed rows; compacts when deltas pile up."""
+        if rows.empty:
+            return
+        directory = self._dir(account_id)
+        if not (directory / _BASE).exists():
+            return  # nothing to append to; the next full load writes a base
+        if not self._write(directory / self._delta_name(), rows):
+            return
+        self._count("appends")
+        if len(self._deltas(directory)) >= self.compact_after:
+            self.compact(account_id)
+        self._enforce_budget()
+
+    def compact(self, account_id):
+        directory = self._dir(account_id)
+        deltas = self._deltas(directory)
+        if not deltas:
+            return
+        try:
+            # Keep the base's age: compaction must not extend TRADE_CACHE_MAX_AGE.
+            base_mtime = (directory / _BASE).stat().st_mtime
+            frame = _merge([_read(path) for path in [directory / _BASE, *deltas]])
+        except (OSError, pa.ArrowException) as e:
+            logger.warning("Compacting trade cache for account %s failed: %s", account_id, e)
+            self._count("errors")
+            return
+        if self._write(directory / _BASE, frame):
+            os.utime(directory / _BASE, (base_mtime, base_mtime))
+            _unlink(deltas)
+            self._count("compactions")
+
+    def drop(self, account_id):
+        shutil.rmtree(self._dir(account_id), ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    # ---------------------------------------------------------------
+    # Files
+    # ---------------------------------------------------------------
+    def _dir(self, account_id) -> Path:
+        return self.root / str(int(account_id))
+
+    def _delta_name(self) -> str:
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        return f"delta-{time.time_ns():020d}-{os.getpid()}-{seq}.arrow"
+
+    @staticmethod
+    def _deltas(directory: Path) -> list[Path]:
+        return sorted(directory.glob("delta-*.arrow"))
+
+    def _files(self, directory: Path) -> list[Path]:
+        return [directory / _BASE, *self._deltas(directory)]
+
+    def _write(self, path: Path, frame: pd.DataFrame) -> bool:
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+            return True
+        except (OSError, pa.ArrowException, TypeError, ValueError) as e:
+            logger.warning("Writing trade cache file %s failed: %s", path, e)
+            self._count("errors")
+            _unlink([tmp])
+            return False
+
+    # ---------------------------------------------------------------
+    # Eviction
+    # ---------------------------------------------------------------
+    def _enforce_budget(self, force: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_budget_check < BUDGET_CHECK_INTERVAL:
+                return
+            self._last_budget_check = now
+
+        usage = []
+        total = 0
+        for directory in self.root.iterdir():
+            if not directory.is_dir():
+                continue
+            try:
+                size = sum(f.stat().st_size for f in directory.iterdir() if f.is_file())
+            except FileNotFoundError:
+                continue   # removed by another process meanwhile
+            try:
+                last_used = (directory / _LAST_USED).stat().st_mtime
+            except FileNotFoundError:
+                last_used = 0.0
+            usage.append((last_used, size, directory))
+            total += size
+
+        for _, size, directory in sorted(usage):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+            self._count("evictions")
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+
+def _read(path: Path) -> pd.DataFrame:
+    with pa.memory_map(str(path), "r") as source:
+        return ipc.open_file(source).read_all().to_pandas()
+
+
+def _merge(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate base + deltas, keeping the newest row per id, in (open_time, id) order."""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.drop_duplicates("id", keep="last")
+    return merged.sort_values(["open_time", "id"], kind="stable", ignore_index=True)
+
+
+def _touch(path: Path):
+    try:
+        path.touch()
+    except OSError:
+        pass
+
+
+def _unlink(paths):
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+_store: Optional[TradeStore] = None
+_store_lock = threading.Lock()
+
+
+def get_trade_store() -> Optional[TradeStore]:
+    """The process-wide store if TRADE_CACHE_DIR is set and pyarrow is installed, else None."""
+    global _store
+    if _store is None and TRADE_CACHE_DIR and pa is not None:
+        with _store_lock:
+            if _store is None:
+                _store = TradeStore(TRADE_CACHE_DIR)
+                instrumentation.register_collector("trade_store", _store.stats)
+    return _store
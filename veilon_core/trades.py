@@ -1,4 +1,13 @@
-from veilon_core.db import execute_query
+import threading
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from veilon_core import instrumentation
+from veilon_core.cache import TTLCache
+from veilon_core.db import execute_query, query_frame, stream_frames
+from veilon_core.listener import LISTEN_NOTIFY, on_change
+from veilon_core.trade_store import get_trade_store
 
 def get_trades_by_account_id(account_id: str) -> list[dict]:
     return execute_query(
@@ -11,3 +20,203 @@ def get_trades_by_account_id(account_id: str) -> list[dict]:
         """,
         (account_id,),
     ) or []
+
+
+def get_trades_frame_by_account_id(account_id: str) -> pd.DataFrame:
+    """
+    Full trade history as a typed DataFrame (built column-wise, no per-row dicts).
+    """
+    return query_frame(
+        """
+        SELECT
+            *
+        FROM trades
+        WHERE account_id = %s
+        ORDER BY open_time ASC;
+        """,
+        (account_id,),
+    )
+
+
+def iter_trades_by_account_id(account_id: str, chunksize: int = 10_000) -> Iterator[pd.DataFrame]:
+    """
+    Stream an account's trade history in `chunksize`-row DataFrames, oldest
+    first, without materialising the whole history at once.
+    """
+    yield from stream_frames(
+        """
+        SELECT
+            *
+        FROM trades
+        WHERE account_id = %s
+        ORDER BY open_time ASC;
+        """,
+        (account_id,),
+        chunksize=chunksize,
+    )
+
+
+# -------------------------------------------------------------------
+# Incremental (delta-cached) trade history
+# -------------------------------------------------------------------
+# Trade history is append-mostly: new trades arrive with a later
+# (open_time, id), and the only rows that change afterwards are the ones
+# still open (close_time IS NULL) when they were cached. So a refresh only
+# needs rows past the watermark plus the currently-open ones.
+#
+# Edits to already-closed trades (rare: manual corrections, deletes) and
+# backfilled history (older than the watermark; veilon_core.backfill) are
+# picked up by the NOTIFY handler below, or by the full reload once the
+# cache entry's TTL runs out.
+#
+# With TRADE_CACHE_DIR set, histories are also kept on disk
+# (veilon_core.trade_store): a cold account then starts from its local copy
+# plus a delta query instead of a full pull, and every delta is appended.
+TRADES_FULL_RELOAD = 3600 if LISTEN_NOTIFY else 300   # seconds before an entry is rebuilt from scratch
+
+_DELTA_SQL = """
+    SELECT
+        *
+    FROM trades
+    WHERE account_id = %s
+      AND ((open_time, id) > (%s, %s) OR id = ANY(%s::bigint[]))
+    ORDER BY open_time ASC, id ASC;
+"""
+
+_FULL_SQL = """
+    SELECT
+        *
+    FROM trades
+    WHERE account_id = %s
+    ORDER BY open_time ASC, id ASC;
+"""
+
+
+class _TradeHistory:
+    __slots__ = ("frame", "lock")
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.lock = threading.Lock()
+
+    def watermark(self) -> Optional[tuple]:
+        if self.frame.empty:
+            return None
+        last = self.frame.iloc[-1]
+        return last["open_time"], int(last["id"])
+
+    def open_ids(self) -> list[int]:
+        if "close_time" not in self.frame.columns:
+            return []
+        return self.frame.loc[self.frame["close_time"].isna(), "id"].astype("int64").tolist()
+
+    def merge(self, delta: pd.DataFrame) -> int:
+        """Fold fetched rows in: replace rows with the same id, append the rest."""
+        if delta.empty:
+            return 0
+        frame = self.frame
+        replaced = frame["id"].isin(delta["id"])
+        merged = pd.concat([frame[~replaced], delta], ignore_index=True)
+        if replaced.any():
+            # Re-fetched open trades go back to their (open_time, id) position.
+            merged = merged.sort_values(["open_time", "id"], kind="stable", ignore_index=True)
+        self.frame = merged   # replaced, never mutated: frames already handed out stay valid
+        return len(delta)
+
+
+_history_cache = TTLCache("trades", ttl=TRADES_FULL_RELOAD, maxsize=256)
+_delta_stats = {"full_loads": 0, "disk_loads": 0, "delta_refreshes": 0, "delta_rows": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _delta_stats[key] += value
+
+
+def _delta_stats_snapshot() -> dict:
+    with _stats_lock:
+        return dict(_delta_stats)
+
+
+instrumentation.register_collector("trade_deltas", _delta_stats_snapshot)
+
+
+def _on_trade_change(payload: dict):
+    # New trades and changes to open ones are fetched by the next delta
+    # refresh; only deletes, edits of closed trades and backfills (rows
+    # older than the watermark, flagged full_reload) need a full reload.
+    account_id = payload.get("account_id")
+    if account_id is None:
+        return
+    if payload.get("full_reload") or payload.get("op") == "DELETE" or payload.get("was_closed", True):
+        invalidate_trades_cache(account_id)
+
+
+on_change("trades", _on_trade_change, reset=_history_cache.clear)
+
+
+def _load_history(account_id: str) -> _TradeHistory:
+    store = get_trade_store()
+    frame = store.load(account_id) if store is not None else None
+    if frame is not None:
+        _count(disk_loads=1)
+        history = _TradeHistory(frame)
+        _refresh(history, account_id)
+        return history
+
+    _count(full_loads=1)
+    frame = query_frame(_FULL_SQL, (account_id,), category_max_ratio=0)
+    if store is not None:
+        store.replace(account_id, frame)
+    return _TradeHistory(frame)
+
+
+def _refresh(history: _TradeHistory, account_id: str):
+    """Fetch rows past the watermark plus open trades; fold them in (and on disk)."""
+    watermark = history.watermark()
+    if watermark is None:
+        delta = query_frame(_FULL_SQL, (account_id,), category_max_ratio=0)
+    else:
+        open_time, last_id = watermark
+        delta = query_frame(_DELTA_SQL, (account_id, open_time, last_id, history.open_ids()), category_max_ratio=0)
+    rows = history.merge(delta)
+    _count(delta_refreshes=1, delta_rows=rows)
+
+    store = get_trade_store()
+    if store is not None and rows:
+        if watermark is None:
+            store.replace(account_id, history.frame)
+        else:
+            store.append(account_id, delta)
+
+
+def get_trades_frame_incremental(account_id: str) -> pd.DataFrame:
+    """
+    Like `get_trades_frame_by_account_id`, but served from a per-account
+    cache that is topped up with only the new and still-open trades on
+    each call, so a rerun costs O(new trades) on the database.
+
+    The returned frame is shared with the cache: treat it as read-only.
+    """
+    key = str(account_id)
+    history = _history_cache.get(key)
+    if history is None:
+        history = _history_cache.get_or_load(key, lambda: _load_history(key))
+        return history.frame.copy(deep=False)
+
+    with history.lock:
+        _refresh(history, key)
+        return history.frame.copy(deep=False)
+
+
+def invalidate_trades_cache(account_id: Optional[str] = None):
+    """Drop one account's cached history, in memory and on disk (or all of them in memory)."""
+    if account_id is None:
+        _history_cache.clear()
+        return
+    _history_cache.invalidate(str(account_id))
+    store = get_trade_store()
+    if store is not None:
+        store.drop(account_id)